@@ -1,9 +1,9 @@
-import configparser
 from pathlib import Path
 from urllib.parse import urljoin
 
 import requests
 
+from services.lighthouse.configs.config_lighthouse import get_config
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 BASE_URLS_PATH = PROJECT_ROOT / "URLs" / "base_urls.ini"
@@ -24,30 +24,24 @@ class BaseApiClient:
         routes_path=ROUTES_PATH,
         timeout=30,
     ):
-        self.environment = environment or self._read_current_environment(base_urls_path)
+        # Общий с Lighthouse снимок base_urls.ini/routes.ini: файлы не перечитываются на каждый клиент
+        self.config = get_config(base_urls_path, routes_path)
+        self.environment = environment or self.config.current_environment or "VRP_PROD"
         self.base_key = base_key
         self.timeout = timeout
         self.session = session or requests.Session()
-        self.base_urls = self._read_ini(base_urls_path)
-        self.routes = self._read_ini(routes_path)
         self.base_url = self._get_base_url()
         self.session.headers.update(self._default_headers())
 
-    @staticmethod
-    def _read_ini(path):
-        parser = configparser.ConfigParser()
-        parser.read(path, encoding="utf-8")
-        return parser
-
-    @classmethod
-    def _read_current_environment(cls, base_urls_path):
-        parser = cls._read_ini(base_urls_path)
-        return parser.get("environments", "current", fallback="VRP_PROD")
-
     def _get_base_url(self):
-        if not self.base_urls.has_section(self.environment):
-            raise ApiClientError(f"Environment '{self.environment}' is not found in {BASE_URLS_PATH}")
-        return self.base_urls.get(self.environment, self.base_key)
+        if self.environment not in self.config.environments:
+            raise ApiClientError(f"Environment '{self.environment}' is not found in {self.config.base_urls_path}")
+        try:
+            return self.config.base_url(self.environment, self.base_key)
+        except KeyError:
+            raise ApiClientError(
+                f"Key '{self.base_key}' is not found in [{self.environment}] of {self.config.base_urls_path}"
+            ) from None
 
     def _default_headers(self):
         return {
@@ -63,9 +57,9 @@ class BaseApiClient:
         }
 
     def route(self, route_name, **params):
-        if not self.routes.has_option("routes", route_name):
-            raise ApiClientError(f"Route '{route_name}' is not found in {ROUTES_PATH}")
-        route = self.routes.get("routes", route_name)
+        if route_name.lower() not in self.config.routes:
+            raise ApiClientError(f"Route '{route_name}' is not found in {self.config.routes_path}")
+        route = self.config.routes[route_name.lower()]
         if params:
             route = route.format(**params)
         return route
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Бенчмарк времени старта: python -X importtime для точек входа MCP-сервера и заданий.
+
+Использование:
+    python scripts/bench_importtime.py                 # все точки входа, 5 повторов
+    python scripts/bench_importtime.py --repeat 10 --top 15
+    python scripts/bench_importtime.py job_entry       # только выбранные
+
+Для каждой точки входа печатает медиану суммарного времени импорта, самые тяжёлые
+модули и проверяет бюджет: время и модули, которых на этом пути быть не должно.
+Код возврата 1 — бюджет превышен (можно запускать в CI).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# name: (код для python -c, бюджет в мс, модули, которые не должны импортироваться)
+ENTRYPOINTS = {
+    # MCP-сервер (stdio): FastMCP нужен, тяжёлые зависимости сервисов — нет
+    "server": (
+        "import services.lighthouse.mcp_server",
+        1500,
+        ("pytest", "gspread", "numpy", "requests", "services.lighthouse.pagespeed_service"),
+    ),
+    # Процесс задания / планировщика (--execute-job, --scheduler): без FastMCP
+    "job_entry": (
+        "import sys; sys.argv.append('--execute-job'); import services.lighthouse.mcp_server",
+        150,
+        ("mcp", "pytest", "gspread", "numpy", "requests", "services.lighthouse.pagespeed_service"),
+    ),
+    # Первое, что делает задание: импорт сервиса прогонов
+    "job_service": (
+        "import services.lighthouse.pagespeed_service",
+        250,
+        ("pytest", "gspread", "google.auth", "numpy", "requests"),
+    ),
+}
+
+
+def import_profile(code: str) -> dict:
+    """
+    Разбор вывода -X importtime (stderr) одного запуска:
+    {module: (cumulative_us, top_level)}; top_level — импортирован не из другого модуля.
+    """
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"импорт завершился с кодом {result.returncode}: {tail[0]}")
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        profile[name.strip()] = (int(cumulative_us), depth == 1)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк времени импорта точек входа")
+    parser.add_argument("names", nargs="*", help=f"Точки входа: {', '.join(ENTRYPOINTS)} (по умолчанию — все)")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов на точку входа")
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых тяжёлых модулей показать")
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(ENTRYPOINTS)
+    if unknown:
+        parser.error(f"неизвестные точки входа: {', '.join(sorted(unknown))}")
+
+    over_budget = False
+    for name in args.names or ENTRYPOINTS:
+        code, budget_ms, forbidden = ENTRYPOINTS[name]
+        try:
+            profiles = [import_profile(code) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{name}: пропуск — {e}")
+            continue
+        totals = [sum(us for us, top_level in profile.values() if top_level) / 1000 for profile in profiles]
+        total_ms = statistics.median(totals)
+        last = profiles[-1]
+        loaded = [module for module in forbidden if module in last]
+        status = "OK" if total_ms <= budget_ms and not loaded else "ПРЕВЫШЕН"
+        over_budget |= status != "OK"
+
+        print(f"{name}: {total_ms:.0f} ms (медиана из {args.repeat}, бюджет {budget_ms} ms) — {status}")
+        if loaded:
+            print(f"  лишние модули: {', '.join(loaded)}")
+        for module, (us, _) in sorted(last.items(), key=lambda item: item[1][0], reverse=True)[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {module}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""Бенчмарк разбора отчётов Lighthouse: полный json.load vs потоковый выборочный парсер.
+
+Использование:
+    python scripts/bench_lighthouse_parser.py                       # синтетический отчёт ~10 МБ
+    python scripts/bench_lighthouse_parser.py Report_CLI_*.json     # реальные отчёты
+    python scripts/bench_lighthouse_parser.py --size-mb 15 --repeat 5
+
+Для каждого файла печатает лучшее время и пиковую аллокацию (tracemalloc)
+для обоих путей и проверяет, что метрики совпадают.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from services.lighthouse.processor_lighthouse import (  # noqa: E402
+    _full_parse_lighthouse_results,
+    _stream_parse_lighthouse_results,
+)
+
+
+def _audit(audit_id: str, numeric_value: float, details: dict | None = None) -> dict:
+    audit = {
+        "id": audit_id,
+        "title": audit_id.replace("-", " ").title(),
+        "description": f"Описание аудита {audit_id}. [Learn more](https://developer.chrome.com/docs/lighthouse/)",
+        "score": 0.87,
+        "scoreDisplayMode": "numeric",
+        "numericValue": numeric_value,
+        "numericUnit": "millisecond",
+        "displayValue": f"{numeric_value / 1000:.1f} s",
+    }
+    if details is not None:
+        audit["details"] = details
+    return audit
+
+
+def build_synthetic_report(size_mb: float) -> dict:
+    """Собирает отчёт со структурой LHR и тяжёлыми base64-артефактами нужного размера."""
+    # base64 раздувает байты в 4/3: скриншот ≈ 40% файла, столько же — миниатюры
+    screenshot = base64.b64encode(os.urandom(int(size_mb * 1024 * 1024 * 0.3))).decode()
+    thumbnails = [{"timing": i * 300, "timestamp": 1000 + i, "data": f"data:image/jpeg;base64,{screenshot[:len(screenshot) // 10]}"}
+                  for i in range(10)]
+    treemap_nodes = [{"name": f"https://cdn.example.com/js/chunk-{i}.js", "resourceBytes": 1000 + i, "unusedBytes": i}
+                     for i in range(int(size_mb * 400))]
+
+    audits = {
+        "largest-contentful-paint": _audit("largest-contentful-paint", 2412.7, {"type": "debugdata", "items": [{"phase": "TTFB"}]}),
+        "first-contentful-paint": _audit("first-contentful-paint", 1123.4),
+        "total-blocking-time": _audit("total-blocking-time", 187.0),
+        "cumulative-layout-shift": _audit("cumulative-layout-shift", 0.04213),
+        "speed-index": _audit("speed-index", 2987.2),
+        "interactive": _audit("interactive", 4120.9),
+        "server-response-time": _audit("server-response-time", 312.5, {"type": "opportunity", "items": []}),
+        "max-potential-fid": _audit("max-potential-fid", 96.0),
+        "screenshot-thumbnails": {"id": "screenshot-thumbnails", "title": "Screenshot Thumbnails", "score": None,
+                                  "details": {"type": "filmstrip", "items": thumbnails}},
+        "final-screenshot": {"id": "final-screenshot", "title": "Final Screenshot", "score": None,
+                             "details": {"type": "screenshot", "data": f"data:image/jpeg;base64,{screenshot[:len(screenshot) // 4]}"}},
+        "script-treemap-data": {"id": "script-treemap-data", "title": "Script Treemap Data", "score": None,
+                                "details": {"type": "treemap-data", "nodes": treemap_nodes}},
+    }
+    return {
+        "lighthouseVersion": "12.0.0",
+        "requestedUrl": "https://vrporn.com/",
+        "fetchTime": "2026-01-01T00:00:00.000Z",
+        "audits": audits,
+        "configSettings": {"onlyCategories": ["performance", "accessibility", "best-practices", "seo"]},
+        "categories": {
+            "performance": {"title": "Performance", "supportedModes": ["navigation"],
+                            "auditRefs": [{"id": a, "weight": 10, "group": "metrics"} for a in audits],
+                            "id": "performance", "score": 0.74},
+        },
+        "fullPageScreenshot": {"screenshot": {"data": f"data:image/webp;base64,{screenshot}", "width": 1350, "height": 9000},
+                               "nodes": {}},
+        "i18n": {"rendererFormattedStrings": {}, "icuMessagePaths": {}},
+    }
+
+
+def measure(func, path: str, repeat: int) -> tuple:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(path)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк парсера отчётов Lighthouse")
+    parser.add_argument("paths", nargs="*", help="JSON-отчёты Lighthouse (по умолчанию — синтетический)")
+    parser.add_argument("--size-mb", type=float, default=10.0, help="Размер синтетического отчёта")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов на замер времени")
+    args = parser.parse_args()
+
+    paths = list(args.paths)
+    tmp_dir = None
+    if not paths:
+        tmp_dir = tempfile.TemporaryDirectory()
+        synthetic = os.path.join(tmp_dir.name, "synthetic_report.json")
+        with open(synthetic, "w", encoding="utf-8") as f:
+            json.dump(build_synthetic_report(args.size_mb), f, ensure_ascii=False, indent=2)
+        paths.append(synthetic)
+
+    try:
+        for path in paths:
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            full, full_time, full_peak = measure(_full_parse_lighthouse_results, path, args.repeat)
+            stream, stream_time, stream_peak = measure(_stream_parse_lighthouse_results, path, args.repeat)
+
+            print(f"{os.path.basename(path)} ({size_mb:.1f} MB)")
+            print(f"  json.load : {full_time * 1000:8.1f} ms, peak {full_peak / 1024 / 1024:7.1f} MB")
+            print(f"  stream    : {stream_time * 1000:8.1f} ms, peak {stream_peak / 1024 / 1024:7.1f} MB")
+            if stream is None:
+                print("  stream    : структура не распознана — будет использован полный разбор")
+            else:
+                print(f"  ускорение : x{full_time / stream_time:.1f}, память: x{full_peak / max(stream_peak, 1):.1f}")
+                print(f"  метрики совпадают: {'да' if stream == full else f'НЕТ {stream} != {full}'}")
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+/**
+ * Долгоживущий Lighthouse-воркер.
+ *
+ * Держит прогретыми Node, модуль Lighthouse и один экземпляр Chrome,
+ * принимает задания по протоколу JSON-lines:
+ *   stdin  → {"id": "1", "url": "...", "outputPath": "...", "flags": {...}, "preset": "desktop"}
+ *   stdout ← {"id": "1", "ok": true, "outputPath": "..."} | {"id": "1", "ok": false, "error": "..."}
+ * Команда {"command": "shutdown"} закрывает Chrome и завершает процесс.
+ *
+ * stdout зарезервирован под протокол — все логи идут в stderr.
+ * Python-обёртка: services/lighthouse/daemon_runner.py (LighthouseDaemonRunner).
+ *
+ * Использование:
+ *   node scripts/lighthouse_daemon.js
+ */
+
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+
+const CHROME_FLAGS = ['--headless', '--no-sandbox', '--disable-gpu'];
+
+let lighthouse = null;
+let desktopConfig = null;
+let chromeLauncher = null;
+let chrome = null;
+
+function log(message) {
+  process.stderr.write(`[lighthouse-daemon] ${message}\n`);
+}
+
+function send(payload) {
+  process.stdout.write(JSON.stringify(payload) + '\n');
+}
+
+async function loadModules() {
+  // lighthouse >= 10 и chrome-launcher — ESM, поэтому dynamic import
+  const lhModule = await import('lighthouse');
+  lighthouse = lhModule.default;
+  desktopConfig = lhModule.desktopConfig;
+  chromeLauncher = await import('chrome-launcher');
+}
+
+async function ensureChrome() {
+  if (chrome) {
+    return chrome;
+  }
+  chrome = await chromeLauncher.launch({chromeFlags: CHROME_FLAGS});
+  log(`Chrome запущен на порту ${chrome.port}`);
+  return chrome;
+}
+
+async function killChrome() {
+  if (!chrome) {
+    return;
+  }
+  try {
+    await chrome.kill();
+  } catch (e) {
+    log(`Не удалось закрыть Chrome: ${e.message}`);
+  }
+  chrome = null;
+}
+
+async function runAudit(request) {
+  const instance = await ensureChrome();
+  const flags = Object.assign({}, request.flags || {}, {
+    port: instance.port,
+    output: 'json',
+    logLevel: 'error',
+  });
+  const config = request.preset === 'desktop' ? desktopConfig : undefined;
+
+  const runnerResult = await lighthouse(request.url, flags, config);
+  if (!runnerResult || !runnerResult.report) {
+    throw new Error('Lighthouse не вернул отчёт');
+  }
+
+  const report = Array.isArray(runnerResult.report) ? runnerResult.report[0] : runnerResult.report;
+  fs.mkdirSync(path.dirname(request.outputPath), {recursive: true});
+  fs.writeFileSync(request.outputPath, report);
+
+  const lhr = runnerResult.lhr || {};
+  return {runtimeError: lhr.runtimeError ? lhr.runtimeError.message : null};
+}
+
+async function handle(request) {
+  if (request.command === 'shutdown') {
+    await killChrome();
+    send({id: request.id || null, ok: true});
+    process.exit(0);
+  }
+
+  try {
+    const {runtimeError} = await runAudit(request);
+    send({id: request.id, ok: true, outputPath: request.outputPath, runtimeError});
+  } catch (e) {
+    log(`Ошибка прогона ${request.url}: ${e.message}`);
+    // Chrome мог упасть — перезапустим его на следующем задании
+    await killChrome();
+    send({id: request.id, ok: false, error: e.message});
+  }
+}
+
+async function main() {
+  await loadModules();
+  await ensureChrome();
+
+  send({event: 'ready', chromePort: chrome.port});
+
+  const rl = readline.createInterface({input: process.stdin, terminal: false});
+  // Задания выполняются строго по одному: один Chrome — один прогон в момент времени
+  let queue = Promise.resolve();
+  rl.on('line', (line) => {
+    const text = line.trim();
+    if (!text) {
+      return;
+    }
+    let request;
+    try {
+      request = JSON.parse(text);
+    } catch (e) {
+      send({id: null, ok: false, error: `Некорректный JSON: ${e.message}`});
+      return;
+    }
+    queue = queue.then(() => handle(request));
+  });
+  rl.on('close', () => {
+    queue.then(killChrome).then(() => process.exit(0));
+  });
+}
+
+if (require.main === module) {
+  main().catch(async (err) => {
+    log(`Фатальная ошибка: ${err.message}`);
+    await killChrome();
+    process.exit(1);
+  });
+}
+
+module.exports = {runAudit};
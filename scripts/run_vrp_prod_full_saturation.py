@@ -1,4 +1,10 @@
-"""Запуск сатурации VRP_PROD — все роуты, оба устройства (CLI + API)."""
+"""Запуск сатурации VRP_PROD — все роуты, оба устройства (CLI + API).
+
+Все прогоны идут через один SpeedtestService с auto_flush=False: строки CLI и API
+копятся в буфере одного Google Sheets клиента и пишутся в конце одним batch-запросом.
+До этого они уже лежат в RunStore (pending) — при падении скрипта их можно дослать:
+python -m services.lighthouse.run_store replicate
+"""
 import sys
 import os
 from datetime import datetime
@@ -37,10 +43,10 @@ from services.lighthouse.pagespeed_service import SpeedtestService
 
 DEVICES = ["desktop", "mobile"]
 
-def run_cli_saturation(environment: str):
+def run_cli_saturation(service: SpeedtestService):
+    environment = service.environment
     log(f"\n=== CLI saturation: {environment} ===")
     log(f"Лог файл: {log_file}")
-    service = SpeedtestService(environment=environment)
     for device in DEVICES:
         log(f"-- {environment} CLI ({device}): 10 итераций по всем роутам")
         try:
@@ -49,15 +55,16 @@ def run_cli_saturation(environment: str):
                 device_type=device,
                 n_iteration=10,
                 tag="",
-                sprint=""
+                sprint="",
+                auto_flush=False,
             )
             log(f"[OK] {environment} CLI ({device}) завершён")
         except Exception as e:
             log(f"[ERROR] {environment} CLI ({device}) ошибка: {e}")
 
-def run_api_saturation(environment: str):
+def run_api_saturation(service: SpeedtestService):
+    environment = service.environment
     log(f"\n=== API saturation: {environment} ===")
-    service = SpeedtestService(environment=environment)
     for device in DEVICES:
         log(f"-- {environment} API ({device}): 10 итераций по всем роутам")
         try:
@@ -66,7 +73,8 @@ def run_api_saturation(environment: str):
                 device_type=device,
                 n_iteration=10,
                 tag="",
-                sprint=""
+                sprint="",
+                auto_flush=False,
             )
             log(f"[OK] {environment} API ({device}) завершён")
         except Exception as e:
@@ -74,8 +82,12 @@ def run_api_saturation(environment: str):
 
 if __name__ == "__main__":
     try:
-        run_cli_saturation("VRP_PROD")
-        run_api_saturation("VRP_PROD")
+        service = SpeedtestService(environment="VRP_PROD")
+        try:
+            run_cli_saturation(service)
+            run_api_saturation(service)
+        finally:
+            service.flush_results()
         log("\n=== Завершение VRP_PROD ===")
     except Exception as e:
         log(f"\n=== Критическая ошибка: {e} ===")
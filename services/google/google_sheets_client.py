@@ -10,57 +10,63 @@ from typing import Dict, List, Optional, Any, Literal
 from gspread.exceptions import APIError, WorksheetNotFound
 from google.oauth2.service_account import Credentials
 
+from services.google.quota import SharedTokenBucket
+
 FAILED_FLUSH_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
     "Reports", "reports_lighthouse",
 )
 
-# Межпроцессный rate limiter для Google Sheets API через lock-файл
-_SHEETS_LOCK_DIR = os.path.join(FAILED_FLUSH_DIR, ".sheets_locks")
-_SHEETS_MIN_INTERVAL = 1.5  # минимум секунд между Sheets API вызовами
+# Межпроцессная квота Google Sheets API: общий token bucket + общий backoff после 429.
+# Квота на пользователя по умолчанию — 60 запросов в минуту (GS_QUOTA_PER_MINUTE).
+_sheets_quota: Optional[SharedTokenBucket] = None
 
 
-def _sheets_rate_limit():
-    """Простой межпроцессный rate limiter через timestamp файл."""
-    os.makedirs(_SHEETS_LOCK_DIR, exist_ok=True)
-    ts_file = os.path.join(_SHEETS_LOCK_DIR, "last_call.txt")
-    for _ in range(30):  # макс 45 секунд ожидания
-        try:
-            now = time.time()
-            if os.path.exists(ts_file):
-                try:
-                    with open(ts_file, "r") as f:
-                        last = float(f.read().strip())
-                    elapsed = now - last
-                    if elapsed < _SHEETS_MIN_INTERVAL:
-                        time.sleep(_SHEETS_MIN_INTERVAL - elapsed + random.uniform(0.1, 0.5))
-                except (ValueError, OSError):
-                    pass
-            with open(ts_file, "w") as f:
-                f.write(str(time.time()))
-            return
-        except OSError:
-            time.sleep(random.uniform(0.3, 0.8))
+def _sheets_bucket() -> SharedTokenBucket:
+    global _sheets_quota
+    if _sheets_quota is None:
+        _sheets_quota = SharedTokenBucket("sheets", per_minute=float(os.getenv("GS_QUOTA_PER_MINUTE", "60")))
+    return _sheets_quota
+
+
+def _sheets_rate_limit(cost: float = 1.0):
+    """Ждёт токены в общем для всех процессов ведре Sheets API."""
+    waited = _sheets_bucket().acquire(cost)
+    if waited > 1.0:
+        print(f"[DEBUG] Sheets квота: ожидание {waited:.1f}с")
 
 
-def _retry_sheets_call(func, max_retries=5, base_delay=2.0):
+def _api_status(error: APIError) -> Optional[int]:
+    """HTTP-статус APIError. Не `if error.response`: bool(Response) ложен для 4xx/5xx."""
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_sheets_call(func, max_retries=5, base_delay=2.0, on_attempt=None, cost=1.0):
     """
     Обёртка для вызовов Google Sheets API с retry и exponential backoff.
     Ретраит при APIError (429, 5xx) и общих сетевых ошибках.
-    Включает межпроцессный rate limiting.
+    Включает межпроцессный rate limiting: cost — сколько запросов делает func.
+    429 ставит на паузу все процессы через общее ведро.
+    on_attempt — вызывается перед каждой попыткой (счётчик API-вызовов клиента).
     """
     for attempt in range(max_retries + 1):
         try:
-            _sheets_rate_limit()
+            _sheets_rate_limit(cost)
+            if on_attempt:
+                on_attempt()
             return func()
         except APIError as e:
-            status = e.response.status_code if hasattr(e, 'response') and e.response else 500
+            status = _api_status(e) or 500
             is_retryable = status == 429 or status >= 500
             if not is_retryable or attempt == max_retries:
                 raise
             delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
             print(f"[RETRY] Sheets API {status}, попытка {attempt + 1}/{max_retries + 1}, ожидание {delay:.1f}с...")
-            time.sleep(delay)
+            if status == 429:
+                # Ожидание произойдёт в _sheets_rate_limit — вместе с остальными процессами
+                _sheets_bucket().report_backoff(delay)
+            else:
+                time.sleep(delay)
         except Exception:
             if attempt == max_retries:
                 raise
@@ -76,78 +82,223 @@ class GoogleSheetsClient:
         self.credentials_path = credentials_path
         self.spreadsheet_id = spreadsheet_id
         self.worksheet_name = worksheet_name
+        self.api_calls = 0  # Sheets API вызовов этим клиентом (включая retry)
+        # Реестр листов: title → Worksheet. Заполняется одним worksheets() и
+        # перечитывается только при WorksheetNotFound
+        self._worksheets: Optional[Dict[str, gspread.Worksheet]] = None
+        self.duplicated_sheets: Dict[str, str] = {}  # лист → шаблон, из которого он создан
         self.client = self._authorize()
-        self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
+        self.spreadsheet = self._call(lambda: self.client.open_by_key(self.spreadsheet_id))
         self.sheet = self._open_or_create_sheet(worksheet_name)
-        self._batch_rows: List[List[Any]] = []
-        self._headers: Optional[List[str]] = None
-        self._headers_cached: bool = False
-        self._next_row: Optional[int] = None  # кэш позиции для append
+        # Буфер строк по листам: title → [row dict, ...]. Пишется одним flush()
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        # Параллельно _buffers: сохранять ли строку в failed_flush_*.json при сбое flush
+        # (строки из RunStore не сохраняются — их досылает RunStore.replicate_pending)
+        self._fallback_flags: Dict[str, List[bool]] = {}
+        self._sheet_headers: Dict[str, List[str]] = {}  # кэш строки заголовков по листам
+        self._next_rows: Dict[str, int] = {}  # кэш первой свободной строки по листам
 
     def _authorize(self):
         scopes = ["https://www.googleapis.com/auth/spreadsheets"]
         credentials = Credentials.from_service_account_file(self.credentials_path, scopes=scopes)
         return gspread.authorize(credentials)
 
+    def _count_call(self):
+        self.api_calls += 1
+
+    def _call(self, func):
+        """_retry_sheets_call с учётом вызова в self.api_calls."""
+        return _retry_sheets_call(func, on_attempt=self._count_call)
+
+    def _worksheet_registry(self, refresh: bool = False) -> Dict[str, gspread.Worksheet]:
+        if self._worksheets is None or refresh:
+            self._worksheets = {ws.title: ws for ws in self._call(self.spreadsheet.worksheets)}
+        return self._worksheets
+
+    def invalidate_worksheets(self):
+        """Сбрасывает реестр листов — следующий доступ перечитает их список."""
+        self._worksheets = None
+
+    def _get_worksheet(self, sheet_name: str) -> gspread.Worksheet:
+        """Лист из реестра; при промахе реестр перечитывается один раз."""
+        worksheet = self._worksheet_registry().get(sheet_name)
+        if worksheet is None:
+            worksheet = self._worksheet_registry(refresh=True).get(sheet_name)
+        if worksheet is None:
+            raise WorksheetNotFound(sheet_name)
+        return worksheet
+
     def _open_or_create_sheet(self, sheet_name: str):
         try:
-            return self.spreadsheet.worksheet(sheet_name)
+            return self._get_worksheet(sheet_name)
         except WorksheetNotFound:
             print(f"[INFO] Лист '{sheet_name}' не найден. Создаём новый.")
-            return self.spreadsheet.add_worksheet(title=sheet_name, rows=200, cols=60)
+            try:
+                worksheet = self._call(lambda: self.spreadsheet.add_worksheet(title=sheet_name, rows=200, cols=60))
+            except APIError as e:
+                if not self._is_already_exists_error(e):
+                    raise
+                # Создан параллельно или прошлой попыткой retry, ответ которой потерялся
+                return self._get_worksheet(sheet_name)
+            self._worksheet_registry()[sheet_name] = worksheet
+            return worksheet
+
+    @staticmethod
+    def _is_missing_sheet_error(error: APIError) -> bool:
+        # Запись в удалённый лист: 400 "Unable to parse range: '<лист>'!A4"
+        return _api_status(error) == 400 and "Unable to parse range" in str(error)
+
+    @staticmethod
+    def _is_already_exists_error(error: APIError) -> bool:
+        # Создание листа с занятым именем: 400 'A sheet with the name "..." already exists'
+        return _api_status(error) == 400 and "already exists" in str(error)
+
+    def append_result(self, data: Dict[str, Any], raw_formula_fields: Optional[List[str]] = None,
+                      worksheet_name: Optional[str] = None, fallback: bool = True):
+        """
+        Буферизует строку для листа worksheet_name (по умолчанию — текущего worksheet_name).
+        Обращений к API нет: заголовки и позиция записи определяются в flush().
+        fallback=False — строка хранится в RunStore и при сбое flush не пишется в failed_flush_*.json.
+        """
+        target = worksheet_name or self.worksheet_name
+        self._buffers.setdefault(target, []).append(self._normalize_data(data))
+        self._fallback_flags.setdefault(target, []).append(fallback)
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(len(rows) for rows in self._buffers.values())
+
+    @staticmethod
+    def _a1_sheet(sheet_name: str) -> str:
+        return "'" + sheet_name.replace("'", "''") + "'"
+
+    @classmethod
+    def a1_range(cls, sheet_name: str, cells: Optional[str] = None) -> str:
+        """A1-диапазон листа с экранированным именем: a1_range("VRP [PROD]", "A2:Z") -> "'VRP [PROD]'!A2:Z"."""
+        return f"{cls._a1_sheet(sheet_name)}!{cells}" if cells else cls._a1_sheet(sheet_name)
+
+    def sheet_titles(self) -> List[str]:
+        """Имена листов таблицы (из реестра, без лишних обращений к API)."""
+        return list(self._worksheet_registry())
+
+    def ensure_plain_sheet(self, sheet_name: str):
+        """Лист без шаблона (служебные листы): открыть или создать пустой."""
+        return self._open_or_create_sheet(sheet_name)
+
+    def read_values(self, ranges: List[str]) -> List[List[List[Any]]]:
+        """
+        Значения диапазонов одним values_batch_get. Числа приходят числами, даты — строками,
+        формулы — вычисленными значениями (как getValues() в Apps Script).
+        """
+        if not ranges:
+            return []
+        params = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+        response = self._call(lambda: self.spreadsheet.values_batch_get(ranges, params=params))
+        value_ranges = response.get("valueRanges", [])
+        value_ranges += [{}] * (len(ranges) - len(value_ranges))
+        return [value_range.get("values") or [] for value_range in value_ranges]
+
+    def write_values(self, data: List[Dict[str, Any]], clear: Optional[List[str]] = None) -> None:
+        """
+        Запись [{"range": ..., "values": [[...]]}] одним values_batch_update.
+        clear — диапазоны, очищаемые перед записью (ещё один запрос).
+        """
+        if clear:
+            self._call(lambda: self.spreadsheet.values_batch_clear(body={"ranges": clear}))
+        if data:
+            self._call(lambda: self.spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": data}))
 
-    def append_result(self, data: Dict[str, Any], raw_formula_fields: Optional[List[str]] = None):
-        headers = self._get_or_create_headers(data)
-        self._headers = headers
-        processed = self._normalize_data(data)
-        row = [processed.get(h, "") for h in headers]
-        self._batch_rows.append(row)
+    @staticmethod
+    def _merge_headers(headers: List[str], rows: List[Dict[str, Any]]) -> List[str]:
+        merged = list(headers)
+        for row in rows:
+            merged.extend(k for k in row if k not in merged)
+        return merged
+
+    def _flush_batch(self, pending: Dict[str, List[Dict[str, Any]]]):
+        """
+        Записывает строки всех листов: один values_batch_get (заголовки + колонка A
+        листов без кэша) и один values_batch_update. Кэши обновляются только после успеха.
+        """
+        headers_by_sheet = dict(self._sheet_headers)
+        next_rows = dict(self._next_rows)
+
+        unknown = [ws for ws in pending if ws not in next_rows or ws not in headers_by_sheet]
+        if unknown:
+            ranges = []
+            for ws in unknown:
+                ranges += [f"{self._a1_sheet(ws)}!1:1", f"{self._a1_sheet(ws)}!A:A"]
+            self._count_call()
+            value_ranges = self.spreadsheet.values_batch_get(ranges).get("valueRanges", [])
+            value_ranges += [{}] * (len(ranges) - len(value_ranges))
+            for index, ws in enumerate(unknown):
+                header_row = (value_ranges[2 * index].get("values") or [[]])[0]
+                col_a = value_ranges[2 * index + 1].get("values") or []
+                headers_by_sheet[ws] = [str(h) for h in header_row]
+                next_rows[ws] = max(4, len(col_a) + 1)
+
+        data = []
+        for ws, rows in pending.items():
+            headers = self._merge_headers(headers_by_sheet[ws], rows)
+            if headers != headers_by_sheet[ws]:
+                data.append({"range": f"{self._a1_sheet(ws)}!A1", "values": [headers]})
+                headers_by_sheet[ws] = headers
+            values = [[row.get(h, "") for h in headers] for row in rows]
+            data.append({"range": f"{self._a1_sheet(ws)}!A{next_rows[ws]}", "values": values})
+            print(f"[INFO] Запись {len(values)} строк в таблицу '{ws}' с A{next_rows[ws]}...")
+            next_rows[ws] += len(values)
+
+        self._count_call()
+        self.spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": data})
+        self._sheet_headers = headers_by_sheet
+        self._next_rows = next_rows
 
     def flush(self):
-        if not self._batch_rows:
+        """Отправляет буфер всех листов одним batch-запросом (см. _flush_batch)."""
+        pending = {ws: rows for ws, rows in self._buffers.items() if rows}
+        if not pending:
             print("[DEBUG] Нет строк для отправки.")
             return
-
-        rows_to_write = list(self._batch_rows)
-
-        def _do_flush():
-            print(f"[INFO] Запись {len(rows_to_write)} строк в таблицу '{self.worksheet_name}'...")
-            # Определяем start_row: используем кэш или делаем один лёгкий запрос
-            if self._next_row is not None:
-                start_row = self._next_row
-            else:
-                # Один вызов вместо get_all_values() — считаем только кол-во строк
-                try:
-                    col_a = self.sheet.col_values(1)
-                    start_row = max(4, len(col_a) + 1)
-                except Exception:
-                    start_row = 4
-            max_len = len(self._headers or [])
-            padded = [r + [""] * (max_len - len(r)) for r in rows_to_write]
-            range_start = f"A{start_row}"
-            self.sheet.update(range_start, padded, value_input_option="USER_ENTERED")
-            # Обновляем кэш позиции
-            self._next_row = start_row + len(padded)
-            print(f"[INFO] Успешно записано с {range_start} ({len(padded)} строк).")
+        fallback_flags, self._buffers, self._fallback_flags = self._fallback_flags, {}, {}
 
         try:
-            _retry_sheets_call(_do_flush)
-            self._batch_rows.clear()
+            try:
+                _retry_sheets_call(lambda: self._flush_batch(pending), cost=2)
+            except APIError as e:
+                if not self._is_missing_sheet_error(e):
+                    raise
+                # Лист удалили во время прогона — реестр и кэши больше не актуальны
+                self.invalidate_worksheets()
+                for ws in pending:
+                    self._sheet_headers.pop(ws, None)
+                    self._next_rows.pop(ws, None)
+                raise WorksheetNotFound(", ".join(pending)) from e
+            total = sum(len(rows) for rows in pending.values())
+            print(f"[INFO] Успешно записано {total} строк в {len(pending)} лист(а). "
+                  f"Sheets API вызовов клиентом: {self.api_calls}")
         except Exception as e:
             print(f"[ERROR] Не удалось выполнить batch-запись после всех retry: {e}")
-            self._save_failed_flush(rows_to_write)
-            self._batch_rows.clear()
+            for ws, rows in pending.items():
+                rows = [row for row, keep in zip(rows, fallback_flags.get(ws, [])) if keep]
+                if not rows:
+                    continue
+                headers = self._merge_headers(self._sheet_headers.get(ws, []), rows)
+                self._save_failed_flush(ws, headers, [[row.get(h, "") for h in headers] for row in rows])
             raise
 
-    def _save_failed_flush(self, rows: List[List[Any]]):
-        """Сохраняет неотправленные строки в JSON-файл как fallback."""
+    def _save_failed_flush(self, worksheet_name: str, headers: List[str], rows: List[List[Any]]):
+        """Сохраняет неотправленные строки листа в JSON-файл как fallback."""
         os.makedirs(FAILED_FLUSH_DIR, exist_ok=True)
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         path = os.path.join(FAILED_FLUSH_DIR, f"failed_flush_{timestamp}.json")
+        suffix = 1
+        while os.path.exists(path):
+            suffix += 1
+            path = os.path.join(FAILED_FLUSH_DIR, f"failed_flush_{timestamp}_{suffix}.json")
         payload = {
-            "worksheet_name": self.worksheet_name,
+            "worksheet_name": worksheet_name,
             "spreadsheet_id": self.spreadsheet_id,
-            "headers": self._headers,
+            "headers": headers,
             "rows": rows,
             "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
         }
@@ -184,9 +335,10 @@ class GoogleSheetsClient:
                     os.remove(filepath)
                     continue
 
-                sheet = self.spreadsheet.worksheet(ws_name)
+                sheet = self._get_worksheet(ws_name)
 
                 def _do_retry_flush():
+                    self._count_call()
                     existing = sheet.get_all_values()
                     start_row = max(4, len(existing) + 1)
                     max_len = len(headers) if headers else max((len(r) for r in rows), default=0)
@@ -195,7 +347,7 @@ class GoogleSheetsClient:
                     sheet.update(range_start, padded, value_input_option="USER_ENTERED")
                     print(f"[INFO] Retry flush: записано {len(padded)} строк в '{ws_name}' с {range_start}")
 
-                _retry_sheets_call(_do_retry_flush)
+                self._call(_do_retry_flush)
                 os.remove(filepath)
                 print(f"[INFO] Файл {filename} обработан и удалён.")
             except Exception as e:
@@ -203,9 +355,9 @@ class GoogleSheetsClient:
 
     def append_result_to_sheet(self, sheet_name: str, row: Dict[str, Any]):
         try:
-            target_sheet = self.spreadsheet.worksheet(sheet_name)
+            target_sheet = self._get_worksheet(sheet_name)
             values = list(row.values())
-            target_sheet.append_row(values, value_input_option="USER_ENTERED")
+            self._call(lambda: target_sheet.append_row(values, value_input_option="USER_ENTERED"))
         except Exception as e:
             print(f"[ERROR] Ошибка при добавлении строки в '{sheet_name}': {e}")
             raise
@@ -214,7 +366,7 @@ class GoogleSheetsClient:
         "cli": [
             "date", "project", "environment", "source", "sprint", "run_id", "tag", "type", "page", "device", "iterations",
             "P", "LCP", "INP", "CLS", "LCP_p90", "INP_p90", "CLS_p90",
-            "TBT", "FCP", "SI", "TTI", "TTFB"
+            "TBT", "FCP", "SI", "TTI", "TTFB", "concurrency"
         ],
         "api": [
             "date", "project", "environment", "source", "sprint", "run_id", "tag", "type", "page", "device", "iterations",
@@ -230,59 +382,61 @@ class GoogleSheetsClient:
     }
 
     def ensure_sheet_exists(self, sheet_name: str, source: Literal["cli", "api", "crux"]):
+        """
+        Делает sheet_name текущим листом, при необходимости создавая его из шаблона.
+        Существующий лист берётся из реестра без обращений к API.
+        """
+        try:
+            self.sheet = self._get_worksheet(sheet_name)
+            return
+        except WorksheetNotFound:
+            pass
+        from services.lighthouse.configs.config_lighthouse import TEMPLATE_SHEETS
+        template_name = TEMPLATE_SHEETS.get(source.lower())
+        created: Dict[str, Any] = {}  # лист, созданный прошлой попыткой: повтор не создаёт его заново
+        attempts = [0]
+
         def _do_ensure():
-            spreadsheet = self.client.open_by_key(self.spreadsheet_id)
-            sheet_titles = [ws.title for ws in spreadsheet.worksheets()]
-            if sheet_name not in sheet_titles:
-                from services.lighthouse.configs.config_lighthouse import TEMPLATE_SHEETS
-                template_name = TEMPLATE_SHEETS.get(source.lower())
-                if template_name and template_name in sheet_titles:
-                    print(f"[INFO] Создаём лист '{sheet_name}' из шаблона '{template_name}'...")
-                    template_sheet = spreadsheet.worksheet(template_name)
-                    spreadsheet.duplicate_sheet(template_sheet.id, new_sheet_name=sheet_name)
-                else:
-                    print(f"[INFO] Создаём лист '{sheet_name}' с заголовками по умолчанию...")
-                    new_sheet = spreadsheet.add_worksheet(title=sheet_name, rows=200, cols=60)
-                    headers = self.DEFAULT_HEADERS.get(source.lower(), [])
-                    if headers:
-                        new_sheet.update('1:1', [headers])
-                self.sheet = spreadsheet.worksheet(sheet_name)
-            else:
-                self.sheet = spreadsheet.worksheet(sheet_name)
+            attempts[0] += 1
+            new_sheet = created.get("sheet")
+            if new_sheet is None:
+                # Повтор после сбоя или гонка с другим процессом: лист мог уже появиться
+                registry = self._worksheet_registry(refresh=attempts[0] > 1)
+                if sheet_name in registry:
+                    self.sheet = registry[sheet_name]
+                    return
+                try:
+                    if template_name and template_name in registry:
+                        print(f"[INFO] Создаём лист '{sheet_name}' из шаблона '{template_name}'...")
+                        self._count_call()
+                        new_sheet = self.spreadsheet.duplicate_sheet(registry[template_name].id,
+                                                                     new_sheet_name=sheet_name)
+                        self.duplicated_sheets[sheet_name] = template_name
+                    else:
+                        print(f"[INFO] Создаём лист '{sheet_name}' с заголовками по умолчанию...")
+                        self._count_call()
+                        new_sheet = self.spreadsheet.add_worksheet(title=sheet_name, rows=200, cols=60)
+                        created["headers"] = self.DEFAULT_HEADERS.get(source.lower(), [])
+                except APIError as e:
+                    if not self._is_already_exists_error(e):
+                        raise
+                    # Лист создан параллельно — берём его из перечитанного реестра
+                    self.sheet = self._get_worksheet(sheet_name)
+                    return
+                created["sheet"] = new_sheet
+                registry[sheet_name] = new_sheet
+            if created.get("headers"):
+                self._count_call()
+                new_sheet.update('1:1', [created["headers"]])
+                created["headers"] = None
+            self.sheet = new_sheet
 
         try:
-            _retry_sheets_call(_do_ensure)
+            _retry_sheets_call(_do_ensure, cost=2)
         except Exception as e:
             print(f"[ERROR] Ошибка при создании листа: {e}")
             raise
 
-    def _get_or_create_headers(self, data: Dict[str, Any]) -> List[str]:
-        # Возвращаем кэш если headers уже загружены и все ключи присутствуют
-        if self._headers_cached and self._headers:
-            missing = [k for k in data.keys() if k not in self._headers]
-            if not missing:
-                return self._headers
-
-        def _do_headers():
-            try:
-                current_headers = self.sheet.row_values(1)
-            except APIError:
-                current_headers = []
-            if not current_headers:
-                headers = list(data.keys())
-                self.sheet.insert_row(headers, index=1)
-                return headers
-            missing = [k for k in data.keys() if k not in current_headers]
-            if missing:
-                updated = current_headers + missing
-                self.sheet.update('1:1', [updated])
-                return updated
-            return current_headers
-
-        result = _retry_sheets_call(_do_headers)
-        self._headers_cached = True
-        return result
-
     def _normalize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         normalized = {}
         for k, v in data.items():
@@ -301,16 +455,32 @@ class GoogleSheetsClient:
 
     @classmethod
     def read_dashboard_sprint_context(cls, credentials_path: str, spreadsheet_id: str, project: str) -> Dict[str, Any]:
-        client = cls(credentials_path=credentials_path, spreadsheet_id=spreadsheet_id, worksheet_name=f"Dashboard [{project}]")
-        sheet = client.sheet
-        current_sprint = str(sheet.acell("E5").value or "").strip()
-        previous_increment = str(sheet.acell("E6").value or "").strip()
+        """
+        Читает E5 (спринт), E6 (предыдущий инкремент) и D9:G9 (rollout DEV..PROD)
+        листа `Dashboard [project]` одним values_batch_get — без открытия листа.
+        Кэширование — services/lighthouse/dashboard_context.py.
+        """
+        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+        credentials = Credentials.from_service_account_file(credentials_path, scopes=scopes)
+        spreadsheet = _retry_sheets_call(lambda: gspread.authorize(credentials).open_by_key(spreadsheet_id))
+
+        sheet_name = f"Dashboard [{project}]"
+        ranges = [cls.a1_range(sheet_name, cells) for cells in ("E5", "E6", "D9:G9")]
+        response = _retry_sheets_call(lambda: spreadsheet.values_batch_get(ranges))
+        value_ranges = [vr.get("values") or [[]] for vr in response.get("valueRanges", [])]
+        value_ranges += [[[]]] * (len(ranges) - len(value_ranges))
+
+        def _cell(index: int) -> str:
+            row = value_ranges[index][0]
+            return str(row[0] if row else "").strip()
+
+        rollout_row = value_ranges[2][0]
         rollout = {
-            "DEV": sheet.acell("D9").value == "TRUE",
-            "TEST": sheet.acell("E9").value == "TRUE",
-            "STAGE": sheet.acell("F9").value == "TRUE",
-            "PROD": sheet.acell("G9").value == "TRUE",
+            env: index < len(rollout_row) and rollout_row[index] == "TRUE"
+            for index, env in enumerate(("DEV", "TEST", "STAGE", "PROD"))
         }
+        current_sprint = _cell(0)
+        previous_increment = _cell(1)
         has_any_rollout = any(rollout.values())
         return {
             "current_sprint": current_sprint,
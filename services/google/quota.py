@@ -0,0 +1,236 @@
+"""
+Межпроцессный token bucket для квот Google API (Sheets, PageSpeed).
+
+Состояние ведра хранится в SQLite-файле. Каждое изменение идёт в транзакции
+BEGIN IMMEDIATE — это атомарно для всех процессов и работает на Windows/Linux
+(в отличие от fcntl). Все процессы — MCP-воркеры, пул CLI, скрипты — видят:
+  - общий запас токенов: пока квота минуты не выбрана, вызовы идут без пауз;
+  - общий backoff после 429: один процесс получил 429 — ждут все.
+Там же ведётся дневной журнал расхода (DailyQuota) — для квот "N запросов в сутки".
+
+Использование:
+    bucket = SharedTokenBucket("sheets", per_minute=60)
+    bucket.acquire()              # блокирует, пока нет токена
+    bucket.report_backoff(8.0)    # после 429: пауза для всех процессов
+
+    daily = DailyQuota("psi", daily_limit=25000)
+    daily.consume()               # DailyQuotaExceededError, если лимит суток выбран
+"""
+
+import os
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_QUOTA_DIR = Path(__file__).resolve().parents[2] / "Reports" / "reports_lighthouse" / ".sheets_locks"
+DEFAULT_QUOTA_DB = DEFAULT_QUOTA_DIR / "quota.sqlite3"
+
+_MAX_SLEEP = 1.0  # перепроверяем ведро не реже раза в секунду — backoff могут продлить
+QUOTA_TIMEZONE = "America/Los_Angeles"  # дневные квоты Google обнуляются в полночь по тихоокеанскому времени
+
+
+class QuotaTimeoutError(TimeoutError):
+    """Токен не получен за отведённое время."""
+
+
+class DailyQuotaExceededError(RuntimeError):
+    """Дневной лимит запросов исчерпан."""
+
+
+def _quota_path(path: Optional[Path]) -> Path:
+    path = Path(path or os.getenv("GS_QUOTA_DB") or DEFAULT_QUOTA_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _connect(path: Path):
+    # isolation_level=None — транзакциями управляем сами (BEGIN IMMEDIATE)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+class SharedTokenBucket:
+    """
+    Token bucket, общий для всех процессов, работающих с одним файлом состояния.
+
+    :param name: Имя ведра (одна БД может хранить несколько: "sheets", "psi", ...).
+    :param per_minute: Квота запросов в минуту — скорость пополнения.
+    :param capacity: Максимальный burst (по умолчанию = per_minute).
+    :param path: SQLite-файл состояния (по умолчанию GS_QUOTA_DB или Reports/.../quota.sqlite3).
+    """
+
+    def __init__(self, name: str, per_minute: float, capacity: Optional[float] = None,
+                 path: Optional[Path] = None):
+        if per_minute <= 0:
+            raise ValueError("per_minute должен быть > 0")
+        self.name = name
+        self.per_minute = float(per_minute)
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.rate = self.per_minute / 60.0
+        self.path = _quota_path(path)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, "
+                "blocked_until REAL NOT NULL DEFAULT 0)"
+            )
+
+    def _connect(self):
+        return _connect(self.path)
+
+    def _locked(self, conn: sqlite3.Connection, now: float) -> tuple:
+        """Берёт write-lock и возвращает (tokens, blocked_until) с учётом пополнения."""
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT tokens, updated_at, blocked_until FROM buckets WHERE name = ?",
+                           (self.name,)).fetchone()
+        if row is None:
+            return self.capacity, 0.0
+        tokens, updated_at, blocked_until = row
+        tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+        return tokens, blocked_until
+
+    def _store(self, conn: sqlite3.Connection, tokens: float, now: float, blocked_until: float) -> None:
+        conn.execute(
+            "INSERT INTO buckets (name, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at, "
+            "blocked_until = excluded.blocked_until",
+            (self.name, tokens, now, blocked_until),
+        )
+        conn.execute("COMMIT")
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Пытается взять токены без ожидания.
+        :return: 0.0 — токены взяты; иначе сколько секунд подождать до следующей попытки.
+        """
+        with self._connect() as conn:
+            now = time.time()
+            available, blocked_until = self._locked(conn, now)
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif available >= tokens:
+                self._store(conn, available - tokens, now, blocked_until)
+                return 0.0
+            else:
+                wait = (tokens - available) / self.rate
+            self._store(conn, available, now, blocked_until)
+            return wait
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> float:
+        """
+        Блокирует до получения токенов. Возвращает, сколько секунд пришлось ждать.
+        :raises QuotaTimeoutError: если задан timeout и он истёк.
+        """
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return time.monotonic() - started
+            if timeout is not None and time.monotonic() - started + wait > timeout:
+                raise QuotaTimeoutError(f"Квота '{self.name}': токен не получен за {timeout:.0f}с")
+            # Небольшой jitter разводит процессы, проснувшиеся одновременно
+            time.sleep(min(wait, _MAX_SLEEP) + random.uniform(0, 0.05))
+
+    def report_backoff(self, seconds: float) -> None:
+        """Сообщает о 429: все процессы ждут `seconds`, запас токенов обнуляется."""
+        with self._connect() as conn:
+            now = time.time()
+            _, blocked_until = self._locked(conn, now)
+            self._store(conn, 0.0, now, max(blocked_until, now + seconds))
+
+    def status(self) -> dict:
+        """Текущее состояние ведра (без изменения)."""
+        with self._connect() as conn:
+            now = time.time()
+            tokens, blocked_until = self._locked(conn, now)
+            conn.execute("ROLLBACK")
+        return {
+            "name": self.name,
+            "tokens": round(tokens, 2),
+            "capacity": self.capacity,
+            "per_minute": self.per_minute,
+            "backoff_seconds": round(max(0.0, blocked_until - now), 1),
+        }
+
+
+class DailyQuota:
+    """
+    Дневной журнал расхода квоты, общий для всех процессов (тот же SQLite-файл, что у ведер).
+
+    :param name: Имя квоты ("psi", ...).
+    :param daily_limit: Лимит запросов в сутки.
+    :param path: SQLite-файл состояния (по умолчанию GS_QUOTA_DB или Reports/.../quota.sqlite3).
+    :param tz: Часовой пояс, в котором считаются сутки (по умолчанию — как у квот Google).
+    """
+
+    def __init__(self, name: str, daily_limit: int, path: Optional[Path] = None, tz: str = QUOTA_TIMEZONE):
+        if daily_limit <= 0:
+            raise ValueError("daily_limit должен быть > 0")
+        self.name = name
+        self.daily_limit = int(daily_limit)
+        self.path = _quota_path(path)
+        try:
+            self._tz = ZoneInfo(tz)
+        except ZoneInfoNotFoundError:
+            # Windows без пакета tzdata — считаем сутки по UTC
+            self._tz = timezone.utc
+        with _connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS daily_usage ("
+                "name TEXT NOT NULL, day TEXT NOT NULL, used INTEGER NOT NULL, "
+                "PRIMARY KEY (name, day))"
+            )
+
+    def _today(self) -> str:
+        return datetime.now(self._tz).strftime("%Y-%m-%d")
+
+    def _used(self, conn: sqlite3.Connection, day: str) -> int:
+        row = conn.execute("SELECT used FROM daily_usage WHERE name = ? AND day = ?", (self.name, day)).fetchone()
+        return row[0] if row else 0
+
+    def consume(self, count: int = 1) -> int:
+        """
+        Списывает count запросов из лимита текущих суток. Возвращает остаток.
+        :raises DailyQuotaExceededError: если лимит не позволяет списать count.
+        """
+        day = self._today()
+        with _connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            used = self._used(conn, day)
+            if used + count > self.daily_limit:
+                conn.execute("ROLLBACK")
+                raise DailyQuotaExceededError(
+                    f"Квота '{self.name}': дневной лимит {self.daily_limit} исчерпан ({day})")
+            conn.execute(
+                "INSERT INTO daily_usage (name, day, used) VALUES (?, ?, ?) "
+                "ON CONFLICT(name, day) DO UPDATE SET used = excluded.used",
+                (self.name, day, used + count),
+            )
+            conn.execute("COMMIT")
+        return self.daily_limit - used - count
+
+    def remaining(self) -> int:
+        """Сколько запросов осталось на текущие сутки."""
+        return self.status()["remaining"]
+
+    def status(self) -> dict:
+        """Расход за текущие сутки (без изменения)."""
+        day = self._today()
+        with _connect(self.path) as conn:
+            used = self._used(conn, day)
+        return {
+            "name": self.name,
+            "day": day,
+            "used": used,
+            "limit": self.daily_limit,
+            "remaining": max(0, self.daily_limit - used),
+        }
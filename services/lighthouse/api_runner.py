@@ -1,4 +1,5 @@
 # 📌 Google Lighthouse API (будет добавлен позже)
+import asyncio
 import json
 import os
 import random
@@ -6,15 +7,21 @@ import time
 import urllib.error
 import urllib.parse
 import urllib.request
-from typing import List, Optional
+from typing import Callable, List, Optional
 
+from services.google.quota import DailyQuotaExceededError
 
-def _retry_request(url: str, max_retries: int = 5, base_delay: float = 2.0) -> bytes:
+PSI_ENDPOINT = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+
+
+def _retry_request(url: str, max_retries: int = 5, base_delay: float = 2.0, rate_limiter=None) -> bytes:
     """
     Выполняет HTTP-запрос с retry и exponential backoff.
 
     При 429/5xx — ждёт base_delay * 2^attempt + jitter, повторяет.
     При 429 — парсит Retry-After header если есть.
+    rate_limiter (RateLimiter из pagespeed_service) — при 429 пауза объявляется всем
+    процессам через общую квоту, повтор ждёт токен в ней же.
     """
     for attempt in range(max_retries + 1):
         try:
@@ -40,7 +47,11 @@ def _retry_request(url: str, max_retries: int = 5, base_delay: float = 2.0) -> b
             jitter = random.uniform(0, delay * 0.3)
             total_delay = delay + jitter
             print(f"[RETRY] HTTP {status}, попытка {attempt + 1}/{max_retries + 1}, ожидание {total_delay:.1f}с...")
-            time.sleep(total_delay)
+            if status == 429 and rate_limiter is not None:
+                rate_limiter.report_backoff(total_delay)
+                rate_limiter.acquire()
+            else:
+                time.sleep(total_delay)
 
         except urllib.error.URLError as e:
             if attempt == max_retries:
@@ -56,13 +67,15 @@ def run_api_lighthouse(
     categories: Optional[List[str]] = None,
     api_key: Optional[str] = None,
     save_path: Optional[str] = None,
-    mode: str = "lab"
+    mode: str = "lab",
+    rate_limiter=None
 ) -> dict:
     """
     Выполняет запрос к Google PageSpeed Insights API и сохраняет JSON-результат.
+    rate_limiter — общая квота PSI для повторов после 429 (см. _retry_request).
     """
 
-    base_url = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+    base_url = PSI_ENDPOINT
 
     if api_key is None:
         api_key = os.getenv("API_KEY")
@@ -83,7 +96,7 @@ def run_api_lighthouse(
     full_url = f"{base_url}?{encoded_params}"
 
     try:
-        raw = _retry_request(full_url)
+        raw = _retry_request(full_url, rate_limiter=rate_limiter)
         result = json.loads(raw.decode())
 
         if save_path:
@@ -101,3 +114,147 @@ def run_api_lighthouse(
     except Exception as e:
         print(f"[ERROR] Ошибка при выполнении запроса к API: {e}")
         return {}
+
+
+def _retry_delay(status: Optional[int], retry_after: Optional[str], attempt: int, base_delay: float) -> float:
+    """Задержка перед повтором: Retry-After (для 429) или exponential backoff, плюс jitter."""
+    delay = base_delay * (2 ** attempt)
+    if status == 429 and retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            pass
+    return delay + random.uniform(0, delay * 0.3)
+
+
+class AsyncPageSpeedClient:
+    """
+    Асинхронный клиент PageSpeed Insights: до `concurrency` запросов одновременно.
+
+    - Один requests.Session с пулом keep-alive соединений на `concurrency` сокетов;
+      блокирующий вызов уходит в asyncio.to_thread.
+    - Перед каждым запросом берётся токен из rate_limiter (объект с try_acquire() -> секунды
+      до следующего токена и report_backoff(), например RateLimiter из pagespeed_service);
+      ожидание — asyncio.sleep.
+    - Повторы по 429/5xx соблюдают Retry-After и ждут через asyncio.sleep,
+      не задерживая остальные запросы.
+
+    Использование:
+        with AsyncPageSpeedClient(concurrency=4, rate_limiter=limiter) as client:
+            results = client.run_many_sync(urls, strategy="mobile")
+    """
+
+    def __init__(self, api_key: Optional[str] = None, concurrency: int = 4, rate_limiter=None,
+                 max_retries: int = 5, base_delay: float = 2.0, timeout: float = 120.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.api_key = api_key or os.getenv("API_KEY")
+        if not self.api_key:
+            raise ValueError("❌ API Key не указан. Установите переменную окружения API_KEY или передайте явно.")
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.timeout = timeout
+
+        self._requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self) -> "AsyncPageSpeedClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    async def _acquire_token(self) -> None:
+        if self.rate_limiter is None:
+            return
+        while True:
+            wait = self.rate_limiter.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _get_json(self, params: dict) -> dict:
+        for attempt in range(self.max_retries + 1):
+            await self._acquire_token()
+            try:
+                response = await asyncio.to_thread(self.session.get, PSI_ENDPOINT, params=params,
+                                                   timeout=self.timeout)
+            except self._requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = _retry_delay(None, None, attempt, self.base_delay)
+                print(f"[RETRY] {type(e).__name__}, попытка {attempt + 1}/{self.max_retries + 1}, ожидание {delay:.1f}с...")
+                await asyncio.sleep(delay)
+                continue
+
+            status = response.status_code
+            if status < 400:
+                return response.json()
+            is_retryable = status == 429 or status >= 500
+            if not is_retryable or attempt == self.max_retries:
+                print(f"[ERROR] HTTP {status} на попытке {attempt + 1}/{self.max_retries + 1}, retry исчерпаны")
+                response.raise_for_status()
+            delay = _retry_delay(status, response.headers.get("Retry-After"), attempt, self.base_delay)
+            print(f"[RETRY] HTTP {status}, попытка {attempt + 1}/{self.max_retries + 1}, ожидание {delay:.1f}с...")
+            if status == 429 and self.rate_limiter is not None:
+                # Пауза для всех процессов; ждём её в _acquire_token перед повтором
+                self.rate_limiter.report_backoff(delay)
+            else:
+                await asyncio.sleep(delay)
+        return {}
+
+    async def run(self, url: str, strategy: str = "mobile", categories: Optional[List[str]] = None,
+                  mode: str = "lab") -> dict:
+        """Один прогон PSI. Как run_api_lighthouse: при ошибке — {}, кроме исчерпанной дневной квоты."""
+        params = [("url", url), ("strategy", strategy), ("key", self.api_key)]
+        params += [("category", category) for category in categories or []]
+        try:
+            result = await self._get_json(params)
+            if mode == "field":
+                return result.get("loadingExperience", {})
+            elif mode == "lab":
+                return result.get("lighthouseResult", {})
+            else:
+                raise ValueError(f"Неверный режим: {mode}")
+        except DailyQuotaExceededError:
+            raise
+        except Exception as e:
+            print(f"[ERROR] Ошибка при выполнении запроса к API ({url}): {e}")
+            return {}
+
+    async def run_many(self, urls: List[str], strategy: str = "mobile",
+                       categories: Optional[List[str]] = None, mode: str = "lab",
+                       on_result: Optional[Callable[[int, dict], None]] = None,
+                       should_stop: Optional[Callable[[], bool]] = None) -> List[dict]:
+        """
+        Прогоны по списку URL (повторы допустимы); результаты — в порядке urls.
+        on_result(index, result) вызывается по мере завершения каждого запроса.
+        should_stop() -> True — ещё не начатые запросы не отправляются (результат {}).
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _bounded(index: int, url: str) -> dict:
+            async with semaphore:
+                if should_stop and should_stop():
+                    return {}
+                result = await self.run(url, strategy, categories, mode)
+            if on_result:
+                on_result(index, result)
+            return result
+
+        return list(await asyncio.gather(*(_bounded(index, url) for index, url in enumerate(urls))))
+
+    def run_many_sync(self, urls: List[str], strategy: str = "mobile",
+                      categories: Optional[List[str]] = None, mode: str = "lab",
+                      on_result: Optional[Callable[[int, dict], None]] = None,
+                      should_stop: Optional[Callable[[], bool]] = None) -> List[dict]:
+        """Синхронная обёртка над run_many для кода без event loop."""
+        return asyncio.run(self.run_many(urls, strategy, categories, mode, on_result, should_stop))
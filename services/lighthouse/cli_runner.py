@@ -7,24 +7,21 @@
 """
 
 import json
+import multiprocessing
 import os
 import shutil
+import signal
 import subprocess
 import platform
 import sys
-import builtins
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
 
 from services.lighthouse.configs.config_lighthouse import get_temp_dir_for_route
+from services.lighthouse.log_utils import print
 from services.lighthouse.processor_lighthouse import parse_lighthouse_results
 
-def print(*args, **kwargs):
-    try:
-        builtins.print(*args, **kwargs)
-    except OSError:
-        # В batch/MCP режиме поток логов может оказаться закрыт.
-        # Ошибка логирования не должна обрывать сам запуск Lighthouse.
-        pass
 
 def find_lighthouse_cmd():
     """
@@ -74,6 +71,27 @@ LIGHTHOUSE_CMD = find_lighthouse_cmd()
 _lighthouse_checked = False  # Флаг, чтобы проверять окружение только один раз
 CONFIG_DIR = os.path.join(os.path.dirname(__file__), "configs")
 
+# Тяжёлые артефакты отчёта, которые processor_lighthouse никогда не читает:
+# base64-миниатюры, финальный скриншот и treemap JS-бандлов.
+# Speed Index считается по трейсу и от screenshot-thumbnails не зависит.
+LEAN_SKIP_AUDITS = ["screenshot-thumbnails", "final-screenshot", "script-treemap-data"]
+
+# Дедлайн одной итерации: зависший Chrome не должен блокировать воркер навсегда
+ITERATION_TIMEOUT = float(os.getenv("LIGHTHOUSE_ITERATION_TIMEOUT", "300"))
+KILL_GRACE_SECONDS = 10.0  # сколько ждать корректного завершения после SIGINT
+STOP_POLL_SECONDS = 1.0    # как часто проверять отмену, пока идёт итерация
+
+# Событие отмены в процессах пула run_local_lighthouse_parallel (см. _init_parallel_worker)
+_worker_stop_event = None
+
+
+class LighthouseTimeoutError(RuntimeError):
+    """Итерация Lighthouse не уложилась в ITERATION_TIMEOUT и была остановлена."""
+
+
+class LighthouseCancelledError(RuntimeError):
+    """Итерация Lighthouse остановлена по запросу отмены."""
+
 
 def check_lighthouse_environment():
     """
@@ -136,6 +154,208 @@ def load_device_config(device: str) -> dict | None:
     return None
 
 
+def _resolve_device_settings(device: str) -> tuple:
+    """
+    Возвращает (preset, screen_emulation, throttling, throttling_method) для устройства.
+    """
+    config = load_device_config(device)
+    if config:
+        print(f"[INFO] Используется конфигурация для устройства: {device}")
+        form_factor = config.get("settings", {}).get("formFactor", "desktop")
+        # --preset принимает только "desktop", "perf", "experimental"; для mobile не передаём
+        preset = "desktop" if form_factor == "desktop" else None
+        screen_emulation = config.get("settings", {}).get("screenEmulation", {})
+        throttling = config.get("settings", {}).get("throttling", {})
+        throttling_method = config.get("settings", {}).get("throttlingMethod", "simulate")
+    else:
+        print(f"[WARNING] Конфигурация для устройства '{device}' не найдена. Используются дефолтные параметры.")
+        preset = "desktop"
+        screen_emulation = {}
+        throttling = {}
+        throttling_method = "simulate"
+    return preset, screen_emulation, throttling, throttling_method
+
+
+def _build_report_path(temp_dir, route_key: str, iteration: int, environment: str | None) -> str:
+    date = datetime.now().strftime("%d-%m-%y")
+    environment_label = (environment or os.getenv("ENVIRONMENT") or "local").replace(" ", "_")
+    return os.path.join(
+        temp_dir,
+        f"Report_CLI_{date}_{environment_label}_{route_key}_iter_{iteration}.json",
+    )
+
+
+def _kill_process_tree(process: subprocess.Popen) -> None:
+    """
+    Останавливает Lighthouse вместе с его Chrome.
+
+    POSIX: процесс запущен в своей группе (start_new_session). Сначала SIGINT группе —
+    chrome-launcher по нему сам закрывает Chrome (тот живёт в отдельной detached-группе),
+    через KILL_GRACE_SECONDS — SIGKILL всем оставшимся. Windows: taskkill /T /F по дереву.
+    """
+    if process.poll() is not None:
+        return
+    if sys.platform == "win32":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True,
+                       **_subprocess_kwargs())
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGINT)
+            process.wait(timeout=KILL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+        except ProcessLookupError:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    try:
+        process.wait(timeout=KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def _process_group_kwargs(kwargs: dict) -> dict:
+    """Дополняет kwargs Popen запуском в своей группе процессов — для _kill_process_tree."""
+    if sys.platform == "win32":
+        kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return kwargs
+
+
+def _run_with_deadline(command: list, timeout: float | None = None, should_stop=None,
+                       **kwargs) -> subprocess.CompletedProcess:
+    """
+    Аналог subprocess.run(capture_output=True, text=True) с дедлайном и кооперативной отменой.
+    Процесс запускается в своей группе; по таймауту или should_stop() дерево процессов убивается.
+
+    :raises LighthouseTimeoutError: Процесс не завершился за timeout секунд.
+    :raises LighthouseCancelledError: should_stop() вернул True.
+    """
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                               **_process_group_kwargs(kwargs))
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        wait_seconds = STOP_POLL_SECONDS if should_stop else None
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+            wait_seconds = remaining if wait_seconds is None else min(wait_seconds, remaining)
+        try:
+            stdout, stderr = process.communicate(timeout=wait_seconds)
+            return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            if should_stop and should_stop():
+                _kill_process_tree(process)
+                process.communicate()
+                raise LighthouseCancelledError("Итерация Lighthouse отменена")
+            if deadline is not None and time.monotonic() >= deadline:
+                _kill_process_tree(process)
+                process.communicate()
+                raise LighthouseTimeoutError(f"Lighthouse не завершился за {timeout:.0f}с")
+
+
+def run_lighthouse_iteration(
+        route_key: str,
+        route_url: str,
+        report_file: str,
+        device: str = "desktop",
+        mode: str = "navigation",
+        categories: list = None,
+        user_agent: str = None,
+        strategy: str = None,
+        iteration: int = 1,
+        device_settings: tuple | None = None,
+        isolated_tmp_dir: str | None = None,
+        lean_report: bool = True,
+        timeout: float | None = None,
+        should_stop=None) -> str | None:
+    """
+    Выполняет одну итерацию Lighthouse CLI и возвращает путь к JSON-отчёту.
+
+    :param report_file: Путь, куда Lighthouse запишет отчёт.
+    :param device_settings: Результат _resolve_device_settings (чтобы не читать конфиг на каждой итерации).
+    :param isolated_tmp_dir: Отдельный TMPDIR для процесса — chrome-launcher создаёт
+                             в нём профиль Chrome, параллельные прогоны не пересекаются.
+    :param lean_report: Не собирать скриншоты/treemap/full-page screenshot (LEAN_SKIP_AUDITS).
+    :param timeout: Дедлайн итерации в секундах (по умолчанию ITERATION_TIMEOUT).
+    :param should_stop: Callable() -> bool — проверка отмены во время итерации.
+    :return: Путь к отчёту или None, если отчёт не создан.
+    :raises RuntimeError: Если Lighthouse завершился с ошибкой и не создал отчёт.
+    :raises LighthouseTimeoutError: Итерация не уложилась в timeout (Chrome убит).
+    :raises LighthouseCancelledError: Итерация отменена через should_stop (Chrome убит).
+    """
+    if categories is None:
+        categories = ["performance", "accessibility", "best-practices", "seo"]
+    preset, screen_emulation, throttling, throttling_method = device_settings or _resolve_device_settings(device)
+
+    # Формируем базовую команду
+    command = [
+        LIGHTHOUSE_CMD, route_url,
+        "--output=json",
+        f"--output-path={report_file}",
+        "--chrome-flags=--headless --no-sandbox",
+        f"--emulated-form-factor={device}",
+        f"--throttling-method={throttling_method}",
+        f"--mode={mode}",
+        f"--only-categories={','.join(categories)}"
+    ]
+
+    if preset:
+        command.append(f"--preset={preset}")
+
+    if lean_report:
+        command.append(f"--skip-audits={','.join(LEAN_SKIP_AUDITS)}")
+        command.append("--disable-full-page-screenshot")
+
+    # Параметры эмуляции экрана
+    if screen_emulation:
+        if "width" in screen_emulation:
+            command.append(f"--emulated-screen-width={screen_emulation['width']}")
+        if "height" in screen_emulation:
+            command.append(f"--emulated-screen-height={screen_emulation['height']}")
+        if "deviceScaleRatio" in screen_emulation:
+            command.append(f"--emulated-device-scale-factor={screen_emulation['deviceScaleRatio']}")
+
+    # Дополнительные параметры
+    if user_agent:
+        command.append(f"--extra-headers=\"User-Agent: {user_agent}\"")
+    if throttling:
+        for key, value in throttling.items():
+            command.append(f"--throttling.{key}={value}")
+    if strategy:
+        command.append(f"--strategy={strategy}")
+
+    kwargs = _subprocess_kwargs()
+    if isolated_tmp_dir:
+        os.makedirs(isolated_tmp_dir, exist_ok=True)
+        env = os.environ.copy()
+        env.update({"TMPDIR": isolated_tmp_dir, "TEMP": isolated_tmp_dir, "TMP": isolated_tmp_dir})
+        kwargs["env"] = env
+
+    print(f"[INFO] Запуск Lighthouse для: {route_url} - {device}, итерация {iteration}")
+    print(f"[DEBUG] Команда: {' '.join(command)}")
+
+    try:
+        result = _run_with_deadline(command, timeout or ITERATION_TIMEOUT, should_stop, **kwargs)
+    finally:
+        if isolated_tmp_dir:
+            shutil.rmtree(isolated_tmp_dir, ignore_errors=True)
+
+    if not os.path.exists(report_file):
+        if result.returncode != 0:
+            print(f"[ERROR] Lighthouse завершился с ошибкой: {result.stderr}")
+            raise RuntimeError(f"Ошибка при запуске Lighthouse для {route_key}")
+        print(f"[ERROR] Файл отчета не найден после итерации {iteration}: {report_file}")
+        return None
+
+    if result.returncode != 0:
+        print(f"[WARNING] Lighthouse завершился с ненулевым кодом, но отчёт создан. Продолжаем.")
+
+    return report_file
+
+
 def run_local_lighthouse(
         route_key: str,
         route_url: str,
@@ -145,7 +365,10 @@ def run_local_lighthouse(
         categories: list = None,
         user_agent: str = None,
         strategy: str = None,
-        environment: str | None = None):
+        environment: str | None = None,
+        start_iteration: int = 1,
+        lean_report: bool = True,
+        should_stop=None):
     """
     Запускает Lighthouse CLI для указанного роута с заданными параметрами.
 
@@ -157,100 +380,167 @@ def run_local_lighthouse(
     :param categories: Список категорий для анализа.
     :param user_agent: Пользовательский агент для эмуляции.
     :param strategy: Стратегия тестирования ("desktop" или "mobile").
+    :param start_iteration: Номер первой итерации (для дозапуска в адаптивном режиме).
+    :param lean_report: Облегчённый отчёт без тяжёлых артефактов (см. LEAN_SKIP_AUDITS).
+    :param should_stop: Callable() -> bool — отмена: текущая итерация убивается, остальные не запускаются.
     :return: Список путей к JSON-отчётам.
     """
     check_lighthouse_environment()
 
-    # Категории по умолчанию
-    if categories is None:
-        categories = ["performance", "accessibility", "best-practices", "seo"]
-
     # Создаём временную директорию для отчетов
     temp_dir = get_temp_dir_for_route(route_key, device, prefix="CLI", environment=environment)
 
     results = []
     json_paths = []
 
-    date = datetime.now().strftime("%d-%m-%y")
-    environment_label = (environment or os.getenv("ENVIRONMENT") or "local").replace(" ", "_")
-
     # Загружаем конфигурацию устройства
-    config = load_device_config(device)
-    if config:
-        print(f"[INFO] Используется конфигурация для устройства: {device}")
-        form_factor = config.get("settings", {}).get("formFactor", "desktop")
-        # --preset принимает только "desktop", "perf", "experimental"; для mobile не передаём
-        preset = "desktop" if form_factor == "desktop" else None
-        screen_emulation = config.get("settings", {}).get("screenEmulation", {})
-        throttling = config.get("settings", {}).get("throttling", {})
-        throttling_method = config.get("settings", {}).get("throttlingMethod", "simulate")
-    else:
-        print(f"[WARNING] Конфигурация для устройства '{device}' не найдена. Используются дефолтные параметры.")
-        preset = "desktop"
-        screen_emulation = {}
-        throttling = {}
-        throttling_method = "simulate"
+    device_settings = _resolve_device_settings(device)
 
     try:
-        for iteration in range(1, iteration_count + 1):
-            report_file = os.path.join(
-                temp_dir,
-                f"Report_CLI_{date}_{environment_label}_{route_key}_iter_{iteration}.json",
-            )
-
-            # Формируем базовую команду
-            command = [
-                LIGHTHOUSE_CMD, route_url,
-                "--output=json",
-                f"--output-path={report_file}",
-                "--chrome-flags=--headless --no-sandbox",
-                f"--emulated-form-factor={device}",
-                f"--throttling-method={throttling_method}",
-                f"--mode={mode}",
-                f"--only-categories={','.join(categories)}"
-            ]
-
-            if preset:
-                command.append(f"--preset={preset}")
-
-            # Параметры эмуляции экрана
-            if screen_emulation:
-                if "width" in screen_emulation:
-                    command.append(f"--emulated-screen-width={screen_emulation['width']}")
-                if "height" in screen_emulation:
-                    command.append(f"--emulated-screen-height={screen_emulation['height']}")
-                if "deviceScaleRatio" in screen_emulation:
-                    command.append(f"--emulated-device-scale-factor={screen_emulation['deviceScaleRatio']}")
-
-            # Дополнительные параметры
-            if user_agent:
-                command.append(f"--extra-headers=\"User-Agent: {user_agent}\"")
-            if throttling:
-                for key, value in throttling.items():
-                    command.append(f"--throttling.{key}={value}")
-            if strategy:
-                command.append(f"--strategy={strategy}")
-
-            print(f"[INFO] Запуск Lighthouse для: {route_url} - {device}, итерация {iteration}")
-            print(f"[DEBUG] Команда: {' '.join(command)}")
-
-            result = subprocess.run(command, capture_output=True, text=True, **_subprocess_kwargs())
-
-            if not os.path.exists(report_file):
-                if result.returncode != 0:
-                    print(f"[ERROR] Lighthouse завершился с ошибкой: {result.stderr}")
-                    raise RuntimeError(f"Ошибка при запуске Lighthouse для {route_key}")
-                print(f"[ERROR] Файл отчета не найден после итерации {iteration}: {report_file}")
+        for iteration in range(start_iteration, start_iteration + iteration_count):
+            if should_stop and should_stop():
+                print(f"[WARNING] {route_key}: запуск отменён перед итерацией {iteration}")
+                break
+            report_file = _build_report_path(temp_dir, route_key, iteration, environment)
+            try:
+                report_path = run_lighthouse_iteration(
+                    route_key, route_url, report_file, device,
+                    mode=mode, categories=categories, user_agent=user_agent, strategy=strategy,
+                    iteration=iteration, device_settings=device_settings,
+                    lean_report=lean_report, should_stop=should_stop,
+                )
+            except LighthouseTimeoutError as e:
+                print(f"[ERROR] {route_key}, итерация {iteration}: {e} — пропуск итерации")
+                continue
+            except LighthouseCancelledError:
+                print(f"[WARNING] {route_key}: итерация {iteration} отменена")
+                break
+            if report_path is None:
                 continue
 
-            if result.returncode != 0:
-                print(f"[WARNING] Lighthouse завершился с ненулевым кодом, но отчёт создан. Продолжаем.")
-
-            json_paths.append(report_file)
-            parsed_results = parse_lighthouse_results(report_file)
+            json_paths.append(report_path)
+            parsed_results = parse_lighthouse_results(report_path)
             results.append(parsed_results)
 
     except Exception as e:
         print(f"[ERROR] Ошибка при выполнении теста для {route_key}: {e}")
 
     return json_paths
+
+
+def _init_parallel_worker(stop_event) -> None:
+    """Инициализатор процесса пула: общее событие отмены для всех воркеров."""
+    global _worker_stop_event
+    _worker_stop_event = stop_event
+
+
+def _run_parallel_unit(unit: dict) -> dict:
+    """
+    Выполняет одну единицу (route, device, iteration) в процессе пула.
+    Возвращает путь к отчёту и интервал выполнения для расчёта конкуренции.
+    """
+    started_at = time.time()
+    report_path = None
+    error = None
+    if _worker_stop_event is not None and _worker_stop_event.is_set():
+        # Итерация уже была передана воркеру, когда пришла отмена
+        return {**unit, "report_path": None, "error": "cancelled", "started_at": started_at, "ended_at": started_at}
+    try:
+        report_path = run_lighthouse_iteration(
+            unit["route_key"], unit["route_url"], unit["report_file"], unit["device"],
+            iteration=unit["iteration"],
+            device_settings=unit.get("device_settings"),
+            isolated_tmp_dir=unit["tmp_dir"],
+            lean_report=unit.get("lean_report", True),
+            should_stop=_worker_stop_event.is_set if _worker_stop_event is not None else None,
+        )
+    except Exception as e:
+        error = str(e)
+        print(f"[ERROR] Ошибка итерации {unit['iteration']} для {unit['route_key']}: {e}")
+    return {**unit, "report_path": report_path, "error": error,
+            "started_at": started_at, "ended_at": time.time()}
+
+
+def _max_overlap(unit: dict, units: list) -> int:
+    """Сколько прогонов (включая этот) выполнялись одновременно в пике интервала unit."""
+    edges = [unit["started_at"]] + [u["started_at"] for u in units
+                                     if unit["started_at"] <= u["started_at"] < unit["ended_at"]]
+    return max(
+        sum(1 for u in units if u["started_at"] <= t < u["ended_at"])
+        for t in edges
+    )
+
+
+def run_local_lighthouse_parallel(
+        routes: list,
+        iteration_count: int = 5,
+        device: str = "desktop",
+        environment: str | None = None,
+        max_workers: int = 2,
+        lean_report: bool = True,
+        on_iteration=None,
+        should_stop=None) -> dict:
+    """
+    Запускает итерации (route, device, iteration) на ограниченном пуле процессов.
+
+    Каждая итерация — отдельный процесс Lighthouse со своим Chrome и своим TMPDIR
+    внутри директории get_temp_dir_for_route, поэтому прогоны не делят профиль браузера.
+
+    :param routes: Список пар (route_key, route_url).
+    :param max_workers: Максимум одновременно работающих Lighthouse.
+    :param on_iteration: Callable(unit) — вызывается по завершении каждой итерации
+                         (unit с route_key, iteration, report_path, error) в порядке завершения.
+    :param should_stop: Callable() -> bool, опрашивается раз в STOP_POLL_SECONDS: ожидающие итерации
+                        снимаются, идущие — останавливаются в воркерах (Chrome убивается).
+    :return: {route_key: {"json_paths": [...], "concurrency": int}}, где concurrency —
+             наибольшее число прогонов, шедших одновременно с итерациями роута.
+    """
+    check_lighthouse_environment()
+    # Конфиг устройства читается один раз здесь, а не в каждом воркере на каждую итерацию
+    device_settings = _resolve_device_settings(device)
+
+    units = []
+    for route_key, route_url in routes:
+        temp_dir = get_temp_dir_for_route(route_key, device, prefix="CLI", environment=environment)
+        for iteration in range(1, iteration_count + 1):
+            units.append({
+                "route_key": route_key,
+                "route_url": route_url,
+                "device": device,
+                "device_settings": device_settings,
+                "iteration": iteration,
+                "report_file": _build_report_path(temp_dir, route_key, iteration, environment),
+                "tmp_dir": os.path.join(temp_dir, f"tmp_iter_{iteration}"),
+                "lean_report": lean_report,
+            })
+
+    workers = max(1, min(max_workers, len(units) or 1))
+    print(f"[INFO] Параллельный запуск: {len(units)} итераций, воркеров: {workers}")
+
+    finished = []
+    stop_event = multiprocessing.Event() if should_stop else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_parallel_worker,
+                             initargs=(stop_event,)) as pool:
+        pending = {pool.submit(_run_parallel_unit, unit) for unit in units}
+        while pending:
+            done, pending = wait(pending, timeout=STOP_POLL_SECONDS if should_stop else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                finished.append(future.result())
+                if on_iteration:
+                    on_iteration(finished[-1])
+            if stop_event is not None and not stop_event.is_set() and should_stop():
+                print(f"[WARNING] Параллельный запуск отменён, снимаем {len(pending)} итераций")
+                stop_event.set()
+                for future in pending:
+                    future.cancel()
+
+    runs: dict = {route_key: {"json_paths": [], "concurrency": 1} for route_key, _ in routes}
+    for unit in sorted(finished, key=lambda u: (u["route_key"], u["iteration"])):
+        run = runs[unit["route_key"]]
+        run["concurrency"] = max(run["concurrency"], _max_overlap(unit, finished))
+        if unit["report_path"]:
+            run["json_paths"].append(unit["report_path"])
+    return runs
@@ -2,9 +2,12 @@ import configparser
 import os
 import re
 import shutil
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Literal
+from types import MappingProxyType
+from typing import Dict, Literal, Mapping, Optional, Tuple
 
 # Глобальная переменная
 BASE_URL = None # Глобальный кэш base_url
@@ -27,11 +30,6 @@ TEMPLATE_SHEETS = {
     "crux": "_ChU_Template",
 }
 
-print("[INFO] Ищу конфиг по пути:", CONFIG_PATH)
-if not os.path.exists(CONFIG_PATH):
-    raise FileNotFoundError(f"[ERROR] Файл конфигурации не найден: {CONFIG_PATH}")
-
-
 def ensure_directories_exist():
     """ Убедиться, что все необходимые директории существуют."""
     try:
@@ -42,13 +40,128 @@ def ensure_directories_exist():
         raise RuntimeError(f"[ERROR] Ошибка при создании директорий: {e}")
 
 
-def load_routes_config()-> configparser.ConfigParser:
+FileStamp = Optional[Tuple[int, int]]
+
+
+def _file_stamp(path: Path) -> FileStamp:
+    """(mtime_ns, size) файла или None, если файла нет. Размер ловит правки в пределах одного тика mtime."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_ini(path: Path) -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read(path, encoding="utf-8")
+    return config
+
+
+@dataclass(frozen=True)
+class LighthouseConfig:
+    """
+    Неизменяемый снимок base_urls.ini и routes.ini.
+
+    Файлы разбираются один раз при загрузке снимка; get_config() отдаёт один и тот же объект,
+    пока у файлов не изменились mtime/размер. Ключи опций — в нижнем регистре, как у ConfigParser.
     """
-    Загружает список тестируемых страниц из routes.ini.
+    base_urls_path: Path
+    routes_path: Path
+    stamp: Tuple[FileStamp, FileStamp]
+    current_environment: Optional[str]
+    environments: Mapping[str, Mapping[str, str]]
+    routes: Mapping[str, str]
+
+    @classmethod
+    def load(cls, base_urls_path: Path = CONFIG_PATH, routes_path: Path = ROUTES_CONFIG_PATH) -> "LighthouseConfig":
+        """Читает оба файла. Отметка берётся до чтения: правка во время чтения даст перезагрузку."""
+        base_urls_path, routes_path = Path(base_urls_path), Path(routes_path)
+        stamp = (_file_stamp(base_urls_path), _file_stamp(routes_path))
+        base_urls = _read_ini(base_urls_path)
+        routes = _read_ini(routes_path)
+        environments = {
+            section: MappingProxyType(dict(base_urls[section]))
+            for section in base_urls.sections() if section != "environments"
+        }
+        return cls(
+            base_urls_path=base_urls_path,
+            routes_path=routes_path,
+            stamp=stamp,
+            current_environment=base_urls.get("environments", "current", fallback=None),
+            environments=MappingProxyType(environments),
+            routes=MappingProxyType(dict(routes["routes"]) if routes.has_section("routes") else {}),
+        )
+
+    @property
+    def base_urls_exists(self) -> bool:
+        return self.stamp[0] is not None
+
+    def is_current(self) -> bool:
+        """Снимок соответствует файлам на диске."""
+        return self.stamp == (_file_stamp(self.base_urls_path), _file_stamp(self.routes_path))
+
+    def base_url(self, environment: str | None = None, key: str = "base_url") -> str:
+        """
+        URL контура (по умолчанию — текущего).
+        :raises KeyError: Если нет контура, ключа или секции [environments].
+        """
+        if not environment:
+            environment = self.current_environment
+            if environment is None:
+                raise KeyError("[ERROR] Отсутствует секция [environments] или ключ 'current' в base_urls.ini")
+        if environment not in self.environments:
+            raise KeyError(f"[ERROR] В base_urls.ini нет секции '{environment}'")
+        section = self.environments[environment]
+        if key.lower() not in section:
+            raise KeyError(f"[ERROR] В секции '{environment}' нет ключа '{key}'")
+        return section[key.lower()]
+
+    def route(self, route_name: str) -> str:
+        """
+        Путь роута (имя без учёта регистра — ConfigParser хранит ключи в нижнем регистре).
+        :raises KeyError: Если роут не найден в routes.ini.
+        """
+        if route_name.lower() not in self.routes:
+            raise KeyError(f"Роут '{route_name}' не найден в routes.ini")
+        return self.routes[route_name.lower()]
+
+
+_CONFIG_CACHE: Dict[Tuple[Path, Path], LighthouseConfig] = {}
+_CONFIG_LOCK = threading.Lock()
+
+
+def get_config(base_urls_path: Path = CONFIG_PATH, routes_path: Path = ROUTES_CONFIG_PATH) -> LighthouseConfig:
+    """
+    Общий снимок конфигурации для пары файлов.
+    Перечитывает файлы, только если у них изменились mtime или размер (два os.stat на вызов).
+    """
+    key = (Path(base_urls_path), Path(routes_path))
+    with _CONFIG_LOCK:
+        snapshot = _CONFIG_CACHE.get(key)
+        if snapshot is None or not snapshot.is_current():
+            snapshot = LighthouseConfig.load(*key)
+            _CONFIG_CACHE[key] = snapshot
+        return snapshot
+
+
+def invalidate_config() -> None:
+    """Сбрасывает снимки — после записи base_urls.ini в этом же процессе (смена контура)."""
+    global BASE_URL
+    with _CONFIG_LOCK:
+        _CONFIG_CACHE.clear()
+    BASE_URL = None
+
+
+def load_routes_config() -> configparser.ConfigParser:
+    """
+    Список тестируемых страниц из routes.ini в виде ConfigParser (совместимость; новый код — get_config().routes).
     :return: Объект ConfigParser с загруженными данными.
     """
     config = configparser.ConfigParser()
-    config.read(ROUTES_CONFIG_PATH, encoding="utf-8")
+    routes = get_config().routes
+    if routes:
+        config.read_dict({"routes": dict(routes)})
     return config
 
 
@@ -58,18 +171,17 @@ def get_current_environment() -> str:
     :return: Название текущего окружения.
     :raises KeyError: Если отсутствует секция [environments] или ключ 'current' в base_urls.ini.
     """
-    config = configparser.ConfigParser()
-    config.read(CONFIG_PATH, encoding="utf-8")
-    if "environments" not in config or "current" not in config["environments"]:
+    current = _load_config().current_environment
+    if current is None:
         raise KeyError("Отсутствует секция [environments] или ключ 'current' в base_urls.ini")
-    return config["environments"]["current"]
+    return current
 
 
-def _load_config():
-    if not os.path.exists(CONFIG_PATH):
+def _load_config() -> LighthouseConfig:
+    # Проверка файла — при первом чтении, а не при импорте: импорт модуля не делает I/O
+    config = get_config()
+    if not config.base_urls_exists:
         raise FileNotFoundError(f"[ERROR] Файл конфигурации не найден: {CONFIG_PATH}")
-    config = configparser.ConfigParser()
-    config.read(CONFIG_PATH, encoding="utf-8")
     return config
 
 
@@ -80,32 +192,22 @@ def get_base_url(environment: str | None = None) -> str:
     Args:
         environment: необязательное имя контура. Если передано, берём URL из секции env без смены
                      `environments.current`. Это позволяет гонять несколько процессов параллельно,
-                     не перезаписывая base_urls.ini. Если не передано — используем "current" + кеш BASE_URL.
+                     не перезаписывая base_urls.ini. Если не передано — используем "current";
+                     BASE_URL обновляется вместе со снимком конфигурации.
     :raises FileNotFoundError: Если файл конфигурации не найден.
     :raises KeyError: Если отсутствует секция или контур.
     """
     global BASE_URL
 
+    config = _load_config()
     if environment:
-        config = _load_config()
-        if environment not in config:
-            raise KeyError(f"[ERROR] В base_urls.ini нет секции '{environment}'")
-        return config[environment]["BASE_URL"]
-
-    if BASE_URL is None:
-        config = _load_config()
-
-        if "environments" not in config or "current" not in config["environments"]:
-            raise KeyError("[ERROR] Отсутствует секция [environments] или ключ 'current' в base_urls.ini")
-
-        current_env = config["environments"]["current"]
-        if current_env not in config:
-            raise KeyError(f"[ERROR] Контур '{current_env}' не найден в base_urls.ini")
+        return config.base_url(environment)
 
-        BASE_URL = config[current_env]["BASE_URL"]
-        print(f"[DEBUG] Указанный контур: {current_env} - {BASE_URL}")  # 🔍 Отладка. Проверим, загружены ли данные
-
-    return BASE_URL
+    base_url = config.base_url()
+    if base_url != BASE_URL:
+        BASE_URL = base_url
+        print(f"[DEBUG] Указанный контур: {config.current_environment} - {BASE_URL}")  # 🔍 Отладка. Проверим, загружены ли данные
+    return base_url
 
 
 def get_route(route_name: str) -> str:
@@ -115,13 +217,7 @@ def get_route(route_name: str) -> str:
     :return: Путь для указанного роута.
     :raises KeyError: Если роут не найден в routes.ini.
     """
-    config = configparser.ConfigParser()
-    config.read(ROUTES_CONFIG_PATH, encoding="utf-8")
-
-    if "routes" not in config or route_name not in config["routes"]:
-        raise KeyError(f"Роут '{route_name}' не найден в routes.ini")
-
-    return config["routes"][route_name]
+    return get_config().route(route_name)
 
 
 def get_full_url(route_name: str) -> str:
@@ -0,0 +1,72 @@
+"""
+Файловый кэш CrUX field data (loadingExperience из PageSpeed API).
+
+Полевые данные меняются только с публикацией нового периода сбора (28-дневное окно),
+а run_crux_data_collection запрашивает PSI для каждого роута на каждый запуск.
+Ответ кэшируется в JSON-файле по ключу (mode, strategy, url) на CRUX_CACHE_TTL секунд
+вместе с collectionPeriod; кэш общий для всех процессов (file_cache.TTLFileCache).
+Попадание не тратит квоту PSI и не ждёт токен rate limiter — fetch вызывается только при промахе.
+"""
+
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.lighthouse.configs.config_lighthouse import REPORTS_DIR
+from services.lighthouse.file_cache import TTLFileCache
+from services.lighthouse.log_utils import print
+
+
+CRUX_CACHE_PATH = REPORTS_DIR / "crux_cache.json"
+DEFAULT_TTL = 86400.0  # секунд; переопределяется CRUX_CACHE_TTL
+
+
+def _ttl() -> float:
+    try:
+        return float(os.getenv("CRUX_CACHE_TTL", DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def _cache_key(url: str, strategy: str, mode: str) -> str:
+    return f"{mode}|{strategy}|{url.rstrip('/')}"
+
+
+def _collection_period(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """collectionPeriod ответа, если PSI его вернул ({firstDate, lastDate})."""
+    period = data.get("collectionPeriod")
+    return period if isinstance(period, dict) else None
+
+
+def _cache() -> TTLFileCache:
+    return TTLFileCache(CRUX_CACHE_PATH, ttl=_ttl())
+
+
+def get_crux_data(url: str, strategy: str, fetch: Callable[[], Dict[str, Any]],
+                  mode: str = "field", force_refresh: bool = False) -> Tuple[Dict[str, Any], bool]:
+    """
+    Возвращает (данные CrUX, взято_из_кэша).
+    fetch — запрос к PSI (с ожиданием rate limiter); вызывается только при промахе
+    или force_refresh. Пустой ответ не кэшируется.
+    """
+    key = _cache_key(url, strategy, mode)
+    cache = _cache()
+    entry = None if force_refresh else cache.get(key)
+    if entry and entry.get("data"):
+        period = entry.get("collection_period") or {}
+        print(f"[INFO] CrUX из кэша: {url} ({strategy}), период {period.get('lastDate') or '—'}")
+        return dict(entry["data"]), True
+
+    data = fetch()
+    if data:
+        try:
+            cache.put(key, {"collection_period": _collection_period(data), "data": data})
+        except OSError as e:
+            print(f"[WARNING] Не удалось сохранить кэш CrUX: {e}")
+    return data, False
+
+
+def invalidate_crux_cache(url: Optional[str] = None) -> None:
+    """Сбрасывает кэш для URL (все strategy/mode) или целиком."""
+    suffix = f"|{url.rstrip('/')}" if url is not None else None
+    _cache().update(lambda entries: {
+        key: entry for key, entry in entries.items() if suffix is not None and not key.endswith(suffix)})
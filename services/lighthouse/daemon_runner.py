@@ -0,0 +1,233 @@
+"""
+Запуск Lighthouse через долгоживущий Node-воркер (scripts/lighthouse_daemon.js).
+
+Вместо отдельного процесса `lighthouse` на каждую итерацию воркер держит
+прогретыми Node, модуль Lighthouse и Chrome. Протокол — JSON-lines через stdin/stdout.
+LighthouseDaemonRunner.run_local_lighthouse повторяет контракт cli_runner.run_local_lighthouse.
+"""
+
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.lighthouse.cli_runner import (
+    LEAN_SKIP_AUDITS,
+    _build_report_path,
+    _kill_process_tree,
+    _process_group_kwargs,
+    _resolve_device_settings,
+    _subprocess_kwargs,
+)
+from services.lighthouse.configs.config_lighthouse import get_temp_dir_for_route
+from services.lighthouse.log_utils import print
+
+
+DAEMON_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "lighthouse_daemon.js"
+
+
+class LighthouseDaemonError(RuntimeError):
+    """Воркер не запустился, упал или не ответил вовремя."""
+
+
+class LighthouseDaemonRunner:
+    """
+    Python-обёртка над scripts/lighthouse_daemon.js.
+
+    Использование:
+        with LighthouseDaemonRunner() as runner:
+            json_paths = runner.run_local_lighthouse("main", "https://vrporn.com/", 10, "desktop")
+    """
+
+    def __init__(self, node_cmd: Optional[str] = None, script_path: Path = DAEMON_SCRIPT,
+                 startup_timeout: float = 60.0, request_timeout: float = 180.0):
+        self.node_cmd = node_cmd or shutil.which("node") or "node"
+        self.script_path = Path(script_path)
+        self.startup_timeout = startup_timeout
+        self.request_timeout = request_timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._reader: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "LighthouseDaemonRunner":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Запускает воркер и ждёт события ready (Chrome поднят, модуль загружен)."""
+        if self.is_running:
+            return
+        if not self.script_path.exists():
+            raise LighthouseDaemonError(f"Скрипт воркера не найден: {self.script_path}")
+
+        self._lines = queue.Queue()
+        self._process = subprocess.Popen(
+            [self.node_cmd, str(self.script_path)],
+            cwd=str(self.script_path.parents[1]),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            # Своя группа процессов: _kill_process_tree остановит воркер вместе с Chrome
+            **_process_group_kwargs(_subprocess_kwargs()),
+        )
+        self._reader = threading.Thread(target=self._read_stdout, args=(self._process,), daemon=True)
+        self._reader.start()
+
+        message = self._wait_for(lambda msg: msg.get("event") == "ready", self.startup_timeout)
+        print(f"[INFO] Lighthouse daemon готов (pid={self._process.pid}, chrome port={message.get('chromePort')})")
+
+    def close(self) -> None:
+        """Останавливает воркер вместе с его Chrome."""
+        process = self._process
+        if process is None:
+            return
+        self._process = None
+        try:
+            if process.poll() is None:
+                process.stdin.write(json.dumps({"command": "shutdown"}) + "\n")
+                process.stdin.flush()
+                process.wait(timeout=15)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            _kill_process_tree(process)
+        print("[INFO] Lighthouse daemon остановлен.")
+
+    def _read_stdout(self, process: subprocess.Popen) -> None:
+        for line in process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)  # EOF — процесс завершился
+
+    def _wait_for(self, predicate, timeout: float) -> Dict[str, Any]:
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                self._kill()
+                raise LighthouseDaemonError(f"Lighthouse daemon не ответил за {timeout:.0f}с")
+            if line is None:
+                self._process = None
+                raise LighthouseDaemonError("Lighthouse daemon неожиданно завершился")
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(message, dict) and predicate(message):
+                return message
+
+    def _kill(self) -> None:
+        if self._process is not None:
+            _kill_process_tree(self._process)
+            self._process = None
+
+    def _request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.start()
+            request_id = uuid.uuid4().hex[:8]
+            payload = {**payload, "id": request_id}
+            try:
+                self._process.stdin.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                self._process.stdin.flush()
+            except OSError as e:
+                self._kill()
+                raise LighthouseDaemonError(f"Не удалось отправить задание воркеру: {e}")
+            return self._wait_for(lambda msg: msg.get("id") == request_id, self.request_timeout)
+
+    @staticmethod
+    def build_flags(device: str, categories: List[str], user_agent: Optional[str] = None,
+                    device_settings: Optional[tuple] = None, lean_report: bool = True) -> tuple:
+        """
+        Переводит настройки config_{device}.json в flags Node API Lighthouse.
+        Возвращает (preset, flags).
+        """
+        preset, screen_emulation, throttling, throttling_method = device_settings or _resolve_device_settings(device)
+        flags: Dict[str, Any] = {
+            "formFactor": device,
+            "throttlingMethod": throttling_method,
+            "onlyCategories": categories,
+        }
+        if screen_emulation:
+            flags["screenEmulation"] = screen_emulation
+        if throttling:
+            flags["throttling"] = throttling
+        if user_agent:
+            flags["extraHeaders"] = {"User-Agent": user_agent}
+        if lean_report:
+            flags["skipAudits"] = LEAN_SKIP_AUDITS
+            flags["disableFullPageScreenshot"] = True
+        return preset, flags
+
+    def run_iteration(self, route_url: str, report_file: str, preset: Optional[str],
+                      flags: Dict[str, Any]) -> Optional[str]:
+        """Выполняет одну итерацию в воркере. Возвращает путь к отчёту или None."""
+        response = self._request({
+            "url": route_url,
+            "outputPath": str(report_file),
+            "flags": flags,
+            "preset": preset,
+        })
+        if not response.get("ok"):
+            raise RuntimeError(f"Lighthouse daemon: {response.get('error')}")
+        if response.get("runtimeError"):
+            print(f"[WARNING] Lighthouse runtimeError: {response['runtimeError']}")
+        return report_file if os.path.exists(report_file) else None
+
+    def run_local_lighthouse(
+            self,
+            route_key: str,
+            route_url: str,
+            iteration_count: int = 5,
+            device: str = "desktop",
+            mode: str = "navigation",
+            categories: list = None,
+            user_agent: str = None,
+            strategy: str = None,
+            environment: str | None = None,
+            start_iteration: int = 1,
+            lean_report: bool = True,
+            should_stop=None) -> List[str]:
+        """
+        Аналог cli_runner.run_local_lighthouse: N итераций в одном прогретом Chrome.
+        Итерация ограничена request_timeout; should_stop проверяется между итерациями.
+
+        :return: Список путей к JSON-отчётам.
+        """
+        if mode != "navigation":
+            raise ValueError(f"Lighthouse daemon поддерживает только mode='navigation', получено: {mode}")
+        if categories is None:
+            categories = ["performance", "accessibility", "best-practices", "seo"]
+
+        temp_dir = get_temp_dir_for_route(route_key, device, prefix="CLI", environment=environment)
+        preset, flags = self.build_flags(device, categories, user_agent, lean_report=lean_report)
+
+        json_paths = []
+        try:
+            for iteration in range(start_iteration, start_iteration + iteration_count):
+                if should_stop and should_stop():
+                    print(f"[WARNING] {route_key}: запуск отменён перед итерацией {iteration}")
+                    break
+                report_file = _build_report_path(temp_dir, route_key, iteration, environment)
+                print(f"[INFO] Lighthouse daemon: {route_url} - {device}, итерация {iteration}")
+                report_path = self.run_iteration(route_url, report_file, preset, flags)
+                if report_path is None:
+                    print(f"[ERROR] Файл отчета не найден после итерации {iteration}: {report_file}")
+                    continue
+                json_paths.append(report_path)
+        except Exception as e:
+            print(f"[ERROR] Ошибка при выполнении теста для {route_key}: {e}")
+
+        return json_paths
@@ -0,0 +1,81 @@
+"""
+Кэш контекста спринта/rollout из листа `Dashboard [<project>]`.
+
+_resolve_launch_context (pagespeed_service и mcp_server) читает dashboard
+на каждый запуск. Контекст кэшируется в JSON-файле (file_cache.TTLFileCache) на
+DASHBOARD_CONTEXT_TTL секунд и общий для всех процессов (MCP-воркеры, пул CLI, скрипты насыщения);
+сам запрос — один values_batch_get (E5, E6, D9:G9).
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from services.lighthouse.configs.config_lighthouse import (
+    REPORTS_DIR,
+    get_current_environment,
+    get_google_creds_path,
+)
+from services.lighthouse.file_cache import TTLFileCache
+from services.lighthouse.log_utils import print
+
+
+DASHBOARD_CACHE_PATH = REPORTS_DIR / "dashboard_context_cache.json"
+DEFAULT_TTL = 600.0  # секунд; переопределяется DASHBOARD_CONTEXT_TTL
+
+
+def _ttl() -> float:
+    try:
+        return float(os.getenv("DASHBOARD_CONTEXT_TTL", DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def _cache() -> TTLFileCache:
+    return TTLFileCache(DASHBOARD_CACHE_PATH, ttl=_ttl())
+
+
+def _fetch_dashboard_context(project: str) -> Dict[str, Any]:
+    from services.google.google_sheets_client import GoogleSheetsClient
+
+    spreadsheet_id = os.getenv("GS_SHEET_ID")
+    return GoogleSheetsClient.read_dashboard_sprint_context(str(get_google_creds_path()), spreadsheet_id, project)
+
+
+def read_dashboard_context(environment: Optional[str], force_refresh: bool = False) -> Dict[str, Any]:
+    """
+    Возвращает контекст dashboard для окружения вида PROJECT_ENV:
+    {current_sprint, previous_increment, active_sprint, rollout, has_any_rollout, project, environment}.
+    Пустой dict — окружение без проекта, нет GS_SHEET_ID или dashboard недоступен.
+    """
+    env_name = (environment or get_current_environment()).upper()
+    if "_" not in env_name:
+        return {}
+    project, env = env_name.split("_", 1)
+    if not os.getenv("GS_SHEET_ID"):
+        return {}
+
+    cache = _cache()
+    entry = None if force_refresh else cache.get(project)
+    if entry is not None:
+        context = dict(entry.get("context") or {})
+    else:
+        try:
+            context = _fetch_dashboard_context(project)
+        except Exception as e:
+            print(f"[WARNING] Не удалось прочитать dashboard контекст для {env_name}: {e}")
+            return {}
+        try:
+            cache.put(project, {"context": context})
+        except OSError as e:
+            print(f"[WARNING] Не удалось сохранить кэш dashboard контекста: {e}")
+        context = dict(context)
+
+    context["project"] = project
+    context["environment"] = env
+    return context
+
+
+def invalidate_dashboard_context(project: Optional[str] = None) -> None:
+    """Сбрасывает кэш для проекта (или целиком) — например, после смены спринта в dashboard."""
+    _cache().update(lambda entries: {
+        key: entry for key, entry in entries.items() if project is not None and key != project.upper()})
@@ -0,0 +1,98 @@
+"""
+Общий TTL-кэш в JSON-файле для нескольких процессов (MCP-воркеры, пул CLI, скрипты).
+
+Файл — {key: {"fetched_at": <unix time>, ...}}. Чтение идёт без блокировки: запись
+атомарная (временный файл + os.replace), полузаписанный файл не виден никому.
+Запись — read-modify-write под lock-файлом рядом с кэшем: без него два процесса,
+одновременно дописывающие разные ключи, затирали бы запись друг друга.
+Lock-файл создаётся через O_CREAT | O_EXCL — работает на Windows/Linux без fcntl.
+
+Использование:
+    cache = TTLFileCache(REPORTS_DIR / "crux_cache.json", ttl=86400)
+    entry = cache.get(key)                        # None — промах или запись старше ttl
+    cache.put(key, {"data": data})                # fetched_at проставляется сам
+    cache.update(lambda entries: {})              # сброс под той же блокировкой
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from services.lighthouse.log_utils import print
+
+LOCK_TIMEOUT = 10.0  # секунд ожидания блокировки записи
+LOCK_STALE_SECONDS = 30.0  # lock-файл старше — владелец умер, не сняв блокировку
+_LOCK_POLL = 0.02
+
+
+class TTLFileCache:
+    """JSON-файл с записями, которые считаются свежими ttl секунд после fetched_at."""
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Свежая запись по ключу или None."""
+        entry = self.load().get(key)
+        if isinstance(entry, dict) and time.time() - entry.get("fetched_at", 0) < self.ttl:
+            return entry
+        return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Сохраняет запись с текущим fetched_at, не затирая ключи, записанные другими процессами."""
+        entry = {"fetched_at": time.time(), **entry}
+        self.update(lambda entries: {**entries, key: entry})
+
+    def update(self, mutate: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+        """Перечитывает файл, применяет mutate и атомарно записывает результат — под блокировкой."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            self._write(mutate(self.load()))
+
+    def _write(self, entries: Dict[str, Any]) -> None:
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        # Атомарная замена: параллельные процессы никогда не прочитают полузаписанный файл
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _locked(self):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > LOCK_STALE_SECONDS:
+                        print(f"[WARNING] Снимаем зависшую блокировку кэша: {self.lock_path}")
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue  # блокировку только что сняли
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Блокировка кэша {self.path.name} не получена за {LOCK_TIMEOUT:.0f}с")
+                time.sleep(_LOCK_POLL)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            yield
+        finally:
+            try:
+                os.remove(self.lock_path)
+            except OSError:
+                pass
@@ -0,0 +1,538 @@
+"""
+Инкрементальные helper-листы дашборда: Runs, Routes, Stability.
+
+Apps Script (02_DataCollection.gs.js: rebuildRunsSheet / rebuildRoutesSheet / rebuildStabilitySheet)
+на каждом обновлении дашборда перечитывал все сырые листы и пересобирал helper-листы с нуля —
+время росло вместе с историей. Теперь их ведёт Python:
+
+- сырые листы (RAW_PERF_SHEETS) читаются с водяной отметки — только строки, добавленные после
+  прошлой синхронизации (и пайплайном, и DailyApiRunner из Apps Script);
+- состояние групп (суммы для средних, Welford для std) лежит в SQLite рядом с RunStore,
+  обновляются только группы, которых коснулись новые строки;
+- в helper-листы уходят только изменённые строки, одним values_batch_update.
+
+Строки совпадают с buildRunAggregateRow / buildRouteAggregateRow / buildStabilityAggregateRow.
+Последняя колонка pipeline_synced_at — метка: такой лист Apps Script не пересобирает.
+Нет метки (лист новый или пересобран в Apps Script) — лист переписывается целиком из состояния.
+Первая синхронизация читает всю историю (bootstrap).
+
+Запуск: после каждого успешного flush в SpeedtestService (LIGHTHOUSE_HELPER_SYNC=0 — отключить) или
+    python -m services.lighthouse.helper_sheets sync
+    python -m services.lighthouse.helper_sheets sync --reset   # забыть состояние и собрать заново
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services.lighthouse.log_utils import print
+from services.lighthouse.run_store import DEFAULT_RUN_STORE_PATH
+
+
+# === Синхронно с tools/clasp/00_Constants.gs.js ===
+RUNS_SHEET = "Runs"
+ROUTES_SHEET = "Routes"
+STABILITY_SHEET = "Stability"
+RAW_PERF_SHEETS = ("VRP [PROD]", "VRP [STAGE]", "VRP [TEST]", "VRP [DEV]",
+                   "VRS [PROD]", "VRS [STAGE]", "VRS [TEST]", "VRS [DEV]", "CrUX")
+RUNS_HEADERS = ["date", "project", "environment", "source", "sprint", "run_id", "tag", "iterations", "pages",
+                "avg_score", "p90_lcp", "p90_inp", "p90_cls", "ttfb", "tbt", "fcp", "tti", "speed"]
+ROUTES_HEADERS = ["date", "project", "environment", "source", "sprint", "run_id", "tag", "page", "device", "type",
+                  "tests", "avg_score", "p90_lcp", "p90_inp", "p90_cls", "ttfb"]
+STABILITY_HEADERS = ["project", "environment", "source", "page", "device", "lcp_std", "inp_std", "cls_std",
+                     "stability_score"]
+SYNC_MARKER = "pipeline_synced_at"
+HEADER_TOKENS = frozenset({
+    "date", "project", "environment", "source", "sprint", "run_id", "tag",
+    "iterations", "pages", "avg_score", "p90_lcp", "p90_inp", "p90_cls",
+    "ttfb", "tbt", "fcp", "tti", "speed", "page", "device", "type", "tests",
+})
+ROUTE_TYPE_MAP = {
+    "main": "home", "s_video": "video", "models": "model", "s_model": "model", "categories": "category",
+    "s_category": "category", "s_studio": "studio", "dreams": "content", "s_dream": "content",
+}
+
+# (поле нормализованной строки, знаков после запятой) — как в build*AggregateRow
+_RUN_METRICS = (("avgScore", 0), ("lcp", 0), ("inp", 0), ("cls", 3), ("ttfb", 0),
+                ("tbt", 0), ("fcp", 0), ("tti", 0), ("speed", 0))
+_ROUTE_METRICS = _RUN_METRICS[:5]
+_STABILITY_METRICS = (("lcp", 0), ("inp", 0), ("cls", 3))
+
+_GROUP_KEYS = {
+    RUNS_SHEET: ("project", "environment", "source", "sprint", "tag", "runId"),
+    ROUTES_SHEET: ("project", "environment", "source", "sprint", "tag", "runId", "page", "device"),
+    STABILITY_SHEET: ("project", "environment", "source", "page", "device"),
+}
+HELPER_HEADERS = {RUNS_SHEET: RUNS_HEADERS, ROUTES_SHEET: ROUTES_HEADERS, STABILITY_SHEET: STABILITY_HEADERS}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS helper_groups (
+    sheet TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    sheet_row INTEGER,
+    dirty INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (sheet, key)
+);
+CREATE TABLE IF NOT EXISTS helper_sources (
+    sheet TEXT PRIMARY KEY,
+    next_row INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS helper_lease (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+SYNC_LEASE = "helper_sheets_sync"
+LEASE_TTL = 300.0   # секунд; синхронизация короче — зависшую аренду через TTL забирает другой процесс
+LEASE_WAIT = 120.0  # сколько ждать аренду, пока синхронизирует другой процесс
+
+
+def sync_enabled() -> bool:
+    return os.getenv("LIGHTHOUSE_HELPER_SYNC", "1").strip() not in ("0", "false", "no")
+
+
+# === Порт нормализации из 01_Utilities.gs.js / 02_DataCollection.gs.js ===
+
+def _to_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+_NUMBER_PREFIX = re.compile(r"-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)")
+
+
+def _parse_number(value: Any) -> Optional[float]:
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    cleaned = re.sub(r"[^0-9.\-]", "", str(value).strip().replace(",", ".", 1))
+    match = _NUMBER_PREFIX.match(cleaned)  # parseFloat: самый длинный числовой префикс
+    return float(match.group()) if match else None
+
+
+def _normalize_header(value: Any) -> str:
+    if value is None:
+        return ""
+    return re.sub(r"[^A-Za-z0-9_]", "", re.sub(r"\s+", "_", str(value).strip().lower()))
+
+
+def _get(record: Dict[str, Any], candidates: Tuple[str, ...]) -> Any:
+    for candidate in candidates:
+        value = record.get(candidate)
+        if value not in ("", None):
+            return value
+    return None
+
+
+def _normalize_timing(value: Any) -> Optional[float]:
+    num = _parse_number(value)
+    if num is None:
+        return None
+    return num * 1000 if 0 < num < 50 else num  # секунды -> мс (все поля здесь — временные метрики)
+
+
+def _normalize_project(value: str) -> str:
+    text = value.upper()
+    return "VRP" if text.startswith("VRP") else "VRS" if text.startswith("VRS") else text
+
+
+def _normalize_environment(value: str) -> str:
+    text = value.upper()
+    for env in ("PROD", "STAGE", "TEST", "DEV"):
+        if env in text:
+            return env
+    return text
+
+
+def _normalize_source(value: Any) -> str:
+    text = _to_text(value).upper()
+    for source in ("CRUX", "API", "CLI"):
+        if source in text:
+            return source
+    return text
+
+
+def _infer_project(environment: str) -> str:
+    text = environment.upper()
+    return "VRP" if text.startswith("VRP") else "VRS" if text.startswith("VRS") else ""
+
+
+def _meta_from_sheet_name(sheet_name: str) -> Dict[str, str]:
+    text = sheet_name.upper()
+    if text == "CRUX":
+        return {"project": "", "environment": "PROD", "source": "CRUX"}
+    match = re.match(r"^(VRP|VRS)\s*\[(PROD|STAGE|TEST|DEV)\]$", text)
+    if not match:
+        return {"project": "", "environment": "", "source": ""}
+    return {"project": match.group(1), "environment": match.group(2), "source": ""}
+
+
+def _iterations_from_type(value: Any) -> Optional[int]:
+    match = re.search(r"\{(\d+)\}", _to_text(value))
+    return int(match.group(1)) if match else None
+
+
+def _is_header_row(record: Dict[str, Any]) -> bool:
+    hits = sum(1 for key in ("run_id", "date", "page", "project")
+               if record.get(key) and _normalize_header(record[key]) in HEADER_TOKENS)
+    return hits >= 2
+
+
+def _record(headers: List[str], row: List[Any]) -> Optional[Dict[str, Any]]:
+    """Строка листа -> запись {заголовок: значение}, как readSheetRecords (пустые и строки-заголовки — None)."""
+    if all(cell in ("", None) for cell in row):
+        return None
+    record = {key: value for key, value in zip(headers, row) if key}
+    return None if _is_header_row(record) else record
+
+
+def normalize_raw_record(record: Dict[str, Any], sheet_name: str) -> Optional[Dict[str, Any]]:
+    """Порт normalizeRawRecord: запись сырого листа -> поля для helper-агрегатов."""
+    page = _to_text(_get(record, ("page",)))
+    device = _to_text(_get(record, ("device",))) or "unknown"
+    if not page and sheet_name != "CrUX":
+        return None
+    meta = _meta_from_sheet_name(sheet_name)
+    environment_raw = _to_text(_get(record, ("environment",))) or meta["environment"]
+    project_raw = _to_text(_get(record, ("project",))) or meta["project"] or _infer_project(environment_raw)
+    source_raw = _get(record, ("source", "type")) or meta["source"]
+    iterations = (_parse_number(_get(record, ("iterations",))) or _iterations_from_type(_get(record, ("type",)))
+                  or (1 if sheet_name == "CrUX" else None))
+    return {
+        "date": _to_text(_get(record, ("date",))),
+        "project": _normalize_project(project_raw),
+        "environment": _normalize_environment(environment_raw),
+        "source": _normalize_source(source_raw),
+        "sprint": _to_text(_get(record, ("sprint",))),
+        "runId": _to_text(_get(record, ("run_id",))),
+        "tag": _to_text(_get(record, ("tag",))),
+        "iterations": iterations,
+        "page": page,
+        "device": device,
+        "type": ROUTE_TYPE_MAP.get(page, "route"),
+        "avgScore": _parse_number(_get(record, ("p", "avg_score", "score"))),
+        "lcp": _normalize_timing(_get(record, ("lcp_p90", "p90_lcp", "lcp"))),
+        "inp": _normalize_timing(_get(record, ("inp_p90", "p90_inp", "inp"))),
+        "cls": _parse_number(_get(record, ("cls_p90", "p90_cls", "cls"))),
+        "ttfb": _normalize_timing(_get(record, ("ttfb", "avg_ttfb", "ttfb_avg"))),
+        "tbt": _normalize_timing(_get(record, ("tbt", "total_blocking_time"))),
+        "fcp": _normalize_timing(_get(record, ("fcp", "first_contentful_paint"))),
+        "tti": _normalize_timing(_get(record, ("tti", "time_to_interactive"))),
+        "speed": _normalize_timing(_get(record, ("si", "speed", "speed_index"))),
+    }
+
+
+# === Агрегаты групп ===
+
+def _js_round(value: float, decimals: int):
+    """Math.round / parseFloat(x.toFixed(d)) из Apps Script: половина — вверх."""
+    if decimals > 0:
+        return float(Decimal(value).quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP))
+    return math.floor(value + 0.5)
+
+
+def _update_state(sheet: str, state: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """Добавляет строку в состояние группы: последняя строка — sample, суммы/Welford по метрикам."""
+    state["sample"] = row
+    if sheet == STABILITY_SHEET:
+        welford = state.setdefault("welford", {})
+        for metric, _ in _STABILITY_METRICS:
+            value = row[metric]
+            if value is None:
+                continue
+            n, mean, m2 = welford.get(metric, (0, 0.0, 0.0))
+            n += 1
+            delta = value - mean
+            mean += delta / n
+            m2 += delta * (value - mean)
+            welford[metric] = (n, mean, m2)
+        return
+    sums = state.setdefault("sums", {})
+    for metric, _ in (_RUN_METRICS if sheet == RUNS_SHEET else _ROUTE_METRICS):
+        value = row[metric]
+        if value is not None:
+            total, count = sums.get(metric, (0, 0))
+            sums[metric] = (total + value, count + 1)
+    if sheet == RUNS_SHEET:
+        pages = state.setdefault("pages", [])
+        page_key = f"{row['page']}|{row['device']}"
+        if page_key not in pages:
+            pages.append(page_key)
+
+
+def _average(state: Dict[str, Any], metric: str, decimals: int):
+    total, count = state["sums"].get(metric, (0, 0))
+    return _js_round(total / count, decimals) if count else ""
+
+
+def _std(state: Dict[str, Any], metric: str, decimals: int):
+    n, _, m2 = state.get("welford", {}).get(metric, (0, 0.0, 0.0))
+    return _js_round(math.sqrt(m2 / n), decimals) if n >= 2 else 0
+
+
+def build_helper_row(sheet: str, state: Dict[str, Any]) -> List[Any]:
+    """Строка helper-листа из состояния группы (значения без колонки-метки)."""
+    sample = state["sample"]
+    if sheet == STABILITY_SHEET:
+        lcp_std, inp_std, cls_std = (_std(state, metric, decimals) for metric, decimals in _STABILITY_METRICS)
+        score = 100 - min(lcp_std / 100, 40) - min(inp_std / 20, 30) - min(cls_std * 100, 30)
+        return [sample["project"], sample["environment"], sample["source"], sample["page"], sample["device"],
+                lcp_std, inp_std, cls_std, max(0, min(100, _js_round(score, 0)))]
+    head = [sample["date"], sample["project"], sample["environment"], sample["source"], sample["sprint"],
+            sample["runId"], sample["tag"]]
+    if sheet == RUNS_SHEET:
+        return head + [sample["iterations"] or "", len(state["pages"])] + [
+            _average(state, metric, decimals) for metric, decimals in _RUN_METRICS]
+    return head + [sample["page"], sample["device"], sample["type"] or "route", sample["iterations"] or ""] + [
+        _average(state, metric, decimals) for metric, decimals in _ROUTE_METRICS]
+
+
+class HelperSheetsState:
+    """Состояние групп helper-листов и водяные отметки сырых листов (SQLite-файл RunStore)."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.getenv("LIGHTHOUSE_RUN_STORE") or DEFAULT_RUN_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def reset(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM helper_groups")
+            conn.execute("DELETE FROM helper_sources")
+
+    def acquire_lease(self, owner: str, ttl: float = LEASE_TTL) -> bool:
+        """Берёт аренду синхронизации. False — её держит другой живой владелец."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO helper_lease (name, owner, heartbeat) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, heartbeat = excluded.heartbeat "
+                "WHERE helper_lease.owner = excluded.owner OR helper_lease.heartbeat < ?",
+                (SYNC_LEASE, owner, now, now - ttl),
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, owner: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM helper_lease WHERE name = ? AND owner = ?", (SYNC_LEASE, owner))
+
+    @contextmanager
+    def lease(self, wait: float = LEASE_WAIT) -> Iterator[None]:
+        """Одна синхронизация на файл состояния: ждёт, пока закончит другой процесс/поток."""
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while not self.acquire_lease(owner):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Аренду синхронизации helper-листов не удалось взять за {wait:.0f} с")
+            time.sleep(0.2)
+        try:
+            yield
+        finally:
+            self.release_lease(owner)
+
+    def next_rows(self) -> Dict[str, int]:
+        """Первая непрочитанная строка каждого сырого листа."""
+        with self._connect() as conn:
+            return {r["sheet"]: r["next_row"] for r in conn.execute("SELECT sheet, next_row FROM helper_sources")}
+
+    def ingest(self, rows: List[Tuple[str, int, Dict[str, Any]]], next_rows: Dict[str, int]) -> Tuple[int, int]:
+        """
+        Применяет новые строки (лист, номер строки, нормализованная строка) к группам и сдвигает
+        отметки — одной транзакцией. Отметки перечитываются внутри транзакции: строки, которые
+        уже учёл другой процесс (номер ниже текущей отметки), отбрасываются — повторного учёта нет.
+        Возвращает (принято строк, затронуто групп); затронутые группы помечаются dirty.
+        """
+        touched: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            current = {r["sheet"]: r["next_row"] for r in conn.execute("SELECT sheet, next_row FROM helper_sources")}
+            accepted = [row for sheet, number, row in rows if number >= current.get(sheet, 2)]
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM helper_groups").fetchone()[0]
+            new_keys = set()
+            for row in accepted:
+                for sheet, fields in _GROUP_KEYS.items():
+                    key = "|".join(_to_text(row[field]) for field in fields)
+                    state = touched.get((sheet, key))
+                    if state is None:
+                        found = conn.execute("SELECT state FROM helper_groups WHERE sheet = ? AND key = ?",
+                                             (sheet, key)).fetchone()
+                        state = json.loads(found["state"]) if found else {}
+                        if not found:
+                            new_keys.add((sheet, key))
+                        touched[(sheet, key)] = state
+                    _update_state(sheet, state, row)
+            for (sheet, key), state in touched.items():
+                payload = json.dumps(state, ensure_ascii=False)
+                if (sheet, key) in new_keys:
+                    seq += 1
+                    conn.execute("INSERT INTO helper_groups (sheet, key, seq, state) VALUES (?, ?, ?, ?)",
+                                 (sheet, key, seq, payload))
+                else:
+                    conn.execute("UPDATE helper_groups SET state = ?, dirty = 1 WHERE sheet = ? AND key = ?",
+                                 (payload, sheet, key))
+            conn.executemany(
+                "INSERT INTO helper_sources (sheet, next_row) VALUES (?, ?) "
+                "ON CONFLICT(sheet) DO UPDATE SET next_row = excluded.next_row",
+                [(sheet, max(row, current.get(sheet, 2))) for sheet, row in next_rows.items()],
+            )
+        return len(accepted), len(touched)
+
+    def groups(self, sheet: str, dirty_only: bool) -> List[sqlite3.Row]:
+        query = "SELECT key, state, sheet_row FROM helper_groups WHERE sheet = ?"
+        if dirty_only:
+            query += " AND dirty = 1"
+        with self._connect() as conn:
+            return conn.execute(query + " ORDER BY seq", (sheet,)).fetchall()
+
+    def last_row(self, sheet: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(sheet_row), 1) FROM helper_groups WHERE sheet = ?",
+                                (sheet,)).fetchone()[0]
+
+    def mark_written(self, sheet: str, positions: Dict[str, int], full: bool) -> None:
+        """Записанные группы — чистые; full — лист переписан, позиции остальных сброшены."""
+        with self._connect() as conn:
+            if full:
+                conn.execute("UPDATE helper_groups SET sheet_row = NULL WHERE sheet = ?", (sheet,))
+            conn.executemany("UPDATE helper_groups SET sheet_row = ?, dirty = 0 WHERE sheet = ? AND key = ?",
+                             [(row, sheet, key) for key, row in positions.items()])
+
+
+def sync_helper_sheets(client, state: Optional[HelperSheetsState] = None,
+                       raw_sheets: Tuple[str, ...] = RAW_PERF_SHEETS) -> Dict[str, Any]:
+    """
+    Дочитывает новые строки сырых листов и обновляет изменённые строки Runs/Routes/Stability.
+    Обращений к Sheets API: один values_batch_get и один values_batch_update
+    (+ values_batch_clear, если helper-лист переписывается целиком).
+    Параллельные синхронизации (несколько окружений flush-ат одновременно) выполняются по очереди
+    под арендой в файле состояния.
+    :param client: GoogleSheetsClient (read_values / write_values / sheet_titles / ensure_plain_sheet).
+    :return: {"rows": новых сырых строк, "groups": затронутых групп, "written": строк записано,
+              "rewritten": [листы, переписанные целиком]}.
+    :raises TimeoutError: аренду не удалось взять за LEASE_WAIT секунд.
+    """
+    state = state or HelperSheetsState()
+    with state.lease():
+        return _sync(client, state, raw_sheets)
+
+
+def _sync(client, state: HelperSheetsState, raw_sheets: Tuple[str, ...]) -> Dict[str, Any]:
+    titles = set(client.sheet_titles())
+    sources = [name for name in raw_sheets if name in titles]
+    helpers = [name for name in HELPER_HEADERS if name in titles]
+    next_rows = state.next_rows()
+
+    # Чтение начинается с последней уже прочитанной строки: она точно в пределах сетки листа
+    starts = {name: max(2, next_rows.get(name, 2) - 1) for name in sources}
+    ranges = []
+    for name in sources:
+        ranges += [client.a1_range(name, "1:1"), client.a1_range(name, f"A{starts[name]}:ZZ")]
+    ranges += [client.a1_range(name, "1:1") for name in helpers]
+    values = client.read_values(ranges)
+
+    rows, updated_next = [], {}
+    for index, name in enumerate(sources):
+        header_values, data = values[2 * index], values[2 * index + 1]
+        headers = [_normalize_header(h) for h in (header_values[0] if header_values else [])]
+        first_new = next_rows.get(name, 2) - starts[name]  # 1 — первая строка уже учтена
+        for offset, row in enumerate(data[first_new:]):
+            record = _record(headers, row)
+            normalized = normalize_raw_record(record, name) if record else None
+            if normalized:
+                rows.append((name, starts[name] + first_new + offset, normalized))
+        updated_next[name] = max(next_rows.get(name, 2), starts[name] + len(data))
+    accepted, groups = state.ingest(rows, updated_next)
+
+    current_headers = {name: [str(h) for h in (values[2 * len(sources) + i][:1] or [[]])[0]]
+                       for i, name in enumerate(helpers)}
+    synced_at = datetime.now().strftime("%Y.%m.%d %H:%M:%S")
+    data, clear, positions, rewritten = [], [], {}, []
+    for sheet, headers in HELPER_HEADERS.items():
+        expected = headers + [SYNC_MARKER]
+        full = current_headers.get(sheet) != expected
+        items = state.groups(sheet, dirty_only=not full)
+        if not items and not full:
+            continue
+        if sheet not in titles:
+            client.ensure_plain_sheet(sheet)
+        sheet_positions = {}
+        if full:
+            rewritten.append(sheet)
+            clear.append(client.a1_range(sheet))
+            block = [expected]
+            for offset, item in enumerate(items):
+                sheet_positions[item["key"]] = offset + 2
+                block.append(build_helper_row(sheet, json.loads(item["state"])) + [synced_at])
+            data.append({"range": client.a1_range(sheet, "A1"), "values": block})
+        else:
+            next_free = state.last_row(sheet) + 1
+            for item in items:
+                row_number = item["sheet_row"]
+                if row_number is None:
+                    row_number, next_free = next_free, next_free + 1
+                sheet_positions[item["key"]] = row_number
+                data.append({"range": client.a1_range(sheet, f"A{row_number}"),
+                             "values": [build_helper_row(sheet, json.loads(item["state"])) + [synced_at]]})
+        positions[sheet] = (sheet_positions, full)
+
+    client.write_values(data, clear=clear)
+    for sheet, (sheet_positions, full) in positions.items():
+        state.mark_written(sheet, sheet_positions, full)
+    written = sum(len(p) for p, _ in positions.values())
+    print(f"[INFO] Helper-листы: новых сырых строк {accepted}, групп {groups}, записано строк {written}"
+          + (f", переписаны целиком: {', '.join(rewritten)}" if rewritten else ""))
+    return {"rows": accepted, "groups": groups, "written": written, "rewritten": rewritten}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Инкрементальная синхронизация helper-листов дашборда")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync_parser = sub.add_parser("sync", help="Дочитать новые сырые строки и обновить Runs/Routes/Stability")
+    sync_parser.add_argument("--reset", action="store_true", help="Сбросить состояние и собрать листы заново")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from services.google.google_sheets_client import GoogleSheetsClient
+    from services.lighthouse.configs.config_lighthouse import LIGHTHOUSE_DIR, get_google_creds_path
+
+    load_dotenv(LIGHTHOUSE_DIR / "configs" / "config_lighthouse.env")
+    spreadsheet_id = os.getenv("GS_SHEET_ID")
+    if not spreadsheet_id:
+        raise SystemExit("[ERROR] GS_SHEET_ID не задан")
+    state = HelperSheetsState()
+    if args.reset:
+        state.reset()
+        print("[INFO] Состояние helper-листов сброшено — будет прочитана вся история")
+    client = GoogleSheetsClient(str(get_google_creds_path()), spreadsheet_id, RUNS_SHEET)
+    sync_helper_sheets(client, state)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Планировщик заданий MCP с ограниченным числом слотов.
+
+Без планировщика каждое enqueue_* сразу запускало отдельный процесс: сатурация
+по 4 контурам поднимала 8 параллельных флотов Lighthouse, которые делили CPU,
+и лабораторные метрики теряли смысл. Планировщик — один процесс на файл очереди
+(аренда в JobStore): забирает задания через JobStore.claim_next (priority, затем FIFO)
+и запускает их, пока у типа задания есть свободные слоты.
+
+Слоты по умолчанию считаются от числа CPU:
+    lighthouse_cli — тяжёлые (Chrome): cpu/4, задание занимает max_workers слотов
+    lighthouse_api — лёгкие (сеть + квота PSI): cpu/2, минимум 2
+    crux           — тривиальные: cpu, минимум 4
+Переопределение: MCP_SLOTS_LIGHTHOUSE_CLI, MCP_SLOTS_LIGHTHOUSE_API, MCP_SLOTS_CRUX.
+
+Запуск: python services/lighthouse/mcp_server.py --scheduler
+(MCP-сервер поднимает его сам при первом enqueue, если живого планировщика нет).
+"""
+
+import os
+import subprocess
+import time
+from typing import Any, Callable, Dict, Optional
+
+from services.lighthouse.job_store import ACTIVE_STATUSES, JOB_ERROR, JobStore
+from services.lighthouse.log_utils import print
+
+
+SCHEDULER_LEASE = "scheduler"
+LEASE_TTL = 15.0         # секунд без heartbeat — планировщик считается мёртвым
+POLL_INTERVAL = 1.0      # секунд между проверками очереди
+IDLE_EXIT_SECONDS = 120  # пустая очередь дольше этого — планировщик завершается
+
+
+def job_slots() -> Dict[str, int]:
+    """Слоты по типам заданий: от числа CPU или из MCP_SLOTS_<KIND>."""
+    cpus = os.cpu_count() or 2
+    slots = {
+        "lighthouse_cli": max(1, cpus // 4),
+        "lighthouse_api": max(2, cpus // 2),
+        "crux": max(4, cpus),
+    }
+    for kind in slots:
+        value = os.getenv(f"MCP_SLOTS_{kind.upper()}")
+        if value:
+            try:
+                slots[kind] = max(1, int(value))
+            except ValueError:
+                print(f"[WARNING] MCP_SLOTS_{kind.upper()}={value!r} — не число, слотов: {slots[kind]}")
+    return slots
+
+
+def job_weight(job: Dict[str, Any]) -> int:
+    """Сколько слотов занимает задание: CLI-прогон с max_workers=N — N слотов."""
+    if job.get("kind") == "lighthouse_cli":
+        return max(1, int((job.get("payload") or {}).get("max_workers") or 1))
+    return 1
+
+
+class JobScheduler:
+    """
+    Цикл планировщика.
+
+    :param store: Очередь заданий.
+    :param spawn: Запуск процесса задания по job_id -> subprocess.Popen.
+    :param slots: Слоты по типам (по умолчанию job_slots()).
+    """
+
+    def __init__(self, store: JobStore, spawn: Callable[[str], subprocess.Popen],
+                 slots: Optional[Dict[str, int]] = None, poll_interval: float = POLL_INTERVAL,
+                 idle_exit: Optional[float] = IDLE_EXIT_SECONDS):
+        self.store = store
+        self.spawn = spawn
+        self.slots = slots or job_slots()
+        self.poll_interval = poll_interval
+        self.idle_exit = idle_exit
+        self.owner = os.getpid()
+        self._children: Dict[str, subprocess.Popen] = {}
+
+    def _reap(self) -> None:
+        """Снимает завершившиеся процессы; задание, не дошедшее до done/error, помечается error."""
+        for job_id, process in list(self._children.items()):
+            code = process.poll()
+            if code is None:
+                continue
+            del self._children[job_id]
+            if self.store.transition(job_id, ACTIVE_STATUSES, JOB_ERROR, ended_at=time.time(),
+                                     error=f"Процесс задания завершился с кодом {code}"):
+                print(f"[WARNING] Задание {job_id}: процесс завершился с кодом {code} без результата")
+
+    def tick(self) -> int:
+        """Один проход: снять завершившиеся процессы и запустить всё, что помещается в слоты."""
+        self._reap()
+        started = 0
+        while True:
+            job = self.store.claim_next(self.slots, weight=job_weight)
+            if job is None:
+                return started
+            job_id = job["job_id"]
+            try:
+                process = self.spawn(job_id)
+                self._children[job_id] = process
+                # pid — чтобы claim_next следующего планировщика снял задание, если процесс умрёт молча
+                self.store.update(job_id, pid=process.pid)
+                started += 1
+                print(f"[INFO] Задание {job_id} ({job['kind']}) запущено")
+            except Exception as e:
+                self.store.transition(job_id, ACTIVE_STATUSES, JOB_ERROR, ended_at=time.time(),
+                                      error=f"Не удалось запустить процесс: {e}")
+
+    def _has_work(self) -> bool:
+        return bool(self._children) or any(
+            item["queued"] or item["active"] for item in self.store.queue_stats().values())
+
+    def run(self) -> int:
+        """Основной цикл. 1 — другой планировщик уже работает."""
+        if not self.store.acquire_lease(SCHEDULER_LEASE, self.owner, LEASE_TTL):
+            print("[INFO] Планировщик уже запущен другим процессом")
+            return 1
+        print(f"[INFO] Планировщик запущен, слоты: {self.slots}")
+        idle_since = None
+        try:
+            while True:
+                if not self.store.acquire_lease(SCHEDULER_LEASE, self.owner, LEASE_TTL):
+                    print("[WARNING] Аренда планировщика перехвачена другим процессом — выходим")
+                    return 1
+                self.tick()
+                if self._has_work():
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif self.idle_exit is not None and time.monotonic() - idle_since > self.idle_exit:
+                    print("[INFO] Очередь пуста — планировщик завершается")
+                    return 0
+                time.sleep(self.poll_interval)
+        finally:
+            self.store.release_lease(SCHEDULER_LEASE, self.owner)
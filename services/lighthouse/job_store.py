@@ -0,0 +1,614 @@
+"""
+Очередь заданий MCP-сервера (SQLite, WAL).
+
+Раньше задания жили в одном mcp_jobs.json: каждое обновление статуса перечитывало,
+чистило и переписывало весь файл без межпроцессной блокировки — параллельные
+процессы заданий теряли обновления друг друга. Здесь каждое задание — строка таблицы:
+  - обновление статуса — один UPDATE по первичному ключу;
+  - переход статуса атомарен (UPDATE ... WHERE status IN (...)), задание не стартует дважды;
+  - list/get — один запрос по индексам status/created_at;
+  - claim_next — выбор следующего задания планировщиком (priority, затем FIFO)
+    с учётом занятых слотов по типам заданий, в одной транзакции;
+  - create_or_attach — дедупликация: тот же fingerprint присоединяется к заданию
+    в очереди/в работе или получает свежий готовый результат;
+  - record_progress — события прогресса по роутам (started, iteration i/N, aggregated,
+    failed, flushed) пишутся в job_events, а сводка — в колонку progress_json задания:
+    job_status читает одну строку, не пересчитывая историю событий;
+  - request_cancel — отмена: ожидающее задание снимается сразу, выполняющееся получает
+    флаг cancel_requested, который процесс задания опрашивает через JobCancellation;
+  - осиротевшие задания (процесс убит OOM/SIGKILL, перезагрузка, рестарт планировщика) —
+    claim_next переводит в error, если pid процесса мёртв, heartbeat из опросов
+    JobCancellation устарел или дедлайн давно прошёл: иначе они навсегда занимали бы слоты.
+
+Старый mcp_jobs.json импортируется при первом открытии и переименовывается в *.migrated.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.lighthouse.configs.config_lighthouse import REPORTS_DIR
+from services.lighthouse.log_utils import print
+
+
+DEFAULT_JOB_STORE_PATH = REPORTS_DIR / "mcp_jobs.sqlite3"
+LEGACY_JOBS_JSON_PATH = REPORTS_DIR / "mcp_jobs.json"
+
+# Статусы заданий
+JOB_QUEUED = "queued"
+JOB_CLAIMED = "claimed"  # планировщик занял слот, процесс задания запускается
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+JOB_CANCELLED = "cancelled"  # отменено или превышен дедлайн; result — частичные итоги
+ACTIVE_STATUSES = (JOB_CLAIMED, JOB_RUNNING)
+FINISHED_STATUSES = (JOB_DONE, JOB_ERROR, JOB_CANCELLED)
+
+# Колонки, которые можно менять через update/transition
+_MUTABLE_COLUMNS = ("status", "priority", "started_at", "ended_at", "result", "error", "deadline", "pid", "heartbeat")
+
+JOB_HEARTBEAT_TTL = 900.0  # секунд без heartbeat — процесс активного задания считается мёртвым
+DEADLINE_GRACE = 300.0     # секунд после deadline, за которые процесс должен сам записать итог
+
+# Колонки, добавленные после первой версии схемы: (имя, определение)
+_ADDED_COLUMNS = (
+    ("priority", "INTEGER NOT NULL DEFAULT 0"),
+    ("fingerprint", "TEXT"),
+    ("attached", "INTEGER NOT NULL DEFAULT 0"),  # сколько повторных запросов получили это задание
+    ("progress_json", "TEXT"),  # сводка прогресса (см. record_progress)
+    ("cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+    ("deadline", "REAL"),  # время (epoch), после которого выполняющееся задание останавливается
+    ("pid", "INTEGER"),  # процесс задания
+    ("heartbeat", "REAL"),  # последний признак жизни процесса задания (claim, старт, опрос отмены)
+)
+
+# События прогресса (route=None — событие всего задания)
+EVENT_STARTED = "started"        # route=None: total — плановое число итераций; иначе — старт роута
+EVENT_ITERATION = "iteration"    # итерация done из total по роуту
+EVENT_AGGREGATED = "aggregated"  # роут агрегирован и сохранён, detail — краткий итог
+EVENT_FAILED = "failed"          # роут упал, detail — ошибка
+EVENT_FLUSHED = "flushed"        # буфер строк отправлен в Google Sheets
+PROGRESS_EVENTS = (EVENT_STARTED, EVENT_ITERATION, EVENT_AGGREGATED, EVENT_FAILED, EVENT_FLUSHED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload_json TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    ended_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    event TEXT NOT NULL,
+    route TEXT,
+    done INTEGER,
+    total INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, id);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner INTEGER NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_fingerprint ON jobs (fingerprint, created_at);
+"""
+
+
+def payload_fingerprint(kind: str, payload: Dict[str, Any]) -> str:
+    """Хэш канонического (kind, payload): ключи отсортированы, порядок списков не важен."""
+    canonical = {key: sorted(value) if isinstance(value, list) else value for key, value in payload.items()}
+    raw = json.dumps([kind, canonical], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _pid_alive(pid: int) -> bool:
+    """Жив ли процесс. На Windows os.kill(pid, 0) завершил бы процесс — там решают heartbeat и дедлайн."""
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # процесс есть, но принадлежит другому пользователю
+    return True
+
+
+def _orphan_reason(row: sqlite3.Row, now: float) -> Optional[str]:
+    """Почему активное задание считается осиротевшим (None — процесс жив)."""
+    if row["pid"] is not None and not _pid_alive(row["pid"]):
+        return f"Процесс задания (pid {row['pid']}) завершился, не записав результат"
+    if row["deadline"] is not None and now > row["deadline"] + DEADLINE_GRACE:
+        return f"Дедлайн задания истёк более {DEADLINE_GRACE / 60:.0f} мин назад, процесс не записал результат"
+    last_seen = row["heartbeat"] or row["started_at"] or row["created_at"]
+    if now - last_seen > JOB_HEARTBEAT_TTL:
+        return f"Процесс задания не подавал признаков жизни {JOB_HEARTBEAT_TTL / 60:.0f} мин"
+    return None
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = {key: row[key] for key in row.keys() if key not in ("payload_json", "progress_json")}
+    job["payload"] = json.loads(row["payload_json"] or "{}")
+    job["progress"] = json.loads(row["progress_json"]) if row["progress_json"] else None
+    return job
+
+
+def _apply_event(progress: Dict[str, Any], event: str, route: Optional[str], done: Optional[int],
+                 total: Optional[int], detail: Optional[str], now: float) -> Dict[str, Any]:
+    """Обновляет сводку прогресса задания событием (чистая функция над dict из progress_json)."""
+    routes = progress.setdefault("routes", {})
+    if route is None:
+        if event == EVENT_STARTED:
+            progress.update(started_at=now, total=total or 0)
+        elif event == EVENT_FLUSHED:
+            progress["flushed_at"] = now
+        progress["updated_at"] = now
+        return progress
+    item = routes.setdefault(route, {"status": "running", "done": 0, "total": total or 0, "detail": None})
+    if total is not None:
+        item["total"] = total
+    if event == EVENT_ITERATION:
+        item["done"] = max(item["done"], done or 0)
+        progress["last_iteration_at"] = now
+    elif event == EVENT_AGGREGATED:
+        item.update(status="aggregated", detail=detail)
+    elif event == EVENT_FAILED:
+        item.update(status="failed", detail=detail)
+    progress["updated_at"] = now
+    return progress
+
+
+def progress_estimate(progress: Optional[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Процент и ETA по сводке прогресса.
+    Латентность итерации — наблюдаемая: (время последней итерации - старт) / число итераций,
+    поэтому параллельные прогоны (max_workers, concurrency) учитываются сами.
+    :return: {"done", "total", "percent", "iteration_seconds", "eta_seconds"} (None — ещё нечего оценивать).
+    """
+    progress = progress or {}
+    now = time.time() if now is None else now
+    routes = progress.get("routes") or {}
+    # Завершённый роут засчитывается целиком (итерации без отчёта или ранний выход adaptive)
+    done = sum(max(item["done"], item["total"]) if item["status"] != "running" else item["done"]
+               for item in routes.values())
+    total = max(progress.get("total") or 0, sum(item["total"] for item in routes.values()), done)
+    iteration_seconds = eta = None
+    started_at, last_at = progress.get("started_at"), progress.get("last_iteration_at")
+    iterations = sum(item["done"] for item in routes.values())
+    if started_at and last_at and iterations:
+        iteration_seconds = (last_at - started_at) / iterations
+        eta = max(0.0, iteration_seconds * (total - done) - (now - last_at))
+    return {
+        "done": done,
+        "total": total,
+        "percent": round(100.0 * done / total, 1) if total else None,
+        "iteration_seconds": round(iteration_seconds, 1) if iteration_seconds is not None else None,
+        "eta_seconds": round(eta) if eta is not None else None,
+    }
+
+
+class JobStore:
+    """Обёртка над SQLite-файлом заданий. Соединение открывается на каждую операцию —
+    безопасно для MCP-сервера и detached-процессов заданий, пишущих параллельно."""
+
+    def __init__(self, path: Optional[Path] = None, legacy_json: Optional[Path] = LEGACY_JOBS_JSON_PATH):
+        self.path = Path(path or os.getenv("LIGHTHOUSE_JOB_STORE") or DEFAULT_JOB_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in _ADDED_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.executescript(_INDEXES)
+        if legacy_json is not None:
+            self._migrate_legacy_json(Path(legacy_json))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _migrate_legacy_json(self, legacy_json: Path) -> int:
+        """Импортирует задания из старого mcp_jobs.json (один раз). Возвращает число заданий."""
+        if not legacy_json.exists():
+            return 0
+        try:
+            with open(legacy_json, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Не удалось прочитать {legacy_json}: {e}")
+            return 0
+        rows = [
+            (job_id, job.get("kind") or "", json.dumps(job.get("payload") or {}, ensure_ascii=False),
+             job.get("status") or JOB_ERROR, job.get("created_at") or 0.0, job.get("started_at"),
+             job.get("ended_at"), job.get("result"), job.get("error"))
+            for job_id, job in (data.items() if isinstance(data, dict) else [])
+            if isinstance(job, dict)
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (job_id, kind, payload_json, status, created_at, started_at, "
+                "ended_at, result, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        try:
+            os.replace(legacy_json, legacy_json.with_name(f"{legacy_json.name}.migrated"))
+        except OSError:
+            pass  # уже перенесён параллельным процессом
+        print(f"[INFO] Задания из {legacy_json.name} перенесены в {self.path.name}: {len(rows)}")
+        return len(rows)
+
+    @staticmethod
+    def _assignments(fields: Dict[str, Any]) -> tuple:
+        unknown = set(fields) - set(_MUTABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Неизвестные поля задания: {', '.join(sorted(unknown))}")
+        return ", ".join(f"{column} = ?" for column in fields), list(fields.values())
+
+    # === Запись ===
+
+    def create(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None, priority: int = 0,
+               fingerprint: Optional[str] = None) -> str:
+        """Создаёт задание в статусе queued. Больший priority выбирается планировщиком раньше. Возвращает job_id."""
+        job_id = job_id or uuid.uuid4().hex[:8]
+        with self._connect() as conn:
+            self._insert(conn, job_id, kind, payload, priority, fingerprint)
+        return job_id
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, job_id: str, kind: str, payload: Dict[str, Any], priority: int,
+                fingerprint: Optional[str]) -> None:
+        conn.execute(
+            "INSERT INTO jobs (job_id, kind, payload_json, status, priority, fingerprint, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), JOB_QUEUED, priority, fingerprint, time.time()),
+        )
+
+    def create_or_attach(self, kind: str, payload: Dict[str, Any], fingerprint: str, reuse_seconds: float,
+                         priority: int = 0) -> Tuple[Dict[str, Any], bool]:
+        """
+        Дедупликация запросов в одной транзакции:
+          - есть задание с тем же fingerprint в очереди или в работе — возвращается оно
+            (priority поднимается, если новый запрос важнее, а задание ещё ждёт);
+          - есть завершённое успешно не раньше reuse_seconds назад — возвращается оно с результатом;
+          - иначе создаётся новое.
+        :return: (задание, создано_ли_новое).
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE fingerprint = ? AND (status IN ({', '.join('?' * (1 + len(ACTIVE_STATUSES)))}) "
+                "OR (status = ? AND ended_at >= ?)) ORDER BY created_at DESC LIMIT 1",
+                (fingerprint, JOB_QUEUED, *ACTIVE_STATUSES, JOB_DONE, time.time() - reuse_seconds),
+            ).fetchone()
+            if row is not None:
+                job = _row_to_job(row)
+                new_priority = max(priority, job["priority"]) if job["status"] == JOB_QUEUED else job["priority"]
+                conn.execute("UPDATE jobs SET attached = attached + 1, priority = ? WHERE job_id = ?",
+                             (new_priority, job["job_id"]))
+                conn.commit()
+                job.update(attached=job["attached"] + 1, priority=new_priority)
+                return job, False
+            job_id = uuid.uuid4().hex[:8]
+            self._insert(conn, job_id, kind, payload, priority, fingerprint)
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(job_id), True
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        """Меняет поля задания одним UPDATE. False — задания нет."""
+        if not fields:
+            return False
+        assignments, params = self._assignments(fields)
+        with self._connect() as conn:
+            cursor = conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", [*params, job_id])
+            return cursor.rowcount == 1
+
+    def transition(self, job_id: str, from_statuses: Iterable[str], to_status: str, **fields: Any) -> bool:
+        """
+        Атомарно переводит задание в to_status, только если текущий статус — один из from_statuses.
+        False — задания нет или его статус уже сменил другой процесс.
+        """
+        from_statuses = list(from_statuses)
+        assignments, params = self._assignments({"status": to_status, **fields})
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ? "
+                f"AND status IN ({', '.join('?' * len(from_statuses))})",
+                [*params, job_id, *from_statuses],
+            )
+            return cursor.rowcount == 1
+
+    def record_progress(self, job_id: str, event: str, route: Optional[str] = None, done: Optional[int] = None,
+                        total: Optional[int] = None, detail: Optional[str] = None) -> None:
+        """
+        Пишет событие прогресса в job_events и обновляет сводку progress_json задания
+        в одной транзакции. event — одно из PROGRESS_EVENTS.
+        """
+        if event not in PROGRESS_EVENTS:
+            raise ValueError(f"Неизвестное событие прогресса: {event}")
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT progress_json FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.rollback()
+                return
+            progress = json.loads(row["progress_json"]) if row["progress_json"] else {}
+            _apply_event(progress, event, route, done, total, detail, now)
+            conn.execute(
+                "INSERT INTO job_events (job_id, ts, event, route, done, total, detail) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, now, event, route, done, total, detail),
+            )
+            conn.execute("UPDATE jobs SET progress_json = ? WHERE job_id = ?",
+                         (json.dumps(progress, ensure_ascii=False), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """
+        Запрос отмены. Задание в очереди (queued/claimed) сразу переводится в cancelled,
+        выполняющемуся ставится cancel_requested — процесс задания остановится сам.
+        :return: Статус после запроса (cancelled, running или уже завершённый) или None — задания нет.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            status = row["status"]
+            if status in (JOB_QUEUED, JOB_CLAIMED):
+                conn.execute("UPDATE jobs SET status = ?, ended_at = ?, error = ? WHERE job_id = ?",
+                             (JOB_CANCELLED, time.time(), "Отменено до запуска", job_id))
+                status = JOB_CANCELLED
+            elif status == JOB_RUNNING:
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+            conn.commit()
+            return status
+        finally:
+            conn.close()
+
+    def cancel_requested(self, job_id: str) -> bool:
+        """Запрошена ли отмена задания (точечный SELECT по первичному ключу)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Отмечает, что процесс задания жив (см. JOB_HEARTBEAT_TTL), и возвращает cancel_requested."""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE job_id = ?", (time.time(), job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def reset_progress(self, job_id: str) -> None:
+        """Сбрасывает прогресс перед (пере)запуском задания."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            conn.execute("UPDATE jobs SET progress_json = NULL WHERE job_id = ?", (job_id,))
+
+    def prune(self, ttl_seconds: float, max_history: int) -> int:
+        """Удаляет завершённые задания старше ttl_seconds и сверх max_history последних. Возвращает число строк."""
+        finished = ", ".join("?" * len(FINISHED_STATUSES))
+        with self._connect() as conn:
+            expired = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({finished}) AND COALESCE(ended_at, created_at) < ?",
+                [*FINISHED_STATUSES, time.time() - ttl_seconds],
+            ).rowcount
+            overflow = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({finished}) AND job_id NOT IN ("
+                f"SELECT job_id FROM jobs WHERE status IN ({finished}) ORDER BY created_at DESC LIMIT ?)",
+                [*FINISHED_STATUSES, *FINISHED_STATUSES, max_history],
+            ).rowcount
+            if expired or overflow:
+                conn.execute("DELETE FROM job_events WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+        return expired + overflow
+
+    def claim_next(self, slots: Dict[str, int],
+                   weight: Callable[[Dict[str, Any]], int] = lambda job: 1) -> Optional[Dict[str, Any]]:
+        """
+        Выбирает следующее задание с учётом слотов и переводит его в claimed.
+
+        :param slots: Слоты по типу задания (kind); тип без записи не ограничен.
+        :param weight: Сколько слотов занимает задание (например, max_workers CLI-прогона).
+        Порядок — priority DESC, затем FIFO. Если голова очереди типа не помещается,
+        более поздние задания того же типа её не обгоняют. Задание тяжелее всех слотов
+        запускается, когда его тип свободен целиком.
+        Перед подсчётом слотов осиротевшие claimed/running задания переводятся в error (см. _orphan_reason).
+        :return: Задание (status=claimed) или None.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._fail_orphans(conn, now)
+            used: Dict[str, int] = {}
+            active = conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})", ACTIVE_STATUSES)
+            for row in active:
+                used[row["kind"]] = used.get(row["kind"], 0) + weight(_row_to_job(row))
+
+            blocked = set()
+            for row in conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, created_at",
+                                    (JOB_QUEUED,)):
+                kind = row["kind"]
+                if kind in blocked:
+                    continue
+                job = _row_to_job(row)
+                limit = slots.get(kind)
+                in_use = used.get(kind, 0)
+                if limit is not None and in_use and in_use + weight(job) > limit:
+                    blocked.add(kind)
+                    continue
+                conn.execute("UPDATE jobs SET status = ?, heartbeat = ?, pid = NULL WHERE job_id = ?",
+                             (JOB_CLAIMED, now, job["job_id"]))
+                conn.commit()
+                job.update(status=JOB_CLAIMED, heartbeat=now, pid=None)
+                return job
+            conn.commit()
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _fail_orphans(conn: sqlite3.Connection, now: float) -> None:
+        rows = conn.execute(
+            f"SELECT * FROM jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})", ACTIVE_STATUSES).fetchall()
+        for row in rows:
+            reason = _orphan_reason(row, now)
+            if reason:
+                conn.execute("UPDATE jobs SET status = ?, ended_at = ?, error = ? WHERE job_id = ?",
+                             (JOB_ERROR, now, reason, row["job_id"]))
+                print(f"[WARNING] Задание {row['job_id']} снято как осиротевшее: {reason}")
+
+    # === Аренда (один планировщик на файл) ===
+
+    def acquire_lease(self, name: str, owner: int, ttl: float) -> bool:
+        """Берёт или продлевает аренду name. False — её держит другой живой владелец."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (name, owner, heartbeat) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, heartbeat = excluded.heartbeat "
+                "WHERE leases.owner = excluded.owner OR leases.heartbeat < ?",
+                (name, owner, now, now - ttl),
+            )
+            return cursor.rowcount == 1
+
+    def lease_alive(self, name: str, ttl: float) -> bool:
+        """Есть ли у аренды владелец, продлевавший её не позже ttl секунд назад."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT heartbeat FROM leases WHERE name = ?", (name,)).fetchone()
+        return bool(row) and time.time() - row["heartbeat"] < ttl
+
+    def release_lease(self, name: str, owner: int) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    # === Чтение ===
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Задание по id (dict с payload) или None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list(self, statuses: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Задания (опционально — с нужными статусами), от старых к новым."""
+        query, params = "SELECT * FROM jobs", []
+        if statuses is not None:
+            statuses = list(statuses)
+            query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            params.extend(statuses)
+        query += " ORDER BY created_at"
+        if limit:
+            query = f"SELECT * FROM ({query} DESC LIMIT ?) ORDER BY created_at"
+            params.append(limit)
+        with self._connect() as conn:
+            return [_row_to_job(row) for row in conn.execute(query, params)]
+
+    def events(self, job_id: str, after_id: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """События прогресса задания с id > after_id (для инкрементального опроса), по порядку."""
+        query = "SELECT * FROM job_events WHERE job_id = ? AND id > ? ORDER BY id"
+        params: List[Any] = [job_id, after_id]
+        if limit:
+            query = f"SELECT * FROM ({query} DESC LIMIT ?) ORDER BY id"
+            params.append(limit)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def queue_stats(self, recent: int = 20) -> Dict[str, Dict[str, Any]]:
+        """
+        Глубина очереди по типам заданий:
+        {kind: {"queued", "active", "oldest_wait" (сек, самое старое queued), "avg_wait" (сек, последние recent стартов)}}.
+        """
+        now = time.time()
+        stats: Dict[str, Dict[str, Any]] = {}
+        with self._connect() as conn:
+            for row in conn.execute(
+                    "SELECT kind, status, COUNT(*) AS n, MIN(created_at) AS oldest FROM jobs "
+                    f"WHERE status IN ({', '.join('?' * (1 + len(ACTIVE_STATUSES)))}) GROUP BY kind, status",
+                    (JOB_QUEUED, *ACTIVE_STATUSES)):
+                item = stats.setdefault(row["kind"], {"queued": 0, "active": 0, "oldest_wait": 0.0, "avg_wait": None})
+                if row["status"] == JOB_QUEUED:
+                    item["queued"] = row["n"]
+                    item["oldest_wait"] = round(now - row["oldest"], 1)
+                else:
+                    item["active"] += row["n"]
+            for row in conn.execute(
+                    "SELECT kind, AVG(started_at - created_at) AS wait FROM ("
+                    "SELECT kind, started_at, created_at FROM jobs WHERE started_at IS NOT NULL "
+                    "ORDER BY started_at DESC LIMIT ?) GROUP BY kind", (recent,)):
+                item = stats.setdefault(row["kind"], {"queued": 0, "active": 0, "oldest_wait": 0.0, "avg_wait": None})
+                item["avg_wait"] = round(row["wait"], 1)
+        return stats
+
+
+class JobCancellation:
+    """
+    Проверка остановки для процесса задания: should_stop() для SpeedtestService / cli_runner.
+    True — запрошена отмена (request_cancel) или наступил deadline. Очередь опрашивается
+    не чаще poll_interval секунд — проверку можно звать на каждой итерации и в цикле ожидания.
+    Каждый опрос заодно продлевает heartbeat задания: без него claim_next сочтёт процесс мёртвым.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, deadline: Optional[float] = None, poll_interval: float = 2.0):
+        self.store = store
+        self.job_id = job_id
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self.reason: Optional[str] = None  # "cancelled" | "timeout"
+        self._checked_at = 0.0
+
+    def __call__(self) -> bool:
+        if self.reason:
+            return True
+        now = time.time()
+        if self.deadline is not None and now >= self.deadline:
+            self.reason = "timeout"
+        elif now - self._checked_at >= self.poll_interval:
+            self._checked_at = now
+            try:
+                if self.store.heartbeat(self.job_id):
+                    self.reason = "cancelled"
+            except sqlite3.Error as e:
+                print(f"[WARNING] Не удалось проверить отмену задания {self.job_id}: {e}")
+        return self.reason is not None
+
+
+_default_store: Optional[JobStore] = None
+
+
+def get_job_store() -> JobStore:
+    """Общий JobStore процесса (путь — LIGHTHOUSE_JOB_STORE или Reports/reports_lighthouse/mcp_jobs.sqlite3)."""
+    global _default_store
+    if _default_store is None:
+        _default_store = JobStore()
+    return _default_store
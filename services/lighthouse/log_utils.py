@@ -0,0 +1,17 @@
+"""
+Логирование модулей Lighthouse.
+
+Модули импортируют отсюда print вместо встроенного:
+    from services.lighthouse.log_utils import print
+"""
+
+import builtins
+
+
+def print(*args, **kwargs):
+    try:
+        builtins.print(*args, **kwargs)
+    except OSError:
+        # В batch/MCP режиме поток логов может оказаться закрыт.
+        # Ошибка логирования не должна обрывать сам запуск Lighthouse.
+        pass
@@ -8,15 +8,13 @@ MCP-сервер для Lighthouse Automation.
 Регистрация: claude mcp add lighthouse -- python C:/Study/pytest_template_SkyPro/services/lighthouse/mcp_server.py
 """
 
-import configparser
-import json
+import functools
 import os
 import shutil
 import subprocess
 import sys
 import time
 import traceback
-import uuid
 from typing import List, Optional, Dict, Any
 
 # MCP stdio: stdout зарезервирован для JSON-RPC.
@@ -32,7 +30,10 @@ os.chdir(ROOT_DIR)
 
 import argparse
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+
+# Процессы заданий и планировщик (--execute-job / --scheduler) MCP-транспорт не поднимают:
+# FastMCP (pydantic, starlette, anyio) не импортируется, tools регистрируются в пустой реестр.
+_BACKGROUND_ENTRYPOINT = "--execute-job" in sys.argv or "--scheduler" in sys.argv
 
 # Загружаем .env (абсолютный путь — не зависит от cwd)
 dotenv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "configs", "config_lighthouse.env")
@@ -40,6 +41,11 @@ load_dotenv(dotenv_path, override=True)
 
 import services.lighthouse.configs.config_lighthouse as cfg
 from contextlib import contextmanager
+from services.lighthouse.job_scheduler import LEASE_TTL, SCHEDULER_LEASE, JobScheduler, job_slots
+from services.lighthouse.job_store import (
+    JOB_CANCELLED, JOB_CLAIMED, JOB_DONE, JOB_ERROR, JOB_QUEUED, JOB_RUNNING, JobCancellation, get_job_store,
+    payload_fingerprint, progress_estimate,
+)
 
 CONFIG_PATH = cfg.CONFIG_PATH
 
@@ -56,14 +62,29 @@ def _suppress_stdout():
         sys.stdout = old
 ROUTES_CONFIG_PATH = cfg.ROUTES_CONFIG_PATH
 
-mcp = FastMCP("lighthouse")
+
+class _ToolRegistry:
+    """Замена FastMCP для фоновых процессов: @mcp.tool() оставляет функцию как есть."""
+
+    def tool(self, *args, **kwargs):
+        return lambda func: func
+
+
+if _BACKGROUND_ENTRYPOINT:
+    mcp = _ToolRegistry()
+else:
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("lighthouse")
+
 
 DEFAULT_ITERATIONS = 5
 DEFAULT_DEVICES = ["desktop", "mobile"]
-JOBS_STATE_PATH = os.path.join(ROOT_DIR, "Reports", "reports_lighthouse", "mcp_jobs.json")
 MCP_LOG_PATH = os.path.join(ROOT_DIR, "Reports", "reports_lighthouse", "mcp_server.log")
 MAX_JOBS_HISTORY = 100
 JOB_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_JOB_REUSE_SECONDS = 15 * 60  # окно переиспользования готового результата; MCP_JOB_REUSE_SECONDS
+DEFAULT_JOB_TIMEOUT_SECONDS = 4 * 60 * 60  # дедлайн выполнения задания; MCP_JOB_TIMEOUT или timeout_minutes
 
 os.makedirs(os.path.dirname(MCP_LOG_PATH), exist_ok=True)
 
@@ -88,29 +109,17 @@ _log_info(f"dotenv_path={dotenv_path}")
 
 
 def _read_environments() -> dict:
-    """Читает все контуры из base_urls.ini."""
-    config = configparser.ConfigParser()
-    config.read(CONFIG_PATH, encoding="utf-8")
-    current = config["environments"]["current"]
-    envs = {}
-    for section in config.sections():
-        if section == "environments":
-            continue
-        base_url = config[section].get("BASE_URL", "—")
-        envs[section] = {
-            "BASE_URL": base_url,
-            "active": section == current,
-        }
-    return envs
+    """Все контуры из снимка base_urls.ini."""
+    config = cfg.get_config()
+    return {
+        name: {"BASE_URL": section.get("base_url", "—"), "active": name == config.current_environment}
+        for name, section in config.environments.items()
+    }
 
 
 def _read_routes() -> dict:
-    """Читает роуты из routes.ini."""
-    config = configparser.ConfigParser()
-    config.read(ROUTES_CONFIG_PATH, encoding="utf-8")
-    if "routes" not in config:
-        return {}
-    return dict(config["routes"])
+    """Роуты из снимка routes.ini."""
+    return dict(cfg.get_config().routes)
 
 
 def _resolve_routes(requested: Optional[List[str]]) -> List[str]:
@@ -144,23 +153,8 @@ def _resolve_environment_name(environment: Optional[str]) -> str:
 
 
 def _read_dashboard_context(environment: Optional[str]) -> Dict[str, Any]:
-    env_name = _resolve_environment_name(environment).upper()
-    if "_" not in env_name:
-        return {}
-    project, env = env_name.split("_", 1)
-    spreadsheet_id = os.getenv("GS_SHEET_ID")
-    if not spreadsheet_id:
-        return {}
-    try:
-        from services.google.google_sheets_client import GoogleSheetsClient
-        creds_path = cfg.get_google_creds_path()
-        context = GoogleSheetsClient.read_dashboard_sprint_context(str(creds_path), spreadsheet_id, project)
-        context["project"] = project
-        context["environment"] = env
-        return context
-    except Exception:
-        _log_exception(f"Failed to read dashboard context for environment={environment}")
-        return {}
+    from services.lighthouse.dashboard_context import read_dashboard_context
+    return read_dashboard_context(_resolve_environment_name(environment))
 
 
 def _resolve_sprint(sprint: Optional[str], environment: Optional[str] = None) -> str:
@@ -184,109 +178,37 @@ def _resolve_launch_context(tag: Optional[str], sprint: Optional[str], environme
     return _resolve_tag(tag, environment), _resolve_sprint(sprint, environment)
 
 
-def _queue_lighthouse_job(routes: List[str], device: str, iterations: int, environment: Optional[str], tag: Optional[str], sprint: Optional[str]) -> str:
+def _queue_lighthouse_job(routes: List[str], device: str, iterations: int, environment: Optional[str], tag: Optional[str], sprint: Optional[str], max_workers: int = 1, use_daemon: bool = False, priority: int = 0, force: bool = False, timeout_minutes: Optional[int] = None) -> str:
     job_id = _register_job(
         kind="lighthouse_cli",
-        payload={"routes": routes, "device": device, "iterations": iterations, "environment": environment, "tag": tag, "sprint": sprint},
+        payload={"routes": routes, "device": device, "iterations": iterations, "environment": environment, "tag": tag, "sprint": sprint, "max_workers": max_workers, "use_daemon": use_daemon, "timeout_minutes": timeout_minutes},
+        priority=priority,
+        force=force,
     )
     return job_id
 
 
-def _queue_api_job(routes: List[str], device: str, iterations: int, environment: Optional[str], tag: Optional[str], sprint: Optional[str]) -> str:
+def _queue_api_job(routes: List[str], device: str, iterations: int, environment: Optional[str], tag: Optional[str], sprint: Optional[str], concurrency: int = 1, priority: int = 0, force: bool = False, timeout_minutes: Optional[int] = None) -> str:
     job_id = _register_job(
         kind="lighthouse_api",
-        payload={"routes": routes, "device": device, "iterations": iterations, "environment": environment, "tag": tag, "sprint": sprint},
+        payload={"routes": routes, "device": device, "iterations": iterations, "environment": environment, "tag": tag, "sprint": sprint, "concurrency": concurrency, "timeout_minutes": timeout_minutes},
+        priority=priority,
+        force=force,
     )
     return job_id
 
 
 
-def _ensure_jobs_state_dir() -> None:
-    os.makedirs(os.path.dirname(JOBS_STATE_PATH), exist_ok=True)
-
-
-def _load_jobs_state() -> Dict[str, Dict[str, Any]]:
-    _ensure_jobs_state_dir()
-    if not os.path.exists(JOBS_STATE_PATH):
-        return {}
+def _update_job_state(job_id: str, **changes: Any) -> None:
     try:
-        with open(JOBS_STATE_PATH, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        return data if isinstance(data, dict) else {}
+        get_job_store().update(job_id, **changes)
     except Exception:
-        _log_exception("Failed to load jobs state")
-        return {}
-
-
-def _save_jobs_state(data: Dict[str, Dict[str, Any]]) -> None:
-    _ensure_jobs_state_dir()
-    tmp_path = f"{JOBS_STATE_PATH}.{os.getpid()}.tmp"
-    for attempt in range(3):
-        try:
-            with open(tmp_path, "w", encoding="utf-8") as file:
-                json.dump(data, file, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, JOBS_STATE_PATH)
-            return
-        except PermissionError:
-            if attempt < 2:
-                time.sleep(0.5 * (attempt + 1))
-            else:
-                _log_exception("Failed to save jobs state after retries")
-        except Exception:
-            _log_exception("Failed to save jobs state")
-            break
-    # Не падаем — job продолжит работу даже если state не сохранился
-    try:
-        os.remove(tmp_path)
-    except OSError:
-        pass
+        # Не падаем — job продолжит работу даже если state не сохранился
+        _log_exception(f"Failed to update job state job_id={job_id}")
 
 
-def _prune_jobs_state(data: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
-    now = time.time()
-    items = sorted(
-        data.items(),
-        key=lambda item: item[1].get("created_at") or 0,
-        reverse=True,
-    )
-    kept: Dict[str, Dict[str, Any]] = {}
-    completed: List[tuple[str, Dict[str, Any]]] = []
-
-    for job_id, job in items:
-        status = job.get("status")
-        ended_at = job.get("ended_at") or job.get("created_at") or now
-        is_finished = status in {"done", "error"}
-        if is_finished and (now - ended_at) > JOB_TTL_SECONDS:
-            continue
-        if is_finished:
-            completed.append((job_id, job))
-            continue
-        kept[job_id] = job
-
-    for job_id, job in completed[:MAX_JOBS_HISTORY]:
-        kept[job_id] = job
-
-    return dict(sorted(kept.items(), key=lambda item: item[1].get("created_at") or 0))
-
-
-def _load_pruned_jobs_state() -> Dict[str, Dict[str, Any]]:
-    jobs = _load_jobs_state()
-    pruned = _prune_jobs_state(jobs)
-    if pruned != jobs:
-        _save_jobs_state(pruned)
-    return pruned
-
-
-def _update_job_state(job_id: str, **changes: Any) -> None:
-    jobs = _load_pruned_jobs_state()
-    if job_id not in jobs:
-        return
-    jobs[job_id].update(changes)
-    _save_jobs_state(jobs)
-
-
-def _spawn_job_process(job_id: str) -> None:
-    command = [sys.executable, os.path.abspath(__file__), "--execute-job", job_id]
+def _spawn_detached(args: List[str]) -> subprocess.Popen:
+    command = [sys.executable, os.path.abspath(__file__), *args]
     kwargs: Dict[str, Any] = {
         "cwd": ROOT_DIR,
         "stdout": subprocess.DEVNULL,
@@ -298,39 +220,84 @@ def _spawn_job_process(job_id: str) -> None:
         kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
     else:
         kwargs["start_new_session"] = True
+    return subprocess.Popen(command, **kwargs)
+
+
+def _spawn_job_process(job_id: str) -> subprocess.Popen:
     _log_info(f"Spawning background job process for job_id={job_id}")
-    subprocess.Popen(command, **kwargs)
+    return _spawn_detached(["--execute-job", job_id])
+
+
+def _dispatch_job(job_id: str) -> None:
+    """Задание ждёт в очереди планировщика; если живого планировщика нет — поднимаем его.
+    MCP_SCHEDULER=0 — старое поведение: процесс на задание сразу, без ограничения слотов."""
+    if os.getenv("MCP_SCHEDULER", "1") == "0":
+        _spawn_job_process(job_id)
+        return
+    if not get_job_store().lease_alive(SCHEDULER_LEASE, LEASE_TTL):
+        _log_info("Spawning job scheduler process")
+        _spawn_detached(["--scheduler"])
+
+
+def _run_scheduler() -> int:
+    _log_info("scheduler started")
+    return JobScheduler(get_job_store(), _spawn_job_process).run()
 
 
 def _execute_job(job_id: str) -> int:
-    jobs = _load_pruned_jobs_state()
-    job = jobs.get(job_id)
+    store = get_job_store()
+    job = store.get(job_id)
     if not job:
         _log_info(f"execute_job: job_id={job_id} not found")
         return 1
-    _update_job_state(job_id, status="running", started_at=time.time(), ended_at=None, result=None, error=None)
+    payload = job.get("payload") or {}
+    started_at = time.time()
+    deadline = started_at + _job_timeout_seconds(payload)
+    # Атомарный захват: задание, уже взятое другим процессом, не выполняется повторно
+    if not store.transition(job_id, [JOB_QUEUED, JOB_CLAIMED], JOB_RUNNING, started_at=started_at, ended_at=None,
+                            result=None, error=None, deadline=deadline, pid=os.getpid(), heartbeat=started_at):
+        _log_info(f"execute_job: job_id={job_id} is not queued (status={job['status']})")
+        return 1
+    should_stop = JobCancellation(store, job_id, deadline=deadline)
     try:
         _log_info(f"execute_job: start job_id={job_id} kind={job.get('kind')}")
-        result = _run_job(job["kind"], job.get("payload") or {})
-        _update_job_state(job_id, status="done", ended_at=time.time(), result=result, error=None)
+        store.reset_progress(job_id)
+        result = _run_job(job["kind"], payload, functools.partial(store.record_progress, job_id), should_stop)
+        if should_stop.reason:
+            reason = ("отменено через cancel_job" if should_stop.reason == "cancelled"
+                      else f"превышен дедлайн задания ({_job_timeout_seconds(payload) / 60:.0f} мин)")
+            _update_job_state(job_id, status=JOB_CANCELLED, ended_at=time.time(), result=result, error=reason)
+            _log_info(f"execute_job: cancelled job_id={job_id} ({should_stop.reason})")
+            return 0
+        _update_job_state(job_id, status=JOB_DONE, ended_at=time.time(), result=result, error=None)
         _log_info(f"execute_job: done job_id={job_id}")
         return 0
     except Exception as e:  # noqa: BLE001
         _log_exception(f"execute_job: failed job_id={job_id}")
         _update_job_state(
             job_id,
-            status="error",
+            status=JOB_ERROR,
             ended_at=time.time(),
             error=f"{e} | {traceback.format_exc(limit=2)}",
         )
         return 1
 
 
-def _run_job(kind: str, payload: dict) -> str:
+def _job_timeout_seconds(payload: dict) -> float:
+    """Дедлайн задания: timeout_minutes из payload, иначе MCP_JOB_TIMEOUT (сек), иначе 4 часа."""
+    if payload.get("timeout_minutes"):
+        return float(payload["timeout_minutes"]) * 60
+    try:
+        return float(os.getenv("MCP_JOB_TIMEOUT", DEFAULT_JOB_TIMEOUT_SECONDS))
+    except ValueError:
+        return DEFAULT_JOB_TIMEOUT_SECONDS
+
+
+def _run_job(kind: str, payload: dict, progress_callback=None, should_stop=None) -> str:
     if kind == "lighthouse_cli":
-        return _run_lighthouse_job(payload)
+        return _run_lighthouse_job(payload, progress_callback, should_stop)
     if kind == "lighthouse_api":
-        return _run_api_job(payload)
+        return _run_api_job(payload, progress_callback, should_stop)
     if kind == "crux":
         return _run_crux_job(payload)
     raise ValueError(f"Unknown job kind: {kind}")
@@ -349,7 +316,7 @@ def _format_summary(summary: dict, env_name: str, payload: dict, resolved_sprint
     return "\n".join(parts)
 
 
-def _run_lighthouse_job(payload: dict) -> str:
+def _run_lighthouse_job(payload: dict, progress_callback=None, should_stop=None) -> str:
     with _suppress_stdout():
         from services.lighthouse.pagespeed_service import SpeedtestService
         env_name = _resolve_environment_name(payload.get("environment"))
@@ -363,11 +330,15 @@ def _run_lighthouse_job(payload: dict) -> str:
             base_url=base_url,
             tag=resolved_tag,
             sprint=resolved_sprint,
+            max_workers=int(payload.get("max_workers") or 1),
+            use_daemon=bool(payload.get("use_daemon")),
+            progress_callback=progress_callback,
+            should_stop=should_stop,
         )
     return _format_summary(summary, env_name, payload, resolved_sprint, resolved_tag)
 
 
-def _run_api_job(payload: dict) -> str:
+def _run_api_job(payload: dict, progress_callback=None, should_stop=None) -> str:
     with _suppress_stdout():
         from services.lighthouse.pagespeed_service import SpeedtestService
         env_name = _resolve_environment_name(payload.get("environment"))
@@ -381,6 +352,9 @@ def _run_api_job(payload: dict) -> str:
             base_url=base_url,
             tag=resolved_tag,
             sprint=resolved_sprint,
+            concurrency=int(payload.get("concurrency") or 1),
+            progress_callback=progress_callback,
+            should_stop=should_stop,
         )
     return _format_summary(summary, env_name, payload, resolved_sprint, resolved_tag)
 
@@ -398,6 +372,7 @@ def _run_crux_job(payload: dict) -> str:
             base_url=base_url,
             tag=resolved_tag,
             sprint=resolved_sprint,
+            force_refresh=bool(payload.get("force_refresh")),
         )
     return _format_summary(summary, env_name, payload, resolved_sprint, resolved_tag)
 
@@ -405,25 +380,54 @@ def _run_crux_job(payload: dict) -> str:
 # ─── Мини-очередь заданий (fire-and-forget + статус) ─────────────────────────
 
 
-def _register_job(kind: str, payload: dict) -> str:
-    job_id = uuid.uuid4().hex[:8]
-    jobs = _load_pruned_jobs_state()
-    jobs[job_id] = {
-        "kind": kind,
-        "payload": payload,
-        "status": "queued",
-        "created_at": time.time(),
-        "started_at": None,
-        "ended_at": None,
-        "result": None,
-        "error": None,
-    }
-    _save_jobs_state(jobs)
+def _job_reuse_seconds() -> float:
+    try:
+        return float(os.getenv("MCP_JOB_REUSE_SECONDS", DEFAULT_JOB_REUSE_SECONDS))
+    except ValueError:
+        return DEFAULT_JOB_REUSE_SECONDS
+
+
+def _job_fingerprint(kind: str, payload: dict) -> str:
+    """Fingerprint запроса: окружение по умолчанию раскрыто, пустые tag/sprint равны None."""
+    canonical = dict(payload)
+    canonical["environment"] = _resolve_environment_name(payload.get("environment")).upper()
+    for key in ("tag", "sprint"):
+        canonical[key] = payload.get(key) or ""
+    return payload_fingerprint(kind, canonical)
+
+
+def _register_job(kind: str, payload: dict, priority: int = 0, force: bool = False) -> str:
+    """
+    Ставит задание в очередь. Без force идентичный запрос (тот же fingerprint) получает
+    задание, которое ещё ждёт или выполняется, либо готовый результат не старше
+    MCP_JOB_REUSE_SECONDS — без нового прогона.
+    """
+    store = get_job_store()
+    store.prune(JOB_TTL_SECONDS, MAX_JOBS_HISTORY)
+    fingerprint = _job_fingerprint(kind, payload)
+    if force:
+        job_id = store.create(kind, payload, priority=priority, fingerprint=fingerprint)
+    else:
+        job, created = store.create_or_attach(kind, payload, fingerprint, _job_reuse_seconds(), priority=priority)
+        job_id = job["job_id"]
+        if not created:
+            _log_info(f"register_job: reuse job_id={job_id} status={job['status']} kind={kind} payload={payload}")
+            return job_id
     _log_info(f"register_job: job_id={job_id} kind={kind} payload={payload}")
-    _spawn_job_process(job_id)
+    _dispatch_job(job_id)
     return job_id
 
 
+def _enqueue_label(job_id: str, kind: str) -> str:
+    job = get_job_store().get(job_id) or {}
+    status = job.get("status") or JOB_QUEUED
+    if status == JOB_DONE:
+        return f"{kind}: готовый результат, см. job_status"
+    if job.get("attached"):
+        return f"{kind}: присоединено к заданию ({status})"
+    return f"{kind} {status}"
+
+
 # ─── Tools ────────────────────────────────────────────────────────────────────
 
 
@@ -435,6 +439,7 @@ def run_lighthouse(
     environment: Optional[str] = None,
     tag: Optional[str] = None,
     sprint: Optional[str] = None,
+    max_workers: int = 1,
 ) -> str:
     """Запускает Lighthouse CLI для указанных роутов.
 
@@ -447,6 +452,7 @@ def run_lighthouse(
         device: Тип устройства — "desktop" или "mobile".
         iterations: Количество итераций (по умолчанию 10).
         environment: Контур (например "VRP_DEV"). Если не указан — используется текущий.
+        max_workers: Число параллельных Lighthouse-процессов (1 — последовательно).
     """
     with _suppress_stdout():
         from services.lighthouse.pagespeed_service import SpeedtestService
@@ -464,6 +470,7 @@ def run_lighthouse(
             base_url=base_url,
             tag=resolved_tag,
             sprint=resolved_sprint,
+            max_workers=max_workers,
         )
 
     return (
@@ -485,6 +492,7 @@ def run_crux(
     environment: Optional[str] = None,
     tag: Optional[str] = None,
     sprint: Optional[str] = None,
+    force_refresh: bool = False,
 ) -> str:
     """Собирает CrUX данные (Chrome User Experience Report) для указанных роутов.
 
@@ -495,6 +503,7 @@ def run_crux(
         routes: Список ключей роутов из routes.ini.
         device: Тип устройства — "desktop" или "mobile".
         environment: Контур (рекомендуется *_PROD). Если не указан — текущий.
+        force_refresh: Игнорировать кэш CrUX и запросить PSI заново.
     """
     with _suppress_stdout():
         from services.lighthouse.pagespeed_service import SpeedtestService
@@ -517,6 +526,7 @@ def run_crux(
             base_url=base_url,
             tag=resolved_tag,
             sprint=resolved_sprint,
+            force_refresh=force_refresh,
         )
 
     return (
@@ -563,7 +573,8 @@ def list_routes() -> str:
 def get_status() -> str:
     """Проверяет готовность системы: наличие Lighthouse CLI и подключение к Google Sheets.
 
-    Возвращает статус каждого компонента.
+    Возвращает статус каждого компонента, глубину очереди заданий по слотам
+    и остаток общей квоты PageSpeed API.
     """
     with _suppress_stdout():
         results = []
@@ -591,6 +602,36 @@ def get_status() -> str:
         except Exception as e:
             results.append(f"Текущий контур: ✗ ошибка — {e}")
 
+        try:
+            store = get_job_store()
+            scheduler_ok = store.lease_alive(SCHEDULER_LEASE, LEASE_TTL)
+            results.append(f"Планировщик заданий: {'✓ работает' if scheduler_ok else '— не запущен (стартует при enqueue)'}")
+            stats = store.queue_stats()
+            for kind, limit in job_slots().items():
+                item = stats.get(kind) or {"queued": 0, "active": 0, "oldest_wait": 0.0, "avg_wait": None}
+                line = f"Очередь {kind}: в очереди {item['queued']}, выполняется {item['active']} (слотов {limit})"
+                if item["queued"]:
+                    line += f", самое старое ждёт {item['oldest_wait']:.0f}с"
+                if item["avg_wait"] is not None:
+                    line += f", среднее ожидание {item['avg_wait']:.0f}с"
+                results.append(line)
+        except Exception as e:
+            results.append(f"Очередь заданий: ✗ ошибка — {e}")
+
+        try:
+            from services.lighthouse.pagespeed_service import _api_rate_limiter
+            quota = _api_rate_limiter.status()
+            daily, rate = quota["daily"], quota["rate"]
+            line = (
+                f"PSI квота: сегодня {daily['used']}/{daily['limit']} (осталось {daily['remaining']}), "
+                f"токенов {rate['tokens']:g}/{rate['capacity']:g}"
+            )
+            if rate["backoff_seconds"]:
+                line += f", backoff {rate['backoff_seconds']:g}с после 429"
+            results.append(line)
+        except Exception as e:
+            results.append(f"PSI квота: ✗ ошибка — {e}")
+
     return "\n".join(results)
 
 
@@ -602,12 +643,39 @@ def _format_job(job_id: str, data: dict) -> str:
     env = payload.get("environment") or payload.get("env") or "—"
     routes = payload.get("routes") or payload.get("route_keys") or []
     device = payload.get("device", "—")
+    status = data["status"]
+    if status == JOB_RUNNING and data.get("progress"):
+        estimate = progress_estimate(data["progress"])
+        if estimate["percent"] is not None:
+            status += f" {estimate['percent']:.0f}%"
     return (
-        f"{job_id}: {data['status']} | {data.get('kind')} | env={env} | "
+        f"{job_id}: {status} | {data.get('kind')} | env={env} | "
         f"routes={routes} | device={device}"
     )
 
 
+def _format_progress(data: dict) -> str:
+    """Прогресс задания из сводки progress_json: процент, ETA и частичные итоги по роутам."""
+    progress = data.get("progress") or {}
+    estimate = progress_estimate(progress)
+    line = f"progress: {estimate['done']}/{estimate['total']} итераций"
+    if estimate["percent"] is not None:
+        line += f" ({estimate['percent']:.0f}%)"
+    if estimate["iteration_seconds"] is not None:
+        line += f", ~{estimate['iteration_seconds']:.0f}с/итерация"
+    if data.get("status") == JOB_RUNNING and estimate["eta_seconds"] is not None:
+        line += f", ETA ~{estimate['eta_seconds'] // 60:.0f}м {estimate['eta_seconds'] % 60:.0f}с"
+    if progress.get("flushed_at"):
+        line += ", записано в Sheets"
+    lines = [line]
+    for route, item in (progress.get("routes") or {}).items():
+        route_line = f"  {route}: {item['status']} {item['done']}/{item['total']}"
+        if item.get("detail"):
+            route_line += f" — {item['detail']}"
+        lines.append(route_line)
+    return "\n".join(lines)
+
+
 @mcp.tool()
 def enqueue_lighthouse(
     routes: List[str],
@@ -616,10 +684,21 @@ def enqueue_lighthouse(
     environment: Optional[str] = None,
     tag: Optional[str] = None,
     sprint: Optional[str] = None,
+    max_workers: int = 1,
+    use_daemon: bool = False,
+    priority: int = 0,
+    force: bool = False,
+    timeout_minutes: Optional[int] = None,
 ) -> str:
     """Добавляет задание на Lighthouse CLI в очередь и сразу возвращает job_id.
 
     Если sprint/tag не переданы явно, они берутся из dashboard.
+    priority — больший запускается планировщиком раньше (при равном — по очереди).
+    Идентичный запрос присоединяется к заданию в работе или получает свежий результат; force=True — новый прогон.
+    timeout_minutes — дедлайн выполнения (по умолчанию MCP_JOB_TIMEOUT, 4 часа); по истечении задание
+    останавливается со статусом cancelled, уже агрегированные роуты сохраняются.
+    max_workers > 1 — итерации выполняются параллельно (см. колонку concurrency).
+    use_daemon — итерации идут через прогретый Node/Chrome вместо процесса на итерацию.
     """
 
     job_id = _queue_lighthouse_job(
@@ -629,8 +708,13 @@ def enqueue_lighthouse(
         environment=environment,
         tag=tag,
         sprint=sprint,
+        max_workers=max_workers,
+        use_daemon=use_daemon,
+        priority=priority,
+        force=force,
+        timeout_minutes=timeout_minutes,
     )
-    return f"job_id={job_id} (lighthouse_cli queued)"
+    return f"job_id={job_id} ({_enqueue_label(job_id, 'lighthouse_cli')})"
 
 
 @mcp.tool()
@@ -641,10 +725,17 @@ def enqueue_environment_saturation(
     iterations: int = DEFAULT_ITERATIONS,
     tag: Optional[str] = None,
     sprint: Optional[str] = None,
+    max_workers: int = 1,
+    priority: int = 0,
+    force: bool = False,
+    timeout_minutes: Optional[int] = None,
 ) -> str:
     """Запускает серию прогонов для всех указанных маршрутов и устройств.
 
     Если sprint/tag не переданы явно, они берутся из dashboard.
+    priority — больший запускается планировщиком раньше (при равном — по очереди).
+    Идентичный запрос присоединяется к заданию в работе или получает свежий результат; force=True — новый прогон.
+    timeout_minutes — дедлайн выполнения каждого задания (см. enqueue_lighthouse).
     """
 
     resolved_routes = _resolve_routes(routes)
@@ -660,6 +751,10 @@ def enqueue_environment_saturation(
             environment=environment,
             tag=tag,
             sprint=sprint,
+            max_workers=max_workers,
+            priority=priority,
+            force=force,
+            timeout_minutes=timeout_minutes,
         )
         job_ids.append(job_id)
 
@@ -678,10 +773,18 @@ def enqueue_api(
     environment: Optional[str] = None,
     tag: Optional[str] = None,
     sprint: Optional[str] = None,
+    concurrency: int = 1,
+    priority: int = 0,
+    force: bool = False,
+    timeout_minutes: Optional[int] = None,
 ) -> str:
     """Добавляет задание на Lighthouse API в очередь и сразу возвращает job_id.
 
     Если sprint/tag не переданы явно, они берутся из dashboard.
+    priority — больший запускается планировщиком раньше (при равном — по очереди).
+    Идентичный запрос присоединяется к заданию в работе или получает свежий результат; force=True — новый прогон.
+    concurrency > 1 — одновременные PSI-запросы через общий пул соединений.
+    timeout_minutes — дедлайн выполнения (см. enqueue_lighthouse).
     """
 
     job_id = _queue_api_job(
@@ -691,8 +794,12 @@ def enqueue_api(
         environment=environment,
         tag=tag,
         sprint=sprint,
+        concurrency=concurrency,
+        priority=priority,
+        force=force,
+        timeout_minutes=timeout_minutes,
     )
-    return f"job_id={job_id} (lighthouse_api queued)"
+    return f"job_id={job_id} ({_enqueue_label(job_id, 'lighthouse_api')})"
 
 
 @mcp.tool()
@@ -703,10 +810,18 @@ def enqueue_api_saturation(
     iterations: int = DEFAULT_ITERATIONS,
     tag: Optional[str] = None,
     sprint: Optional[str] = None,
+    concurrency: int = 1,
+    priority: int = 0,
+    force: bool = False,
+    timeout_minutes: Optional[int] = None,
 ) -> str:
     """Запускает серию API-прогонов для всех указанных маршрутов и устройств.
 
     Если sprint/tag не переданы явно, они берутся из dashboard.
+    priority — больший запускается планировщиком раньше (при равном — по очереди).
+    Идентичный запрос присоединяется к заданию в работе или получает свежий результат; force=True — новый прогон.
+    concurrency > 1 — одновременные PSI-запросы через общий пул соединений.
+    timeout_minutes — дедлайн выполнения каждого задания (см. enqueue_lighthouse).
     """
 
     resolved_routes = _resolve_routes(routes)
@@ -721,6 +836,10 @@ def enqueue_api_saturation(
             environment=environment,
             tag=tag,
             sprint=sprint,
+            concurrency=concurrency,
+            priority=priority,
+            force=force,
+            timeout_minutes=timeout_minutes,
         )
         job_ids.append(job_id)
 
@@ -732,37 +851,47 @@ def enqueue_api_saturation(
 
 
 @mcp.tool()
-def enqueue_crux(routes: List[str], device: str, environment: Optional[str] = None, tag: Optional[str] = None, sprint: Optional[str] = None) -> str:
+def enqueue_crux(routes: List[str], device: str, environment: Optional[str] = None, tag: Optional[str] = None, sprint: Optional[str] = None, force_refresh: bool = False, priority: int = 0, force: bool = False) -> str:
     """Добавляет задание на CrUX сбор в очередь и возвращает job_id.
 
     Если sprint/tag не переданы явно, они берутся из dashboard.
+    priority — больший запускается планировщиком раньше (при равном — по очереди).
+    Идентичный запрос присоединяется к заданию в работе или получает свежий результат; force=True — новый прогон.
+    Ответы PSI кэшируются (CRUX_CACHE_TTL); force_refresh=True — запросить заново.
     """
 
     job_id = _register_job(
         kind="crux",
-        payload={"routes": routes, "device": device, "environment": environment, "tag": tag, "sprint": sprint},
+        payload={"routes": routes, "device": device, "environment": environment, "tag": tag, "sprint": sprint, "force_refresh": force_refresh},
+        priority=priority,
+        force=force,
     )
-    return f"job_id={job_id} (crux queued)"
+    return f"job_id={job_id} ({_enqueue_label(job_id, 'crux')})"
 
 
 @mcp.tool()
 def list_jobs() -> str:
     """Возвращает краткий статус по всем заданиям в очереди."""
-    jobs = _load_pruned_jobs_state()
+    jobs = get_job_store().list(limit=MAX_JOBS_HISTORY)
     if not jobs:
         return "Очередь пуста."
-    lines = [_format_job(jid, data) for jid, data in jobs.items()]
+    lines = [_format_job(data["job_id"], data) for data in jobs]
     return "\n".join(lines)
 
 
 @mcp.tool()
 def job_status(job_id: str) -> str:
-    """Возвращает статус конкретного задания."""
-    jobs = _load_pruned_jobs_state()
-    data = jobs.get(job_id)
+    """
+    Возвращает статус конкретного задания: для CLI/API-прогонов — процент выполнения,
+    ETA по наблюдаемой длительности итерации и частичные итоги по уже агрегированным роутам
+    (сохраняются и при падении задания). Опрос читает одну строку очереди.
+    """
+    data = get_job_store().get(job_id)
     if not data:
         return f"Задание {job_id} не найдено."
     details = _format_job(job_id, data)
+    if data.get("progress"):
+        details += f"\n{_format_progress(data)}"
     result = data.get("result")
     error = data.get("error")
     if result:
@@ -772,6 +901,23 @@ def job_status(job_id: str) -> str:
     return details
 
 
+@mcp.tool()
+def cancel_job(job_id: str) -> str:
+    """
+    Отменяет задание. Ожидающее в очереди снимается сразу; выполняющееся останавливается
+    в течение нескольких секунд: текущая итерация Lighthouse убивается вместе с Chrome,
+    уже агрегированные роуты сохраняются (статус cancelled, result — частичные итоги).
+    """
+    status = get_job_store().request_cancel(job_id)
+    if status is None:
+        return f"Задание {job_id} не найдено."
+    if status == JOB_CANCELLED:
+        return f"Задание {job_id} отменено."
+    if status == JOB_RUNNING:
+        return f"Задание {job_id}: отмена запрошена, процесс остановится после текущей проверки (см. job_status)."
+    return f"Задание {job_id} уже завершено (status={status})."
+
+
 if __name__ == "__main__":
     try:
         _log_info("mcp_server main started")
@@ -780,10 +926,12 @@ if __name__ == "__main__":
         parser.add_argument("--routes", nargs="+", help="Ключи роутов из routes.ini")
         parser.add_argument("--device", choices=["desktop", "mobile"], help="Тип устройства")
         parser.add_argument("--iterations", type=int, default=10, help="Количество итераций (для run_lighthouse)")
+        parser.add_argument("--parallel", type=int, default=1, help="Число параллельных Lighthouse-процессов (для run_lighthouse)")
         parser.add_argument("--tag", help="Необязательный tag override. Без него tag считается по rollout в dashboard")
         parser.add_argument("--sprint", help="Необязательный sprint override. Без него sprint берётся из Sprint Control в dashboard")
         parser.add_argument("--environment", help="Контур (VRP_PROD и т.д.)")
         parser.add_argument("--execute-job", help="Выполнить задание очереди по job_id и выйти")
+        parser.add_argument("--scheduler", action="store_true", help="Режим планировщика: запускать задания очереди в пределах слотов")
         parser.add_argument("--transport", choices=["stdio", "streamable-http"], default="stdio", help="Транспорт MCP: stdio (default) или streamable-http")
         args, _ = parser.parse_known_args()
 
@@ -792,11 +940,14 @@ if __name__ == "__main__":
         if args.execute_job:
             sys.exit(_execute_job(args.execute_job))
 
+        if args.scheduler:
+            sys.exit(_run_scheduler())
+
         if args.tool:
             if not args.routes or not args.device:
                 parser.error("--routes и --device обязательны при --tool")
             if args.tool == "run_lighthouse":
-                print(run_lighthouse(args.routes, args.device, args.iterations, args.environment, tag=args.tag, sprint=args.sprint))
+                print(run_lighthouse(args.routes, args.device, args.iterations, args.environment, tag=args.tag, sprint=args.sprint, max_workers=args.parallel))
             else:
                 print(run_crux(args.routes, args.device, args.environment, tag=args.tag, sprint=args.sprint))
             sys.exit(0)
@@ -4,14 +4,13 @@
 
 """
 
+import functools
+
 import json
 
 import os
 
 import random
-import builtins
-
-import pytest
 
 import sys
 
@@ -21,33 +20,43 @@ import time
 
 from datetime import datetime
 
-from typing import Optional, Tuple, List, Literal, Dict, Any
-
-import requests
+from typing import TYPE_CHECKING, Optional, Tuple, List, Literal, Dict, Any, Callable
 
 from dotenv import load_dotenv
 
-from google.auth.exceptions import RefreshError
+from services.lighthouse.api_runner import AsyncPageSpeedClient, run_api_lighthouse
 
-from gspread.exceptions import APIError
+from services.lighthouse.processor_lighthouse import (
 
-from requests import RequestException
+    process_and_save_results, process_crux_results, parse_lighthouse_results, is_p75_converged,
 
-from services.lighthouse.api_runner import run_api_lighthouse
+    extract_lighthouse_metrics, save_report_artifact
 
-from services.lighthouse.processor_lighthouse import process_and_save_results, process_crux_results
+)
 
 # Добавляем корневую директорию проекта в sys.path
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from services.google.google_sheets_client import GoogleSheetsClient
+from services.google.quota import DailyQuota, DailyQuotaExceededError, SharedTokenBucket
+
+from services.lighthouse.cli_runner import run_local_lighthouse, run_local_lighthouse_parallel
+
+from services.lighthouse.crux_cache import get_crux_data
+
+from services.lighthouse.daemon_runner import LighthouseDaemonRunner
 
-from services.lighthouse.cli_runner import run_local_lighthouse
+from services.lighthouse.dashboard_context import read_dashboard_context
+
+from services.lighthouse.log_utils import print
+
+from services.lighthouse.preflight import RoutePreflight
+
+from services.lighthouse.run_store import get_run_store
 
 from services.lighthouse.configs.config_lighthouse import (
 
-    get_route, get_base_url, load_routes_config, get_full_url,
+    get_route, get_base_url, get_config, get_full_url,
 
     get_current_environment, resolve_worksheet_name, REPORTS_DIR,
 
@@ -57,12 +66,11 @@ from services.lighthouse.configs.config_lighthouse import (
 
 )
 
-def print(*args, **kwargs):
-    try:
-        builtins.print(*args, **kwargs)
-    except OSError:
-        # Логирование не должно валить прогон, если stderr/stdout уже недоступен.
-        pass
+if TYPE_CHECKING:
+    # gspread/google-auth (~0.15 с импорта) нужны только при записи в Sheets —
+    # импортируются в _initialize_google_client
+    from services.google.google_sheets_client import GoogleSheetsClient
+
 
 # Загружаем .env из папки lighthouse/configs
 
@@ -72,64 +80,89 @@ load_dotenv(dotenv_path)
 
 
 class RateLimiter:
-    """Token-bucket rate limiter для PageSpeed API (~20 запросов в 100 секунд)."""
+    """
+    Rate limiter PageSpeed API, общий для всех процессов машины (MCP-задачи, пул CLI, скрипты).
+
+    Скорость — SharedTokenBucket (~20 запросов в 100 секунд, общий backoff после 429),
+    сутки — DailyQuota (лимит PSI_DAILY_QUOTA, по умолчанию 25000). Состояние — в SQLite
+    services/google/quota.py; создаётся при первом запросе.
+    """
 
-    def __init__(self, max_tokens: int = 20, refill_period: float = 100.0):
+    def __init__(self, max_tokens: int = 20, refill_period: float = 100.0,
+                 daily_limit: Optional[int] = None, name: str = "psi", path: Optional[str] = None):
         self._max_tokens = max_tokens
         self._refill_period = refill_period
-        self._tokens = float(max_tokens)
-        self._last_refill = time.monotonic()
+        self._daily_limit = daily_limit
+        self._name = name
+        self._path = path
+        self._bucket: Optional[SharedTokenBucket] = None
+        self._daily: Optional[DailyQuota] = None
         self._lock = threading.Lock()
 
+    def _quota(self) -> Tuple[SharedTokenBucket, DailyQuota]:
+        with self._lock:
+            if self._bucket is None:
+                self._bucket = SharedTokenBucket(
+                    self._name,
+                    per_minute=self._max_tokens * 60.0 / self._refill_period,
+                    capacity=self._max_tokens,
+                    path=self._path,
+                )
+                daily_limit = self._daily_limit or int(os.getenv("PSI_DAILY_QUOTA", "25000"))
+                self._daily = DailyQuota(self._name, daily_limit, path=self._path)
+            return self._bucket, self._daily
+
     def acquire(self):
-        """Блокирует до получения токена."""
-        while True:
-            with self._lock:
-                self._refill()
-                if self._tokens >= 1.0:
-                    self._tokens -= 1.0
-                    return
-                # Вычисляем время до следующего токена
-                wait = self._refill_period / self._max_tokens
-            time.sleep(wait)
-
-    def _refill(self):
-        now = time.monotonic()
-        elapsed = now - self._last_refill
-        new_tokens = elapsed * (self._max_tokens / self._refill_period)
-        self._tokens = min(self._max_tokens, self._tokens + new_tokens)
-        self._last_refill = now
-
-
-# Глобальный rate limiter для PageSpeed API
+        """
+        Блокирует до получения токена.
+        :raises DailyQuotaExceededError: дневной лимит исчерпан — ждать бессмысленно.
+        """
+        bucket, daily = self._quota()
+        if daily.remaining() <= 0:
+            raise DailyQuotaExceededError(f"PSI: дневной лимит {daily.daily_limit} исчерпан")
+        bucket.acquire()
+        daily.consume()
+
+    def try_acquire(self) -> float:
+        """
+        Берёт токен без ожидания: 0.0 — токен взят, иначе секунды до следующего токена.
+        :raises DailyQuotaExceededError: дневной лимит исчерпан — токен ведра не расходуется.
+        """
+        bucket, daily = self._quota()
+        if daily.remaining() <= 0:
+            raise DailyQuotaExceededError(f"PSI: дневной лимит {daily.daily_limit} исчерпан")
+        wait = bucket.try_acquire()
+        if wait > 0:
+            return wait
+        daily.consume()
+        return 0.0
+
+    def report_backoff(self, seconds: float) -> None:
+        """После 429: пауза для всех процессов, использующих квоту."""
+        self._quota()[0].report_backoff(seconds)
+
+    def status(self) -> Dict[str, Any]:
+        """Остаток квоты: {"rate": состояние ведра, "daily": расход за сутки}."""
+        bucket, daily = self._quota()
+        return {"rate": bucket.status(), "daily": daily.status()}
+
+
+# Rate limiter PageSpeed API: квота общая для всех процессов машины
 _api_rate_limiter = RateLimiter(max_tokens=20, refill_period=100.0)
 
 
+def _fetch_crux_data(url: str, device_type: str, mode: str) -> Dict[str, Any]:
+    """Запрос CrUX к PSI с ожиданием общей квоты (только при промахе crux_cache)."""
+    _api_rate_limiter.acquire()
+    return run_api_lighthouse(url=url, strategy=device_type, mode=mode, rate_limiter=_api_rate_limiter)
+
+
 def _read_dashboard_context(environment: Optional[str]) -> Dict[str, Any]:
     """
-    Читает контекст спринта и rollout из Google Sheets Dashboard.
+    Контекст спринта и rollout из Google Sheets Dashboard (через файловый TTL-кэш).
     Возвращает: {active_sprint, rollout, has_any_rollout, environment}
     """
-    env_name = (environment or get_current_environment()).upper()
-    if "_" not in env_name:
-        return {}
-    
-    project, env = env_name.split("_", 1)
-    spreadsheet_id = os.getenv("GS_SHEET_ID")
-    if not spreadsheet_id:
-        return {}
-    
-    try:
-        creds_path = get_google_creds_path()
-        context = GoogleSheetsClient.read_dashboard_sprint_context(
-            str(creds_path), spreadsheet_id, project
-        )
-        context["project"] = project
-        context["environment"] = env
-        return context
-    except Exception:
-        print(f"[WARNING] Не удалось прочитать dashboard контекст для {environment}")
-        return {}
+    return read_dashboard_context(environment)
 
 
 def _resolve_sprint(sprint: Optional[str], environment: Optional[str] = None) -> str:
@@ -199,27 +232,80 @@ def _save_api_result(json_result: dict, route_key: str, device_type: str) -> str
 
     return json_path
 
-def _check_site_availability(url: str) -> bool:
+class RunCancelled(RuntimeError):
+    """Прогон роута прерван через should_stop (отмена или дедлайн задания)."""
 
+
+def _check_stop(should_stop: Optional[Callable[[], bool]]) -> None:
+    if should_stop is not None and should_stop():
+        raise RunCancelled("cancelled")
+
+
+def _emit_progress(progress_callback: Optional[Callable[..., None]], event: str, route: Optional[str] = None,
+                   **fields: Any) -> None:
+    """
+    Событие прогресса для вызывающего кода (очередь заданий MCP):
+    progress_callback(event, route, done=..., total=..., detail=...).
+    Ошибка записи прогресса не прерывает прогон.
     """
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(event, route, **fields)
+    except Exception as e:
+        print(f"[WARNING] Не удалось записать прогресс ({event}, {route or '—'}): {e}")
+
 
-    Проверяет доступность сайта.
+def _run_adaptive_iterations(run_batch, route_key: str, min_iterations: int,
 
-    :param url: URL сайта для проверки.
+                             max_iterations: int, ci_threshold: float,
 
-    :return: True, если сайт доступен, иначе False.
+                             parse=parse_lighthouse_results) -> Tuple[list, list]:
 
     """
 
-    try:
+    Адаптивный прогон: batch из min_iterations, затем по одной итерации,
+
+    пока p75 LCP/TBT не сойдётся (is_p75_converged) или не исчерпан max_iterations.
+
+    :param run_batch: Callable(start_iteration, count) -> список результатов итераций (пути к отчётам).
+
+    :param parse: Результат итерации -> метрики (по умолчанию — разбор отчёта по пути).
+
+    :return: (все полученные результаты итераций, их метрики) — метрики уже разобраны для
+             проверки сходимости и передаются в process_and_save_results(parsed_results=...).
+
+    """
+
+    max_iterations = max(max_iterations, min_iterations)
 
-        response = requests.get(url, timeout=30)
+    results = list(run_batch(1, min_iterations))
 
-        return response.status_code == 200
+    parsed = [parse(item) for item in results]
 
-    except RequestException:
+    attempted = min_iterations
 
-        return False
+    while attempted < max_iterations:
+
+        if is_p75_converged(parsed, threshold=ci_threshold):
+
+            print(f"[INFO] {route_key}: p75 сошёлся после {len(results)} итераций")
+
+            break
+
+        attempted += 1
+
+        for item in run_batch(attempted, 1):
+
+            results.append(item)
+
+            parsed.append(parse(item))
+
+    else:
+
+        print(f"[INFO] {route_key}: достигнут лимит {max_iterations} итераций")
+
+    return results, parsed
 
 def prepare_routes(route_keys: List[str], base_url: Optional[str] = None) -> List[Tuple[str, str]]:
 
@@ -249,8 +335,6 @@ def prepare_routes(route_keys: List[str], base_url: Optional[str] = None) -> Lis
 
     return routes
 
-@pytest.mark.skip(reason="Класс предназначен не для тестов")
-
 class SpeedtestService:
 
     """
@@ -261,6 +345,8 @@ class SpeedtestService:
 
     """
 
+    __test__ = False  # pytest не собирает класс как тест (без импорта pytest в рантайме)
+
     iteration_counter = 0
 
     def __init__(self, reports_dir=REPORTS_DIR, temp_reports_dir=TEMP_REPORTS_DIR,
@@ -278,19 +364,29 @@ class SpeedtestService:
         self.temp_reports_dir = temp_reports_dir
         ensure_directories_exist()
 
-        self.config = load_routes_config()
+        self.config = get_config()  # снимок на весь прогон: правки routes.ini не меняют его на ходу
         self.date = datetime.now().strftime("%d-%m-%y")
         self.dateTime = datetime.now().strftime("%d-%m-%y_%H-%M-%S")
         self.environment = environment or get_current_environment()
         self.worksheet_name: str
+        # Один клиент на сервис: CLI/API/CrUX-строки копятся в его буфере по листам
+        self._google_client: Optional["GoogleSheetsClient"] = None
+        self._pending_store_ids: List[Optional[int]] = []
 
-    def _initialize_google_client(self, source: Literal["cli", "api", "crux"]) -> GoogleSheetsClient:
+    def _initialize_google_client(self, source: Literal["cli", "api", "crux"]) -> "GoogleSheetsClient":
         """
         Инициализирует клиента Google Sheets с retry при quota exceeded.
         """
+        self.worksheet_name = resolve_worksheet_name(self.environment, source)
+        if self._google_client is not None:
+            return self._google_client
+
+        from google.auth.exceptions import RefreshError
+        from gspread.exceptions import APIError
+        from services.google.google_sheets_client import GoogleSheetsClient
+
         credentials_path = get_google_creds_path()
         spreadsheet_id = os.getenv("GS_SHEET_ID")
-        self.worksheet_name = resolve_worksheet_name(self.environment, source)
 
         if not spreadsheet_id:
             raise RuntimeError("[ERROR] Не установлены переменные окружения для Google Sheets")
@@ -314,6 +410,7 @@ class SpeedtestService:
                 except Exception as retry_err:
                     print(f"[WARNING] Retry failed flushes при старте: {retry_err}")
                 print(f"[INFO] Google Sheets client успешно инициализирован.")
+                self._google_client = client
                 return client
 
             except RefreshError as e:
@@ -356,11 +453,54 @@ class SpeedtestService:
 
         """
 
-        if "routes" not in self.config:
+        if not self.config.routes:
 
             raise ValueError("Секция [routes] не найдена в routes.ini")
 
-        return list(self.config["routes"].keys())
+        return list(self.config.routes)
+
+    def flush_results(self) -> None:
+        """
+        Один flush на все накопленные строки всех листов (CLI/API/CrUX) — одним batch-запросом.
+        Статус репликации этих агрегатов в RunStore обновляется по результату flush: при сбое
+        строки возвращаются в pending, после успешного flush тем же клиентом досылаются pending-строки
+        прошлых неудачных flush (RunStore.replicate_pending). Репликация синхронная, в конце прогона.
+        После успешного flush дочитываются новые сырые строки и обновляются только затронутые
+        строки helper-листов Runs/Routes/Stability (LIGHTHOUSE_HELPER_SYNC=0 — отключить).
+        """
+        if self._google_client is None:
+            return
+        store_ids, self._pending_store_ids = self._pending_store_ids, []
+        store_ids = [i for i in store_ids if i is not None]
+        try:
+            self._google_client.flush()
+        except Exception as e:
+            print(f"[WARNING] Flush не удался, строки остались в RunStore и будут дописаны "
+                  f"при следующем flush или командой replicate: {e}")
+            try:
+                get_run_store().release(store_ids)
+            except Exception as ex:
+                print(f"[WARNING] Не удалось обновить статус репликации в RunStore: {ex}")
+            return
+        try:
+            store = get_run_store()
+            store.mark_replicated(ids=store_ids)
+            store.replicate_pending(self._google_client)
+        except Exception as e:
+            print(f"[WARNING] Не удалось обновить статус репликации в RunStore: {e}")
+        from services.lighthouse import helper_sheets
+        if helper_sheets.sync_enabled():
+            try:
+                helper_sheets.sync_helper_sheets(self._google_client)
+            except Exception as e:
+                print(f"[WARNING] Helper-листы дашборда не обновлены (повтор при следующем flush): {e}")
+
+    def _finish_run(self, store_ids: List[Optional[int]], auto_flush: bool,
+                    progress_callback: Optional[Callable[..., None]] = None) -> None:
+        self._pending_store_ids.extend(store_ids)
+        if auto_flush:
+            self.flush_results()
+            _emit_progress(progress_callback, "flushed")
 
     def run_local_tests(self, route_keys: Optional[List[str]], device_type: str,
 
@@ -368,15 +508,45 @@ class SpeedtestService:
 
                         base_url: Optional[str] = None,
 
-                        run_id: Optional[str] = None, tag: str = "", sprint: str = "") -> Dict[str, Any]:
+                        run_id: Optional[str] = None, tag: str = "", sprint: str = "",
+
+                        max_workers: int = 1, use_daemon: bool = False,
+
+                        adaptive: bool = False, max_iterations: int = 20,
+
+                        ci_threshold: float = 0.1, lean_report: bool = True,
+                        auto_flush: bool = True,
+                        progress_callback: Optional[Callable[..., None]] = None,
+                        should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
 
         """
         Выполняет тесты с использованием локального Lighthouse CLI.
-        Возвращает summary: {"succeeded": [...], "failed": [...]}.
+        Возвращает summary: {"succeeded": [...], "failed": [...], "preflight": {route: {"status", "ttfb_ms"}}}.
+        Перед прогоном все роуты проверяются параллельно (RoutePreflight); недоступные — сразу в failed.
         
         Args:
             tag: Если пустой — берётся из dashboard (rollout).
             sprint: Если пустой — берётся из dashboard (active_sprint).
+            max_workers: > 1 — итерации (route, device, iteration) выполняются на пуле
+                         процессов. Фактическая конкуренция пишется в колонку concurrency.
+            use_daemon: Последовательные итерации идут через один прогретый Node/Chrome
+                        (LighthouseDaemonRunner) вместо отдельного процесса lighthouse на итерацию.
+                        В параллельном режиме (max_workers > 1) не используется.
+            adaptive: Адаптивное число итераций — сначала n_iteration, затем по одной,
+                      пока относительная ширина бутстрап-CI p75 LCP/TBT не станет
+                      <= ci_threshold или не наберётся max_iterations. Фактическое число
+                      итераций пишется в колонки iterations/type. Только при max_workers == 1.
+            lean_report: Не собирать скриншоты, full-page screenshot и treemap — их не агрегируем.
+                         При keep_temp_files=True отчёты сохраняются как *.json.gz + metrics_index.json.
+            auto_flush: False — строки остаются в буфере клиента до flush_results()
+                        (несколько запусков сервиса пишутся в Sheets одним batch-запросом).
+            progress_callback: Callable(event, route, done=, total=, detail=) — события прогресса:
+                        started (route=None — весь прогон, total — плановое число итераций),
+                        started/iteration i из N/aggregated/failed по роуту, flushed после записи в Sheets.
+                        Последовательный режим с колбэком запускает итерации по одной.
+            should_stop: Callable() -> bool — кооперативная отмена. Идущая итерация Lighthouse
+                        убивается вместе с Chrome, незавершённый роут не агрегируется
+                        (failed с error="cancelled"), уже агрегированные роуты сохраняются и пишутся в Sheets.
         """
 
         google_client = self._initialize_google_client("cli")
@@ -398,38 +568,186 @@ class SpeedtestService:
 
         succeeded = []
         failed = []
+        store_ids: List[Optional[int]] = []
+        _emit_progress(progress_callback, "started", total=len(routes) * n_iteration)
 
+        # Pre-flight: все роуты проверяются сразу, параллельно (HEAD, пул соединений, короткий таймаут)
+        with RoutePreflight() as preflight:
+            probes = preflight.check_all(route_url for _, route_url in routes)
+        available_routes = []
         for route_key, route_url in routes:
-            try:
-                print(f"[DEBUG]: Перед запуском: {route_key} — {route_url}")
-                if not _check_site_availability(route_url):
-                    print(f"[ERROR] {route_url} недоступен — пропуск.")
-                    failed.append({"route": route_key, "error": "site unavailable"})
-                    continue
+            probe = probes[route_url]
+            if probe.available:
+                print(f"[INFO] Preflight {route_key}: {probe.describe()}")
+                available_routes.append((route_key, route_url))
+            else:
+                print(f"[ERROR] {route_url} недоступен ({probe.describe()}) — пропуск.")
+                failed.append({"route": route_key, "error": "site unavailable"})
+                _emit_progress(progress_callback, "failed", route_key, total=n_iteration, detail="site unavailable")
+        preflight_summary = {route_key: {"status": probes[route_url].status, "ttfb_ms": probes[route_url].ttfb_ms}
+                             for route_key, route_url in routes}
+        routes = available_routes
+
+        parallel_runs: Dict[str, Dict[str, Any]] = {}
+        if max_workers > 1:
+            for route_key, _ in routes:
+                _emit_progress(progress_callback, "started", route_key, total=n_iteration)
+            finished_iterations: Dict[str, int] = {}
+
+            def on_iteration(unit: Dict[str, Any]) -> None:
+                finished_iterations[unit["route_key"]] = finished_iterations.get(unit["route_key"], 0) + 1
+                _emit_progress(progress_callback, "iteration", unit["route_key"],
+                               done=finished_iterations[unit["route_key"]], total=n_iteration)
 
-                json_paths = run_local_lighthouse(
-                    route_key,
-                    route_url,
+            try:
+                parallel_runs = run_local_lighthouse_parallel(
+                    routes,
                     n_iteration,
                     device_type,
                     environment=self.environment,
+                    max_workers=max_workers,
+                    lean_report=lean_report,
+                    on_iteration=on_iteration if progress_callback else None,
+                    should_stop=should_stop,
                 )
-                process_and_save_results(json_paths, route_key, device_type, google_client,
+            except Exception as e:
+                print(f"[ERROR] Ошибка параллельного запуска: {e}")
+
+        daemon_runner = LighthouseDaemonRunner() if use_daemon and max_workers <= 1 else None
+        run_route = functools.partial(
+            daemon_runner.run_local_lighthouse if daemon_runner else run_local_lighthouse,
+            lean_report=lean_report,
+            should_stop=should_stop,
+        )
+
+        try:
+            self._run_local_routes(routes, device_type, n_iteration, keep_temp_files, google_client,
+                                   run_id, resolved_tag, resolved_sprint, max_workers, parallel_runs,
+                                   run_route, succeeded, failed, store_ids,
+                                   adaptive=(max_iterations, ci_threshold) if adaptive and max_workers <= 1 else None,
+                                   progress_callback=progress_callback, should_stop=should_stop)
+        finally:
+            if daemon_runner:
+                daemon_runner.close()
+
+        self._finish_run(store_ids, auto_flush, progress_callback)
+        return {"succeeded": succeeded, "failed": failed, "preflight": preflight_summary}
+
+    def _run_local_routes(self, routes: List[Tuple[str, str]], device_type: str, n_iteration: int,
+                          keep_temp_files: bool, google_client: "GoogleSheetsClient",
+                          run_id: str, resolved_tag: str, resolved_sprint: str,
+                          max_workers: int, parallel_runs: Dict[str, Dict[str, Any]],
+                          run_route, succeeded: List[str], failed: List[Dict[str, Any]],
+                          store_ids: List[Optional[int]],
+                          adaptive: Optional[Tuple[int, float]] = None,
+                          progress_callback: Optional[Callable[..., None]] = None,
+                          should_stop: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Прогоняет роуты CLI-запуска и добавляет строки в буфер google_client.
+        adaptive — (max_iterations, ci_threshold) для адаптивного режима или None.
+        """
+        for route_key, route_url in routes:
+            try:
+                _check_stop(should_stop)
+                print(f"[DEBUG]: Перед запуском: {route_key} — {route_url}")
+                parsed_results = None
+                if max_workers > 1:
+                    parallel_run = parallel_runs.get(route_key) or {}
+                    json_paths = parallel_run.get("json_paths", [])
+                    concurrency = parallel_run.get("concurrency", max_workers)
+                else:
+                    _emit_progress(progress_callback, "started", route_key, total=n_iteration)
+
+                    def run_batch(start: int, count: int, route_key=route_key, route_url=route_url) -> List[str]:
+                        if progress_callback is None:
+                            return run_route(
+                                route_key,
+                                route_url,
+                                count,
+                                device_type,
+                                environment=self.environment,
+                                start_iteration=start,
+                            )
+                        paths = []
+                        for iteration in range(start, start + count):
+                            _check_stop(should_stop)
+                            paths.extend(run_route(route_key, route_url, 1, device_type,
+                                                        environment=self.environment, start_iteration=iteration))
+                            _emit_progress(progress_callback, "iteration", route_key, done=iteration,
+                                           total=max(n_iteration, iteration))
+                        return paths
+
+                    if adaptive:
+                        # Отчёты уже разобраны для проверки сходимости — второй раз не читаем
+                        json_paths, parsed_results = _run_adaptive_iterations(run_batch, route_key, n_iteration,
+                                                                              *adaptive)
+                    else:
+                        json_paths = run_batch(1, n_iteration)
+                    concurrency = 1
+                _check_stop(should_stop)  # прерванный роут неполон — не агрегируем
+                store_ids.append(process_and_save_results(json_paths, route_key, device_type, google_client,
                                          is_local=True, keep_temp_files=keep_temp_files,
                                          environment=self.environment, full_url=route_url,
-                                         iterations=n_iteration, run_id=run_id, tag=resolved_tag, sprint=resolved_sprint)
+                                         iterations=len(json_paths) if adaptive else n_iteration,
+                                         run_id=run_id, tag=resolved_tag, sprint=resolved_sprint,
+                                         concurrency=concurrency, parsed_results=parsed_results))
 
                 succeeded.append(route_key)
+                _emit_progress(progress_callback, "aggregated", route_key, detail=f"итераций: {len(json_paths)}")
             except Exception as e:
                 print(f"[ERROR] Ошибка при обработке роута '{route_key}': {e}")
                 failed.append({"route": route_key, "error": str(e)})
+                _emit_progress(progress_callback, "failed", route_key, total=n_iteration, detail=str(e))
 
-        # Один flush в конце — все строки записываются разом
-        try:
-            google_client.flush()
-        except Exception as e:
-            print(f"[WARNING] Flush не удался, данные сохранены в fallback: {e}")
-        return {"succeeded": succeeded, "failed": failed}
+    def _api_sample(self, json_result: Dict[str, Any], route_key: str, device_type: str,
+                    iteration: int, keep_temp_files: bool) -> Optional[Tuple[Optional[str], dict]]:
+        """
+        Метрики итерации PSI извлекаются в памяти: (путь к артефакту или None, метрики).
+        Сырой ответ сохраняется только при keep_temp_files — сжатым Report_API_{i}.json.gz.
+        """
+        if not json_result:
+            print(f"[WARNING] Итерация {iteration} без данных: {route_key}")
+            return None
+        metrics = extract_lighthouse_metrics(json_result)
+        if metrics is None:
+            print(f"[WARNING] Итерация {iteration} без метрик: {route_key}")
+            return None
+        artifact = None
+        if keep_temp_files:
+            temp_dir = get_temp_dir_for_route(route_key, device_type, prefix="API", environment=self.environment)
+            artifact = save_report_artifact(json_result, os.path.join(temp_dir, f"Report_API_{iteration}.json"))
+        return artifact, metrics
+
+    def _fetch_api_samples(self, psi_client: AsyncPageSpeedClient, routes: List[Tuple[str, str]],
+                           device_type: str, start: int, count: int, categories: List[str],
+                           keep_temp_files: bool, progress_callback: Optional[Callable[..., None]] = None,
+                           n_iteration: int = 0,
+                           should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, List[Tuple[Optional[str], dict]]]:
+        """
+        Запрашивает итерации start..start+count-1 для всех роутов одним пулом PSI-запросов.
+        Возвращает {route_key: [_api_sample в порядке итераций]}.
+        """
+        jobs = [(route_key, route_url, iteration)
+                for route_key, route_url in routes for iteration in range(start, start + count)]
+        finished = {route_key: start - 1 for route_key, _ in routes}
+
+        def on_result(index: int, _result: dict) -> None:
+            route_key = jobs[index][0]
+            finished[route_key] += 1
+            _emit_progress(progress_callback, "iteration", route_key, done=finished[route_key],
+                           total=max(n_iteration, finished[route_key]))
+
+        print(f"[INFO] PSI: {len(jobs)} запросов, до {psi_client.concurrency} одновременно")
+        results = psi_client.run_many_sync([job[1] for job in jobs], strategy=device_type, categories=categories,
+                                           on_result=on_result if progress_callback else None,
+                                           should_stop=should_stop)
+
+        samples: Dict[str, List[Tuple[Optional[str], dict]]] = {route_key: [] for route_key, _ in routes}
+        for (route_key, _, iteration), json_result in zip(jobs, results):
+            sample = self._api_sample(json_result, route_key, device_type, iteration, keep_temp_files)
+            if sample:
+                samples[route_key].append(sample)
+        return samples
 
     def run_api_aggregated_tests(self, route_keys: Optional[List[str]], device_type: str,
 
@@ -437,15 +755,33 @@ class SpeedtestService:
 
                                  base_url: Optional[str] = None,
 
-                                 run_id: Optional[str] = None, tag: str = "", sprint: str = "") -> Dict[str, Any]:
+                                 run_id: Optional[str] = None, tag: str = "", sprint: str = "",
+
+                                 adaptive: bool = False, max_iterations: int = 20,
+
+                                 ci_threshold: float = 0.1, auto_flush: bool = True,
+                                 concurrency: int = 1,
+                                 progress_callback: Optional[Callable[..., None]] = None,
+                                 should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
 
         """
         Выполняет запуск Lighthouse через PageSpeed API с агрегацией.
         Возвращает summary: {"succeeded": [...], "failed": [...]}.
         
+        Метрики PSI извлекаются из ответа в памяти, на диск отчёты не пишутся.
+
         Args:
+            keep_temp_files: Сохранить сырые ответы PSI как Report_API_{i}.json.gz (+ metrics_index.json).
             tag: Если пустой — берётся из dashboard (rollout).
             sprint: Если пустой — берётся из dashboard (active_sprint).
+            adaptive: Адаптивное число итераций (см. run_local_tests).
+            auto_flush: См. run_local_tests.
+            concurrency: > 1 — до N запросов к PSI одновременно (AsyncPageSpeedClient,
+                         общий _api_rate_limiter). Без adaptive все итерации всех роутов
+                         запрашиваются одним пулом заранее.
+            progress_callback: События прогресса (см. run_local_tests).
+            should_stop: Кооперативная отмена (см. run_local_tests); запросы PSI,
+                         ещё не отправленные к моменту отмены, не выполняются.
         """
 
         google_client = self._initialize_google_client("api")
@@ -467,57 +803,93 @@ class SpeedtestService:
 
         succeeded = []
         failed = []
+        store_ids: List[Optional[int]] = []
+
+        categories = ["performance", "accessibility", "best-practices", "seo"]
+        psi_client = AsyncPageSpeedClient(concurrency=concurrency, rate_limiter=_api_rate_limiter) \
+            if concurrency > 1 else None
+        _emit_progress(progress_callback, "started", total=len(routes) * n_iteration)
+        prefetched: Dict[str, List[Tuple[Optional[str], dict]]] = {}
+        if psi_client and not adaptive:
+            for route_key, _ in routes:
+                _emit_progress(progress_callback, "started", route_key, total=n_iteration)
+            try:
+                prefetched = self._fetch_api_samples(psi_client, routes, device_type, 1, n_iteration, categories,
+                                                     keep_temp_files, progress_callback, n_iteration, should_stop)
+            except Exception as e:
+                print(f"[ERROR] Ошибка параллельного запуска PSI: {e}")
 
         for route_key, route_url in routes:
             try:
+                _check_stop(should_stop)
                 print(f"[DEBUG]: API запуск для {route_key}: {route_url}")
+                if route_key not in prefetched:
+                    _emit_progress(progress_callback, "started", route_key, total=n_iteration)
 
-                temp_dir = get_temp_dir_for_route(route_key, device_type, prefix="API", environment=self.environment)
+                def run_batch(start: int, count: int, route_key=route_key,
+                              route_url=route_url) -> List[Tuple[Optional[str], dict]]:
+                    if psi_client:
+                        if start == 1 and route_key in prefetched:
+                            return prefetched.pop(route_key)
+                        return self._fetch_api_samples(psi_client, [(route_key, route_url)], device_type,
+                                                       start, count, categories, keep_temp_files,
+                                                       progress_callback, n_iteration, should_stop)[route_key]
 
-                json_paths = []
+                    batch_samples = []
 
-                for iteration in range(1, n_iteration + 1):
-                    _api_rate_limiter.acquire()
+                    for iteration in range(start, start + count):
+                        _check_stop(should_stop)
+                        _api_rate_limiter.acquire()
 
-                    json_result = run_api_lighthouse(
+                        json_result = run_api_lighthouse(
 
-                        url=route_url,
+                            url=route_url,
 
-                        strategy=device_type,
+                            strategy=device_type,
 
-                        categories=["performance", "accessibility", "best-practices", "seo"]
+                            categories=categories,
 
-                    )
+                            rate_limiter=_api_rate_limiter
 
-                    if not json_result:
+                        )
 
-                        print(f"[WARNING] Итерация {iteration} без данных: {route_key}")
+                        sample = self._api_sample(json_result, route_key, device_type, iteration, keep_temp_files)
 
-                        continue
+                        if sample:
 
-                    json_path = os.path.join(temp_dir, f"Report_API_{iteration}.json")
+                            batch_samples.append(sample)
 
-                    with open(json_path, "w", encoding="utf-8") as f:
+                        _emit_progress(progress_callback, "iteration", route_key, done=iteration,
+                                       total=max(n_iteration, iteration))
 
-                        json.dump(json_result, f, ensure_ascii=False, indent=2)
+                    return batch_samples
 
-                    json_paths.append(json_path)
+                if adaptive:
+                    samples, _ = _run_adaptive_iterations(run_batch, route_key, n_iteration, max_iterations,
+                                                          ci_threshold, parse=lambda sample: sample[1])
+                else:
+                    samples = run_batch(1, n_iteration)
+                _check_stop(should_stop)  # прерванный роут неполон — не агрегируем
 
-                process_and_save_results(json_paths, route_key, device_type, google_client,
+                # Артефакты есть у всех итераций (keep_temp_files) или ни у одной — порядок совпадает с метриками
+                artifacts = [path for path, _ in samples if path]
+                store_ids.append(process_and_save_results(artifacts, route_key, device_type, google_client,
                                          is_local=False, keep_temp_files=keep_temp_files,
                                          environment=self.environment, full_url=route_url,
-                                         iterations=n_iteration, run_id=run_id, tag=resolved_tag, sprint=resolved_sprint)
+                                         iterations=len(samples) if adaptive else n_iteration,
+                                         run_id=run_id, tag=resolved_tag, sprint=resolved_sprint,
+                                         parsed_results=[metrics for _, metrics in samples]))
 
                 succeeded.append(route_key)
+                _emit_progress(progress_callback, "aggregated", route_key, detail=f"итераций: {len(samples)}")
             except Exception as e:
                 print(f"[ERROR] Ошибка при обработке роута '{route_key}': {e}")
                 failed.append({"route": route_key, "error": str(e)})
+                _emit_progress(progress_callback, "failed", route_key, total=n_iteration, detail=str(e))
 
-        # Один flush в конце — все строки записываются разом
-        try:
-            google_client.flush()
-        except Exception as e:
-            print(f"[WARNING] Flush не удался, данные сохранены в fallback: {e}")
+        if psi_client:
+            psi_client.close()
+        self._finish_run(store_ids, auto_flush, progress_callback)
         return {"succeeded": succeeded, "failed": failed}
 
     def run_crux_data_collection(self, route_keys: Optional[List[str]], device_type: str,
@@ -525,7 +897,9 @@ class SpeedtestService:
                                  include_origin: bool = False,
                                  run_id: Optional[str] = None,
                                  tag: str = "",
-                                 sprint: str = "") -> Dict[str, Any]:
+                                 sprint: str = "",
+                                 auto_flush: bool = True,
+                                 force_refresh: bool = False) -> Dict[str, Any]:
         """
         Выполняет сбор CrUX: page (field) + опционально origin по каждому роуту и девайсу.
         Возвращает summary: {"succeeded": [...], "failed": [...]}.
@@ -533,6 +907,8 @@ class SpeedtestService:
         Args:
             tag: Если пустой — берётся из dashboard (rollout).
             sprint: Если пустой — берётся из dashboard (active_sprint).
+            auto_flush: См. run_local_tests.
+            force_refresh: Запросить PSI, даже если ответ есть в кэше CrUX (crux_cache).
         """
         google_client = self._initialize_google_client("crux")
         base_url = base_url or get_base_url(self.environment)
@@ -543,27 +919,29 @@ class SpeedtestService:
         resolved_tag, resolved_sprint = _resolve_launch_context(tag, sprint, self.environment, source="crux")
         print(f"[INFO] Launch context: tag={resolved_tag or '—'}, sprint={resolved_sprint or '—'}")
 
+        if run_id is None:
+            run_id = datetime.now().strftime("%Y.%m.%d-%H%M%S")
+
         succeeded = []
         failed = []
+        store_ids: List[Optional[int]] = []
 
         for route_key, route_url in routes:
             try:
                 print(f"[DEBUG]: CrUX для {route_key}: {route_url}")
 
-                _api_rate_limiter.acquire()
-
                 # URL-level (page) field data
-                crux_data_url = run_api_lighthouse(
-                    url=route_url,
-                    strategy=device_type,
-                    mode="field"
+                crux_data_url, _ = get_crux_data(
+                    route_url, device_type,
+                    functools.partial(_fetch_crux_data, route_url, device_type, "field"),
+                    mode="field", force_refresh=force_refresh,
                 )
                 temp_dir_url = get_temp_dir_for_route(route_key, device_type, prefix="CrUX", environment=self.environment)
                 crux_file_url = os.path.join(temp_dir_url, "crux_data.json")
                 with open(crux_file_url, "w", encoding="utf-8") as f:
                     json.dump(crux_data_url, f, ensure_ascii=False, indent=2)
                 print(f"[INFO]: CrUX (page) сохранен: {crux_file_url}")
-                process_crux_results(
+                store_ids.append(process_crux_results(
                     crux_file_url,
                     route_key,
                     device_type,
@@ -574,16 +952,15 @@ class SpeedtestService:
                     run_id=run_id,
                     tag=resolved_tag,
                     sprint=resolved_sprint,
-                )
+                ))
 
                 if include_origin:
                     origin_url = base_url.rstrip('/')
                     print(f"[DEBUG]: CrUX origin для {route_key}: {origin_url}")
-                    _api_rate_limiter.acquire()
-                    crux_data_origin = run_api_lighthouse(
-                        url=origin_url,
-                        strategy=device_type,
-                        mode="origin"
+                    crux_data_origin, _ = get_crux_data(
+                        origin_url, device_type,
+                        functools.partial(_fetch_crux_data, origin_url, device_type, "origin"),
+                        mode="origin", force_refresh=force_refresh,
                     )
                     temp_dir_origin = get_temp_dir_for_route(
                         route_key + "_origin",
@@ -595,7 +972,7 @@ class SpeedtestService:
                     with open(crux_file_origin, "w", encoding="utf-8") as f:
                         json.dump(crux_data_origin, f, ensure_ascii=False, indent=2)
                     print(f"[INFO]: CrUX (origin) сохранен: {crux_file_origin}")
-                    process_crux_results(
+                    store_ids.append(process_crux_results(
                         crux_file_origin,
                         route_key,
                         device_type,
@@ -606,18 +983,14 @@ class SpeedtestService:
                         run_id=run_id,
                         tag=resolved_tag,
                         sprint=resolved_sprint,
-                    )
+                    ))
 
                 succeeded.append(route_key)
             except Exception as e:
                 print(f"[ERROR] Ошибка при обработке CrUX роута '{route_key}': {e}")
                 failed.append({"route": route_key, "error": str(e)})
 
-        # Один flush в конце — все строки записываются разом
-        try:
-            google_client.flush()
-        except Exception as e:
-            print(f"[WARNING] Flush не удался, данные сохранены в fallback: {e}")
+        self._finish_run(store_ids, auto_flush)
         return {"succeeded": succeeded, "failed": failed}
 
 if __name__ == "__main__":
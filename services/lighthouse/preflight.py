@@ -0,0 +1,115 @@
+"""
+Pre-flight проверка доступности роутов перед CLI-прогоном.
+
+Раньше перед каждым роутом шёл последовательный requests.get (тело целиком, новое соединение,
+таймаут 30 с), и недоступный роут задерживал прогон на десятки секунд. Теперь все роуты
+проверяются до прогона, параллельно, через один requests.Session с пулом keep-alive соединений:
+
+- HEAD без тела; любой итоговый статус HEAD кроме 200 перепроверяется GET с stream=True
+  (сервер может не поддерживать HEAD или отвечать на него иначе, чем на GET — 403/404/5xx),
+  соединение закрывается сразу после заголовков, тело не скачивается;
+- короткий таймаут (LIGHTHOUSE_PREFLIGHT_TIMEOUT, по умолчанию 5 с): длительность фазы —
+  самый медленный роут, а не сумма по роутам;
+- TTFB пробы — время до заголовков ответа (Response.elapsed, с редиректами);
+- результаты кэшируются на время прогона (RoutePreflight) — повторный URL не идёт в сеть.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+
+DEFAULT_TIMEOUT = 5.0  # секунд; переопределяется LIGHTHOUSE_PREFLIGHT_TIMEOUT
+DEFAULT_WORKERS = 8
+
+
+def _timeout() -> float:
+    try:
+        return float(os.getenv("LIGHTHOUSE_PREFLIGHT_TIMEOUT", DEFAULT_TIMEOUT))
+    except ValueError:
+        return DEFAULT_TIMEOUT
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    """Результат пробы URL: доступен ли (итоговый статус 200), статус, метод, TTFB в мс."""
+    url: str
+    available: bool
+    status: Optional[int] = None
+    method: str = "HEAD"
+    ttfb_ms: Optional[float] = None
+    error: str = ""
+
+    def describe(self) -> str:
+        if self.error:
+            return f"{self.method} {self.error}"
+        return f"{self.method} {self.status}, TTFB {self.ttfb_ms:.0f} ms"
+
+
+class RoutePreflight:
+    """
+    Параллельная проверка URL на одном пуле соединений с кэшем на время прогона.
+
+    Использование:
+        with RoutePreflight() as preflight:
+            probes = preflight.check_all(urls)
+    """
+
+    def __init__(self, timeout: Optional[float] = None, max_workers: int = DEFAULT_WORKERS):
+        self.timeout = timeout if timeout is not None else _timeout()
+        self.max_workers = max(1, max_workers)
+        self._results: Dict[str, ProbeResult] = {}
+        self._session = None
+
+    def __enter__(self) -> "RoutePreflight":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+        return self._session
+
+    def _probe(self, url: str) -> ProbeResult:
+        import requests
+
+        session = self._get_session()
+        method = "HEAD"
+        try:
+            response = session.head(url, timeout=self.timeout, allow_redirects=True)
+            if response.status_code != 200:
+                response.close()
+                method = "GET"
+                response = session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+            response.close()
+        except requests.RequestException as e:
+            return ProbeResult(url, False, method=method, error=type(e).__name__)
+        elapsed = sum(r.elapsed.total_seconds() for r in response.history) + response.elapsed.total_seconds()
+        return ProbeResult(url, response.status_code == 200, response.status_code, method, round(elapsed * 1000, 1))
+
+    def check_all(self, urls: Iterable[str]) -> Dict[str, ProbeResult]:
+        """Проверяет ещё не проверенные URL параллельно; возвращает {url: ProbeResult} для всех urls."""
+        urls = list(dict.fromkeys(urls))
+        pending = [url for url in urls if url not in self._results]
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+                for result in pool.map(self._probe, pending):
+                    self._results[result.url] = result
+        return {url: self._results[url] for url in urls}
+
+    def is_available(self, url: str) -> bool:
+        return self.check_all([url])[url].available
@@ -2,19 +2,20 @@
 Обработка результатов Lighthouse/CrUX:
 - разбор JSON
 - агрегация метрик (p75/p90 + min/max/avg + iterations)
-- запись в Google Sheets
+- запись в локальный RunStore (первично) и в Google Sheets (реплика)
 """
 
 from __future__ import annotations
 
+import gzip
 import json
+import math
+import os
+import re
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional
 
-import numpy as np
-
-from services.google.google_sheets_client import GoogleSheetsClient
 from services.lighthouse.configs.config_lighthouse import (
     TEMP_REPORTS_DIR,
     cleanup_temp_files,
@@ -22,6 +23,11 @@ from services.lighthouse.configs.config_lighthouse import (
     get_full_url,
     resolve_worksheet_name,
 )
+from services.lighthouse.run_store import RunStore, get_run_store
+
+if TYPE_CHECKING:
+    # gspread/google-auth импортируются только там, где клиент действительно нужен
+    from services.google.google_sheets_client import GoogleSheetsClient
 
 
 def _split_environment(environment: str) -> tuple[str, str]:
@@ -38,38 +44,265 @@ def _format_env_label(environment: str) -> str:
     return f"{project} [{env}]" if env else project
 
 
+# Аудиты, которые читаем из отчёта Lighthouse. Остальное (скриншоты, treemap,
+# fullPageScreenshot, i18n) нам не нужно и занимает основную часть файла.
+_REQUIRED_AUDITS = (
+    "largest-contentful-paint",
+    "first-contentful-paint",
+    "total-blocking-time",
+    "cumulative-layout-shift",
+    "speed-index",
+    "interactive",
+    "server-response-time",
+)
+_OPTIONAL_AUDITS = ("experimental-interaction-to-next-paint", "max-potential-fid")
+
+_STREAM_CHUNK_SIZE = 1 << 16
+# Максимальная длина одного совпадения: якорь аудита + окно до numericValue.
+_STREAM_OVERLAP = 8192
+_JSON_NUMBER = r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?"
+# "<audit>": {"id": "<audit>", ... "numericValue": <число>
+# Внутри JSON-строк кавычки экранированы, поэтому якорь не может совпасть с текстом описания.
+# numericValue в аудите идёт раньше details — details в окне означает «значения нет».
+_AUDIT_VALUE_PATTERN = re.compile(
+    r'"(?P<audit>' + "|".join(re.escape(a) for a in _REQUIRED_AUDITS + _OPTIONAL_AUDITS) + r')"'
+    r'\s*:\s*\{\s*"id"\s*:\s*"(?P=audit)"'
+    r'(?:(?!"details"|"numericValue")[\s\S]){0,4000}?'
+    r'"numericValue"\s*:\s*(?P<value>' + _JSON_NUMBER + r')(?=\s*[,}])'
+)
+_PERFORMANCE_SCORE_PATTERN = re.compile(
+    r'"id"\s*:\s*"performance"\s*,\s*"score"\s*:\s*(?P<value>' + _JSON_NUMBER + r')(?=\s*[,}])'
+)
+
+
+def _normalize_lighthouse_metrics(score: float, audits: Dict[str, float]) -> dict:
+    """
+    Нормализует сырые значения: все временные метрики → миллисекунды,
+    CLS остаётся безразмерным (0..1).
+    """
+    lcp_raw = audits["largest-contentful-paint"]
+    # Защита от секунд: если значение выглядит как секунды (<50), умножаем.
+    lcp_ms = lcp_raw * 1000 if lcp_raw < 50 else lcp_raw
+    lcp_ms = int(round(lcp_ms))
+
+    inp_val = audits.get("experimental-interaction-to-next-paint")
+    if inp_val is None:
+        inp_val = audits.get("max-potential-fid", 0)
+    inp_ms = int(round(inp_val))
+
+    return {
+        "P": int(score * 100),
+        "LCP": lcp_ms,
+        "FCP": int(round(audits["first-contentful-paint"])),
+        "TBT": int(round(audits["total-blocking-time"])),
+        "CLS": round(audits["cumulative-layout-shift"], 4),
+        "SI": int(round(audits["speed-index"])),
+        "TTI": int(round(audits["interactive"])),
+        "TTFB": int(round(audits["server-response-time"])),
+        "INP": inp_ms,
+    }
+
+
+# Индекс извлечённых метрик рядом с сохранёнными (сжатыми) отчётами:
+# {"Report_CLI_main_1.json.gz": {"P": 74, "LCP": 2413, ...}, ...}
+METRICS_INDEX_NAME = "metrics_index.json"
+
+
+def _open_report(json_file: str):
+    """Открывает отчёт на чтение; *.json.gz распаковывается на лету."""
+    if str(json_file).endswith(".gz"):
+        return gzip.open(json_file, "rt", encoding="utf-8")
+    return open(json_file, "r", encoding="utf-8")
+
+
+def _read_metrics_index(report_dir: Path) -> Dict[str, dict]:
+    index_path = report_dir / METRICS_INDEX_NAME
+    if not index_path.exists():
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _lookup_metrics_index(json_file: str) -> Optional[dict]:
+    path = Path(json_file)
+    index = _read_metrics_index(path.parent)
+    for name in (path.name, f"{path.name}.gz"):
+        metrics = index.get(name)
+        if isinstance(metrics, dict):
+            return metrics
+    return None
+
+
+def archive_reports(json_paths: List[str], parsed_results: List[Optional[dict]]) -> List[str]:
+    """
+    Сжимает сохраняемые отчёты в *.json.gz и дописывает их метрики в
+    metrics_index.json той же папки — повторный разбор сырого отчёта не нужен.
+
+    :return: Пути к сжатым отчётам.
+    """
+    archived = []
+    indexes: Dict[Path, Dict[str, dict]] = {}
+
+    for json_file, metrics in zip(json_paths, parsed_results):
+        path = Path(json_file)
+        if not path.exists():
+            continue
+        report_dir = path.parent
+        if report_dir not in indexes:
+            indexes[report_dir] = _read_metrics_index(report_dir)
+
+        if path.suffix == ".gz":
+            gz_path = path
+        else:
+            gz_path = path.with_name(f"{path.name}.gz")
+            with open(path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=6) as dst:
+                while True:
+                    chunk = src.read(_STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            os.remove(path)
+
+        if metrics is not None:
+            indexes[report_dir][gz_path.name] = metrics
+        archived.append(str(gz_path))
+
+    for report_dir, index in indexes.items():
+        with open(report_dir / METRICS_INDEX_NAME, "w", encoding="utf-8") as file:
+            json.dump(index, file, ensure_ascii=False, indent=2)
+
+    if archived:
+        print(f"[INFO] Отчёты сжаты ({len(archived)} шт.), метрики сохранены в {METRICS_INDEX_NAME}")
+    return archived
+
+
+def _metrics_from_report(data: Dict[str, Any]) -> dict:
+    """Метрики из разобранного отчёта; KeyError/TypeError — нужных полей нет."""
+    raw_audits = data.get("audits", {})
+    audits = {audit: raw_audits[audit]["numericValue"] for audit in _REQUIRED_AUDITS}
+    for audit in _OPTIONAL_AUDITS:
+        value = raw_audits.get(audit, {}).get("numericValue")
+        if value is not None:
+            audits[audit] = value
+    return _normalize_lighthouse_metrics(data["categories"]["performance"]["score"], audits)
+
+
+def extract_lighthouse_metrics(data: Dict[str, Any]) -> Optional[dict]:
+    """
+    Метрики из уже загруженного в память отчёта (lighthouseResult PSI) —
+    без записи на диск и повторного разбора. None — в отчёте нет нужных метрик.
+    """
+    try:
+        return _metrics_from_report(data)
+    except (KeyError, TypeError, AttributeError) as e:
+        print(f"[!] В отчёте нет метрики {e}")
+        return None
+
+
+def save_report_artifact(data: Dict[str, Any], json_file: str) -> str:
+    """
+    Сохраняет сырой отчёт как сжатый артефакт {json_file}.gz (компактный JSON).
+    Метрики в metrics_index.json дописывает archive_reports при обработке результатов.
+
+    :return: Путь к *.json.gz.
+    """
+    gz_path = Path(f"{json_file}.gz")
+    gz_path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(gz_path, "wt", encoding="utf-8", compresslevel=6) as file:
+        json.dump(data, file, ensure_ascii=False, separators=(",", ":"))
+    return str(gz_path)
+
+
+def _full_parse_lighthouse_results(json_file: str) -> dict:
+    """Полный разбор отчёта через json.load — запасной путь."""
+    with _open_report(json_file) as file:
+        data = json.load(file)
+    return _metrics_from_report(data)
+
+
+def _stream_parse_lighthouse_results(json_file: str) -> Optional[dict]:
+    """
+    Потоковый выборочный разбор: читает файл чанками и достаёт только
+    categories.performance.score и audits.*.numericValue, не строя дерево JSON.
+
+    Останавливается, как только найдены все нужные значения (categories идут
+    после audits, поэтому хвост с fullPageScreenshot/i18n не читается).
+    Возвращает None, если структура отчёта не совпала с ожидаемой.
+    """
+    audits: Dict[str, float] = {}
+    score: Optional[float] = None
+    score_pos = -1
+    last_required_pos = -1
+
+    buffer = ""
+    offset = 0  # абсолютная позиция buffer[0] в файле
+    scan_from = 0
+
+    with _open_report(json_file) as file:
+        while True:
+            chunk = file.read(_STREAM_CHUNK_SIZE)
+            buffer += chunk
+            start = max(scan_from - offset, 0)
+
+            for match in _AUDIT_VALUE_PATTERN.finditer(buffer, start):
+                audit = match.group("audit")
+                if audit in audits:
+                    continue
+                audits[audit] = float(match.group("value"))
+                if audit in _REQUIRED_AUDITS:
+                    last_required_pos = max(last_required_pos, offset + match.start())
+
+            if score is None:
+                match = _PERFORMANCE_SCORE_PATTERN.search(buffer, start)
+                if match:
+                    score = float(match.group("value"))
+                    score_pos = offset + match.start()
+
+            all_required = all(audit in audits for audit in _REQUIRED_AUDITS)
+            if all_required and score is not None and score_pos > last_required_pos:
+                break
+            if not chunk:
+                break
+
+            # Совпадение могло оборваться на границе чанка — оставляем хвост для повторного поиска
+            cut = max(len(buffer) - _STREAM_OVERLAP, 0)
+            buffer = buffer[cut:]
+            offset += cut
+            scan_from = offset
+
+    if score is None or not all(audit in audits for audit in _REQUIRED_AUDITS):
+        return None
+    return _normalize_lighthouse_metrics(score, audits)
+
+
 def parse_lighthouse_results(json_file: str) -> Optional[dict]:
     """
     Парсит JSON Lighthouse и нормализует метрики.
 
     Все временные метрики → миллисекунды.
     CLS остаётся безразмерным (0..1).
+
+    Если отчёт уже заархивирован (см. archive_reports), метрики берутся из
+    metrics_index.json. Иначе — потоковый выборочный разбор, полный json.load —
+    только если структура отчёта оказалась неожиданной.
     """
     try:
-        with open(json_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-
-        lcp_raw = data["audits"]["largest-contentful-paint"]["numericValue"]
-        # Защита от секунд: если значение выглядит как секунды (<50), умножаем.
-        lcp_ms = lcp_raw * 1000 if lcp_raw < 50 else lcp_raw
-        lcp_ms = int(round(lcp_ms))
+        metrics = _lookup_metrics_index(json_file)
+        if metrics is not None:
+            return metrics
 
-        inp_val = data.get("audits", {}).get("experimental-interaction-to-next-paint", {}).get("numericValue")
-        if inp_val is None:
-            inp_val = data.get("audits", {}).get("max-potential-fid", {}).get("numericValue", 0)
-        inp_ms = int(round(inp_val))
+        try:
+            metrics = _stream_parse_lighthouse_results(json_file)
+        except (re.error, ValueError, UnicodeDecodeError):
+            metrics = None
+        if metrics is not None:
+            return metrics
 
-        return {
-            "P": int(data["categories"]["performance"]["score"] * 100),
-            "LCP": lcp_ms,
-            "FCP": int(round(data["audits"]["first-contentful-paint"]["numericValue"])),
-            "TBT": int(round(data["audits"]["total-blocking-time"]["numericValue"])),
-            "CLS": round(data["audits"]["cumulative-layout-shift"]["numericValue"], 4),
-            "SI": int(round(data["audits"]["speed-index"]["numericValue"])),
-            "TTI": int(round(data["audits"]["interactive"]["numericValue"])),
-            "TTFB": int(round(data["audits"]["server-response-time"]["numericValue"])),
-            "INP": inp_ms,
-        }
+        return _full_parse_lighthouse_results(json_file)
 
     except Exception as e:  # pragma: no cover - логирование
         print(f"[!] Ошибка при разборе файла {json_file}: {e}")
@@ -120,23 +353,29 @@ def _safe_clean(values: List[float]) -> List[float]:
             num = float(v)
         except (TypeError, ValueError):
             continue
-        if np.isnan(num) or num <= 0:
+        if math.isnan(num) or num <= 0:
             continue
         cleaned.append(num)
     return cleaned
 
 
+CORE_WEB_VITALS = frozenset({"LCP", "INP", "CLS"})
+EXTENDED_STATS = ("min", "max", "mean", "std")
+
+
 def aggregate_results(results: List[Optional[Dict[str, Any]]]) -> Dict[str, Dict[str, float]]:
     """
     Аггрегирует результаты Lighthouse:
     - Core Web Vitals: p75, p90
     - Остальные: p75
     """
+    import numpy as np  # ленивый импорт: numpy нужен только при агрегации
+
     valid_results = [r for r in results if r is not None]
     if not valid_results:
         raise ValueError("[!] Нет валидных результатов для агрегации.")
 
-    core_web_vitals = {"LCP", "INP", "CLS"}
+    core_web_vitals = CORE_WEB_VITALS
 
     aggregated: Dict[str, Dict[str, float]] = {}
     for metric in valid_results[0].keys():
@@ -160,6 +399,168 @@ def aggregate_results(results: List[Optional[Dict[str, Any]]]) -> Dict[str, Dict
     return aggregated
 
 
+def _batch_percentile(sorted_values, counts, q: float):
+    """
+    Перцентиль по оси итераций для всех (группа, метрика) сразу.
+    sorted_values — (G, I, M), отсортирован по оси 1, NaN в конце; counts — (G, M) число валидных значений.
+    Повторяет метод 'linear' из np.percentile (индекс (n-1)*q и та же _lerp), поэтому результат
+    побитово совпадает с np.percentile по очищенному списку значений.
+    """
+    import numpy as np
+
+    virtual = (counts - 1) * (q / 100)
+    previous = np.floor(virtual)
+    above = virtual >= counts - 1
+    last = np.maximum(counts - 1, 0)
+    previous_idx = np.where(above, last, np.maximum(previous, 0)).astype(np.intp)
+    next_idx = np.where(above, last, previous + 1).astype(np.intp)
+    gamma = virtual - np.where(above, -1, previous)
+
+    a = np.take_along_axis(sorted_values, previous_idx[:, None, :], axis=1)[:, 0, :]
+    b = np.take_along_axis(sorted_values, next_idx[:, None, :], axis=1)[:, 0, :]
+    diff = b - a
+    result = a + diff * gamma
+    np.subtract(b, diff * (1 - gamma), out=result, where=gamma >= 0.5)
+    return result
+
+
+def aggregate_batch(
+    groups: Dict[Hashable, List[Optional[Dict[str, Any]]]],
+    extended: bool = False,
+) -> Dict[Hashable, Dict[str, Dict[str, float]]]:
+    """
+    Пакетная агрегация целого прогона (или истории): {ключ группы: итерации} -> {ключ: aggregated}.
+    Ключ — любой, например (route, device) или (run_id, environment, route, device).
+
+    Все группы укладываются в один массив (группа × итерация × метрика) с NaN на месте невалидных
+    значений (None/NaN/<=0, как в _safe_clean); p75/p90 считаются одной сортировкой на весь массив.
+    Для каждой группы результат совпадает с aggregate_results (набор и порядок метрик — по первой
+    валидной итерации группы). Группы без валидных итераций пропускаются.
+    extended=True — дополнительно min/max/mean/std (std — по генеральной совокупности).
+    """
+    import numpy as np
+
+    keys: List[Hashable] = []
+    rows: List[List[Dict[str, Any]]] = []
+    for key, results in groups.items():
+        valid_results = [r for r in results if r is not None]
+        if valid_results:
+            keys.append(key)
+            rows.append(valid_results)
+    if not keys:
+        return {}
+
+    metrics: Dict[str, int] = {}
+    for valid_results in rows:
+        for metric in valid_results[0]:
+            metrics.setdefault(metric, len(metrics))
+    names = list(metrics)
+    width = max(len(valid_results) for valid_results in rows)
+
+    # Один проход Python по значениям, дальше — только векторные операции
+    flat = np.array([v if isinstance(v, (int, float)) else np.nan
+                     for valid_results in rows for result in valid_results for v in map(result.get, names)],
+                    dtype=float).reshape(-1, len(names))
+    sizes = [len(valid_results) for valid_results in rows]
+    group_idx = np.repeat(np.arange(len(keys)), sizes)
+    iteration_idx = np.arange(len(flat)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    values = np.full((len(keys), width, len(names)), np.nan)
+    values[group_idx, iteration_idx] = flat
+    values[~(values > 0)] = np.nan  # NaN, нули и отрицательные — невалидны
+
+    counts = np.count_nonzero(~np.isnan(values), axis=1)
+    ordered = np.sort(values, axis=1)
+    stats = {"p75": _batch_percentile(ordered, counts, 75), "p90": _batch_percentile(ordered, counts, 90)}
+    if extended:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(values, axis=1) / counts
+            stats["min"] = ordered[:, 0, :]
+            stats["max"] = np.take_along_axis(ordered, np.maximum(counts - 1, 0)[:, None, :], axis=1)[:, 0, :]
+            stats["mean"] = mean
+            stats["std"] = np.sqrt(np.nansum((values - mean[:, None, :]) ** 2, axis=1) / counts)
+
+    # Округление как в aggregate_results: до целых — np.round (совпадает с round(x, 0)),
+    # CLS — встроенным round: np.round до 4 знаков может разойтись в последнем разряде
+    cls = metrics.get("CLS")
+    table = {}
+    for name, array in stats.items():
+        rounded = np.round(array)
+        if cls is not None:
+            rounded[:, cls] = array[:, cls]
+        table[name] = rounded.tolist()
+    present = counts.tolist()
+
+    aggregated: Dict[Hashable, Dict[str, Dict[str, float]]] = {}
+    for g, (key, valid_results) in enumerate(zip(keys, rows)):
+        group: Dict[str, Dict[str, float]] = {}
+        for metric in valid_results[0]:
+            m = metrics[metric]
+            if not present[g][m]:
+                continue
+            wanted = ("p75", "p90") if metric in CORE_WEB_VITALS else ("p75",)
+            if extended:
+                wanted += EXTENDED_STATS
+            if m == cls:
+                group[metric] = {name: round(table[name][g][m], 4) for name in wanted}
+            else:
+                group[metric] = {name: table[name][g][m] for name in wanted}
+        aggregated[key] = group
+    return aggregated
+
+
+def bootstrap_p75_ci_width(
+    values: List[float],
+    n_boot: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = 0,
+) -> Optional[float]:
+    """
+    Ширина бутстрап-доверительного интервала p75 (в единицах метрики).
+
+    None — если значений меньше трёх и оценивать нечего.
+    """
+    import numpy as np
+
+    cleaned = np.asarray(_safe_clean(values), dtype=float)
+    if cleaned.size < 3:
+        return None
+    rng = np.random.default_rng(seed)
+    samples = rng.choice(cleaned, size=(n_boot, cleaned.size), replace=True)
+    p75 = np.percentile(samples, 75, axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(p75, [alpha, 1.0 - alpha])
+    return float(high - low)
+
+
+def is_p75_converged(
+    results: List[Optional[Dict[str, Any]]],
+    metrics: tuple = ("LCP", "TBT"),
+    threshold: float = 0.1,
+    n_boot: int = 1000,
+) -> bool:
+    """
+    Сошлась ли оценка p75: относительная ширина бутстрап-CI (CI / p75 из aggregate_results)
+    не больше threshold для каждой метрики из metrics.
+
+    Метрика без валидных значений (например TBT = 0 на всех итерациях) считается сошедшейся.
+    """
+    valid_results = [r for r in results if r is not None]
+    if not valid_results:
+        return False
+    aggregated = aggregate_results(valid_results)
+
+    for metric in metrics:
+        if metric not in aggregated:
+            continue
+        p75 = aggregated[metric]["p75"]
+        width = bootstrap_p75_ci_width([r.get(metric) for r in valid_results], n_boot=n_boot)
+        if width is None or not p75:
+            return False
+        if width / p75 > threshold:
+            return False
+    return True
+
+
 def flatten_aggregated_metrics(aggregated: Dict[str, Dict[str, float]]) -> Dict[str, float]:
     """
     Плоский словарь для записи в Sheet.
@@ -196,12 +597,18 @@ def build_row(
     run_id: str = None,
     tag: str = "",
     sprint: str = "",
+    concurrency: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Формирует строку для Google Sheets.
+
+    concurrency — сколько прогонов Lighthouse шли одновременно (только для CLI).
+    Значение > 1 означает, что метрики собраны под конкуренцией за CPU.
     """
     source_type = f"{source.upper()}{{{iterations}}}"
     device_label = "desktop" if device_type.lower() == "desktop" else "mobile"
+    from services.google.google_sheets_client import GoogleSheetsClient
+
     page_link = GoogleSheetsClient.prepare_link(route_key, full_url) if full_url else route_key
     if run_id is None:
         now = datetime.now()
@@ -223,14 +630,57 @@ def build_row(
         "iterations": iterations,
     }
     row.update(flatten_aggregated_metrics(aggregated))
+    if concurrency is not None:
+        row["concurrency"] = concurrency
     return row
 
 
+def _is_temp_report_path(path: Path) -> bool:
+    try:
+        path.relative_to(TEMP_REPORTS_DIR)
+    except ValueError:
+        return False
+    return True
+
+
+def _store_results(store: Optional[RunStore], row: Dict[str, Any], source: str, environment: str,
+                   route_key: str, worksheet_name: str,
+                   parsed_results: Optional[List[Optional[dict]]] = None, buffered: bool = False) -> Optional[int]:
+    """Пишет итерации и агрегат в RunStore. Сбой хранилища не должен ронять запись в Sheets."""
+    try:
+        store = store or get_run_store()
+        if parsed_results is not None:
+            store.save_iterations(row["run_id"], source, environment, route_key, row["device"], parsed_results)
+        return store.save_aggregate(row, source=source, environment=environment, route=route_key,
+                                    worksheet=worksheet_name, buffered=buffered)
+    except Exception as e:
+        print(f"[WARNING] Не удалось записать результат в RunStore: {e}")
+        return None
+
+
+def _buffer_row(gsheet_client: GoogleSheetsClient, row: Dict[str, Any], source: str, worksheet_name: str,
+                store: Optional[RunStore], store_id: Optional[int]) -> None:
+    """
+    Строка в буфер клиента. Строка из RunStore в failed_flush_*.json не сохраняется, а при сбое
+    ensure_sheet_exists возвращается в pending — её дошлёт RunStore.replicate_pending.
+    """
+    try:
+        gsheet_client.ensure_sheet_exists(sheet_name=worksheet_name, source=source)
+    except Exception:
+        if store_id is not None:
+            try:
+                (store or get_run_store()).release([store_id])
+            except Exception as e:
+                print(f"[WARNING] Не удалось вернуть строку #{store_id} в pending: {e}")
+        raise
+    gsheet_client.append_result(row, worksheet_name=worksheet_name, fallback=store_id is None)
+
+
 def process_and_save_results(
     json_paths: List[str],
     route_key: str,
     device_type: str,
-    gsheet_client: GoogleSheetsClient,
+    gsheet_client: Optional[GoogleSheetsClient],
     is_local: bool = True,
     keep_temp_files: bool = False,
     environment: Optional[str] = None,
@@ -239,8 +689,21 @@ def process_and_save_results(
     run_id: Optional[str] = None,
     tag: str = "",
     sprint: str = "",
-):
-    parsed_results = [parse_lighthouse_results(p) for p in json_paths]
+    concurrency: Optional[int] = None,
+    run_store: Optional[RunStore] = None,
+    parsed_results: Optional[List[Optional[dict]]] = None,
+) -> Optional[int]:
+    """
+    Разбирает отчёты, агрегирует метрики и сохраняет строку:
+    сначала в RunStore (итерации + агрегат), затем в буфер gsheet_client.
+    gsheet_client=None — только RunStore, в Sheets строка уйдёт через replicate_pending.
+    parsed_results — метрики, уже извлечённые в памяти (API, адаптивный CLI): json_paths тогда
+    не разбираются; это либо пусто, либо отчёты/артефакты в том же порядке (для metrics_index.json).
+
+    :return: id агрегата в RunStore (None — нет данных или хранилище недоступно).
+    """
+    if parsed_results is None:
+        parsed_results = [parse_lighthouse_results(p) for p in json_paths]
 
     if not parsed_results or all(res is None for res in parsed_results):
         print(f"[WARNING!] Нет валидных данных для роутa {route_key}.")
@@ -251,11 +714,11 @@ def process_and_save_results(
     if not keep_temp_files:
         temp_dirs = {Path(p).parent for p in json_paths}
         for temp_dir in temp_dirs:
-            try:
-                temp_dir.relative_to(TEMP_REPORTS_DIR)
-            except ValueError:
-                continue
-            cleanup_temp_files(temp_dir)
+            if _is_temp_report_path(temp_dir):
+                cleanup_temp_files(temp_dir)
+    else:
+        kept = [(p, res) for p, res in zip(json_paths, parsed_results) if _is_temp_report_path(Path(p))]
+        archive_reports([p for p, _ in kept], [res for _, res in kept])
 
     environment = environment or get_current_environment()
     resolved_url = full_url or get_full_url(route_key)
@@ -263,9 +726,6 @@ def process_and_save_results(
     source_type = "cli" if is_local else "api"
     worksheet_name = resolve_worksheet_name(environment, source=source_type)
 
-    gsheet_client.worksheet_name = worksheet_name
-    gsheet_client.ensure_sheet_exists(sheet_name=worksheet_name, source=source_type)
-
     timestamp = datetime.now().strftime("%Y.%m.%d %H:%M:%S")
     row = build_row(
         timestamp=timestamp,
@@ -279,22 +739,32 @@ def process_and_save_results(
         run_id=run_id,
         tag=tag,
         sprint=sprint,
+        concurrency=concurrency,
     )
-    gsheet_client.append_result(row)
+    store_id = _store_results(run_store, row, source_type, environment, route_key, worksheet_name, parsed_results,
+                              buffered=gsheet_client is not None)
+
+    if gsheet_client is not None:
+        _buffer_row(gsheet_client, row, source_type, worksheet_name, run_store, store_id)
+    return store_id
 
 
 def process_crux_results(
     crux_file: str,
     route_key: str,
     device: str,
-    gsheet_client: GoogleSheetsClient,
+    gsheet_client: Optional[GoogleSheetsClient],
     full_url_override: str = None,
     route_label: str = None,
     environment: Optional[str] = None,
     run_id: Optional[str] = None,
     tag: str = "",
     sprint: str = "",
-):
+    run_store: Optional[RunStore] = None,
+) -> Optional[int]:
+    """Как process_and_save_results, но для CrUX: одна строка без итераций."""
+    from services.google.google_sheets_client import GoogleSheetsClient
+
     crux_metrics = parse_crux_results(crux_file)
 
     if not crux_metrics:
@@ -305,9 +775,6 @@ def process_crux_results(
     environment = environment or get_current_environment()
     worksheet_name = resolve_worksheet_name(environment, source=source_type)
 
-    gsheet_client.worksheet_name = worksheet_name
-    gsheet_client.ensure_sheet_exists(sheet_name=worksheet_name, source=source_type)
-
     timestamp = datetime.now().strftime("%Y.%m.%d %H:%M:%S")
 
     target_url = full_url_override or get_full_url(route_key)
@@ -335,5 +802,9 @@ def process_crux_results(
         "CLS_good_pct": crux_metrics.get("CLS_good_pct"),
         "TTFB": crux_metrics.get("TTFB"),
     }
+    store_id = _store_results(run_store, row, source_type, environment, route_label or route_key, worksheet_name,
+                              buffered=gsheet_client is not None)
 
-    gsheet_client.append_result(row)
+    if gsheet_client is not None:
+        _buffer_row(gsheet_client, row, source_type, worksheet_name, run_store, store_id)
+    return store_id
@@ -0,0 +1,298 @@
+"""
+Статистический детектор регрессий: прогон против скользящего baseline.
+
+Дашборд (tools/clasp, buildAlerts/metricDelta) сравнивал только p75 последнего и предыдущего
+прогона — один шумный прогон давал алерт, а считалось это в Apps Script на каждый рендер.
+Здесь сравниваются распределения итераций: итерации прогона против итераций последних
+baseline_runs прогонов того же route/device/environment/source (из RunStore), односторонний
+критерий Манна–Уитни. Регрессия — p < alpha и ухудшение p75 не меньше min_effect.
+
+Результат — компактная таблица вердиктов; --publish пишет её в лист Regressions,
+дашборд только отображает готовые строки.
+
+Использование:
+    python -m services.lighthouse.regression                      # последний CLI-прогон
+    python -m services.lighthouse.regression 2026.10.16-101500 --environment VRP_PROD --publish
+"""
+
+import argparse
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.lighthouse.log_utils import print
+from services.lighthouse.run_store import RunStore, get_run_store
+
+
+REGRESSIONS_SHEET = "Regressions"
+
+DEFAULT_METRICS = ("P", "LCP", "FCP", "TBT", "CLS", "TTFB", "INP")
+HIGHER_IS_BETTER = frozenset({"P"})
+
+BASELINE_RUNS = 5      # сколько предыдущих прогонов объединяется в baseline
+ALPHA = 0.01           # порог p-value; метрик и роутов много — строже обычного 0.05
+MIN_EFFECT = 5.0       # минимальное ухудшение p75 в %, ниже — не регрессия, даже если значимо
+MIN_SAMPLES = 3        # меньше валидных итераций в прогоне или baseline — вердикт INSUFFICIENT
+
+# 0 — нормальное значение (нет long tasks / сдвигов layout): нули не отбрасываются, иначе
+# TBT 0 -> 500 ms давал INSUFFICIENT вместо регрессии
+ZERO_VALID_METRICS = frozenset({"TBT", "CLS"})
+# Знаменатель delta_pct не меньше порога: при baseline p75 = 0 процент иначе не определён
+EFFECT_FLOOR = {"TBT": 50.0, "CLS": 0.01}
+
+VERDICT_REGRESSION = "REGRESSION"
+VERDICT_IMPROVEMENT = "IMPROVEMENT"
+VERDICT_OK = "OK"
+VERDICT_INSUFFICIENT = "INSUFFICIENT"
+
+GroupKey = Tuple[str, str, str]  # (environment, route, device)
+
+
+def mann_whitney_u(sample: Sequence[float], baseline: Sequence[float]) -> Tuple[float, float]:
+    """
+    Односторонний критерий Манна–Уитни: H1 — sample стохастически больше baseline.
+    Нормальная аппроксимация с поправками на связи и непрерывность
+    (как scipy.stats.mannwhitneyu(..., alternative="greater", method="asymptotic")).
+    :return: (U для sample, p-value).
+    """
+    import numpy as np
+
+    x = np.asarray(sample, dtype=float)
+    y = np.asarray(baseline, dtype=float)
+    n1, n2 = x.size, y.size
+    if not n1 or not n2:
+        raise ValueError("Обе выборки должны быть непустыми")
+
+    combined = np.concatenate([x, y])
+    unique, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(counts) - (counts - 1) / 2.0  # средний ранг для связей
+    u = float(average_ranks[inverse][:n1].sum() - n1 * (n1 + 1) / 2.0)
+
+    n = n1 + n2
+    ties = float((counts ** 3 - counts).sum())
+    variance = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0  # все значения одинаковы
+    z = (u - n1 * n2 / 2.0 - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+def _p75(values: Sequence[float]) -> float:
+    import numpy as np
+
+    return float(np.percentile(values, 75))
+
+
+def _clean(metric: str, values: Sequence[Any]) -> List[float]:
+    """Как _safe_clean при агрегации, но для ZERO_VALID_METRICS нули остаются валидными значениями."""
+    from services.lighthouse.processor_lighthouse import _safe_clean
+
+    if metric not in ZERO_VALID_METRICS:
+        return _safe_clean(values)
+    cleaned = []
+    for value in values:
+        try:
+            num = float(value)
+        except (TypeError, ValueError):
+            continue
+        if not math.isnan(num) and num >= 0:
+            cleaned.append(num)
+    return cleaned
+
+
+def compare_metric(metric: str, current: Sequence[Any], baseline: Sequence[Any], alpha: float = ALPHA,
+                   min_effect: float = MIN_EFFECT) -> Dict[str, Any]:
+    """
+    Вердикт по одной метрике. Значения чистятся как при агрегации (None/NaN/<=0 отбрасываются;
+    у TBT/CLS нули остаются). delta_pct — изменение p75 прогона относительно p75 baseline
+    (не меньше EFFECT_FLOOR), со знаком «+» = хуже.
+    """
+    current_values, baseline_values = _clean(metric, current), _clean(metric, baseline)
+    verdict: Dict[str, Any] = {
+        "metric": metric, "current_n": len(current_values), "baseline_n": len(baseline_values),
+        "current_p75": None, "baseline_p75": None, "delta_pct": None, "p_value": None,
+        "verdict": VERDICT_INSUFFICIENT,
+    }
+    if len(current_values) < MIN_SAMPLES or len(baseline_values) < MIN_SAMPLES:
+        return verdict
+
+    current_p75, baseline_p75 = _p75(current_values), _p75(baseline_values)
+    sign = -1.0 if metric in HIGHER_IS_BETTER else 1.0
+    delta_pct = sign * (current_p75 - baseline_p75) / max(baseline_p75, EFFECT_FLOOR.get(metric, 0.0)) * 100.0
+
+    if metric in HIGHER_IS_BETTER:  # ухудшение — это baseline > current
+        worse, better = (baseline_values, current_values), (current_values, baseline_values)
+    else:
+        worse, better = (current_values, baseline_values), (baseline_values, current_values)
+    _, p_worse = mann_whitney_u(*worse)
+    _, p_better = mann_whitney_u(*better)
+
+    if p_worse < alpha and delta_pct >= min_effect:
+        status, p_value = VERDICT_REGRESSION, p_worse
+    elif p_better < alpha and delta_pct <= -min_effect:
+        status, p_value = VERDICT_IMPROVEMENT, p_better
+    else:
+        status, p_value = VERDICT_OK, min(p_worse, p_better)
+
+    decimals = 4 if metric == "CLS" else 0
+    verdict.update(current_p75=round(current_p75, decimals), baseline_p75=round(baseline_p75, decimals),
+                   delta_pct=round(delta_pct, 1), p_value=round(p_value, 4), verdict=status)
+    return verdict
+
+
+def alert_level(verdict: Dict[str, Any]) -> str:
+    """Уровень алерта для дашборда: по величине ухудшения, как пороги buildAlerts (20/10/5%)."""
+    if verdict["verdict"] != VERDICT_REGRESSION:
+        return ""
+    delta = verdict["delta_pct"]
+    return "HIGH" if delta >= 20 else "MEDIUM" if delta >= 10 else "LOW"
+
+
+def _history(store: RunStore, source: str, environment: Optional[str]) -> Dict[GroupKey, List[Tuple[str, list]]]:
+    """{(environment, route, device): [(run_id, итерации), ...] по возрастанию run_id} — один запрос."""
+    history: Dict[GroupKey, List[Tuple[str, list]]] = {}
+    for (run_id, env, route, device), results in store.iteration_batches(source, environment).items():
+        history.setdefault((env, route, device), []).append((run_id, results))
+    for runs in history.values():
+        runs.sort(key=lambda item: item[0])  # run_id = YYYY.MM.DD-HHMMSS — хронологический порядок
+    return history
+
+
+def detect_regressions(
+    run_id: Optional[str] = None,
+    source: str = "cli",
+    environment: Optional[str] = None,
+    store: Optional[RunStore] = None,
+    baseline_runs: int = BASELINE_RUNS,
+    metrics: Sequence[str] = DEFAULT_METRICS,
+    alpha: float = ALPHA,
+    min_effect: float = MIN_EFFECT,
+) -> List[Dict[str, Any]]:
+    """
+    Вердикты по всем route/device прогона run_id (по умолчанию — последнего в хранилище).
+    Baseline — итерации baseline_runs предыдущих прогонов той же группы, объединённые в одну выборку.
+    :return: Строки вердиктов (environment, route, device, run_id, baseline_runs + поля compare_metric).
+    """
+    store = store or get_run_store()
+    history = _history(store, source, environment)
+    if run_id is None:
+        run_ids = [runs[-1][0] for runs in history.values()]
+        if not run_ids:
+            return []
+        run_id = max(run_ids)
+
+    verdicts: List[Dict[str, Any]] = []
+    for (env, route, device), runs in sorted(history.items()):
+        position = next((i for i, (rid, _) in enumerate(runs) if rid == run_id), None)
+        if position is None:
+            continue
+        current = runs[position][1]
+        baseline = [result for _, results in runs[max(0, position - baseline_runs):position] for result in results]
+        used_runs = min(position, baseline_runs)
+        for metric in metrics:
+            verdict = compare_metric(metric, [r.get(metric) for r in current], [r.get(metric) for r in baseline],
+                                     alpha=alpha, min_effect=min_effect)
+            verdicts.append({"environment": env, "route": route, "device": device, "run_id": run_id,
+                             "baseline_runs": used_runs, **verdict, "level": alert_level(verdict)})
+    return verdicts
+
+
+def verdict_rows(verdicts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Строки для листа Regressions — только то, что дашборду нужно показать:
+    REGRESSION/IMPROVEMENT и INSUFFICIENT по метрикам (по недооценённым метрикам дашборд
+    оставляет наивные дельты), а для route/device, где все метрики оценены и в норме, — одна
+    строка metric=ALL, verdict=OK.
+    """
+    from services.lighthouse.processor_lighthouse import _split_environment
+
+    timestamp = datetime.now().strftime("%Y.%m.%d %H:%M:%S")
+    groups: Dict[GroupKey, List[Dict[str, Any]]] = {}
+    for verdict in verdicts:
+        groups.setdefault((verdict["environment"], verdict["route"], verdict["device"]), []).append(verdict)
+
+    rows = []
+    for (environment, route, device), group in groups.items():
+        flagged = [v for v in group if v["verdict"] != VERDICT_OK]
+        project, env = _split_environment(environment)
+        base = {"date": timestamp, "project": project, "environment": env or environment, "device": device,
+                "page": route, "run_id": group[0]["run_id"], "baseline_runs": group[0]["baseline_runs"]}
+        if not flagged:
+            rows.append({**base, "metric": "ALL", "verdict": VERDICT_OK})
+        for verdict in flagged:
+            rows.append({
+                **base,
+                "metric": verdict["metric"],
+                "verdict": verdict["verdict"],
+                "level": verdict["level"],
+                "baseline_p75": verdict["baseline_p75"],
+                "current_p75": verdict["current_p75"],
+                "delta_pct": verdict["delta_pct"],
+                "p_value": verdict["p_value"],
+                "n": f"{verdict['current_n']}/{verdict['baseline_n']}",
+            })
+    return rows
+
+
+def publish(rows: List[Dict[str, Any]], gsheet_client) -> int:
+    """Дописывает строки вердиктов в лист Regressions одним flush. Возвращает число строк."""
+    if not rows:
+        return 0
+    gsheet_client.ensure_plain_sheet(REGRESSIONS_SHEET)
+    for row in rows:
+        gsheet_client.append_result(row, worksheet_name=REGRESSIONS_SHEET)
+    gsheet_client.flush()
+    return len(rows)
+
+
+def format_table(verdicts: List[Dict[str, Any]], include_ok: bool = False) -> str:
+    """Компактная текстовая таблица вердиктов (для консоли и MCP)."""
+    shown = [v for v in verdicts if include_ok or v["verdict"] in (VERDICT_REGRESSION, VERDICT_IMPROVEMENT)]
+    if not shown:
+        return "Регрессий и улучшений не найдено."
+    lines = [f"{'verdict':<12} {'level':<6} {'environment':<12} {'route':<20} {'device':<8} {'metric':<5} "
+             f"{'baseline':>9} {'current':>9} {'delta%':>7} {'p':>7}"]
+    for v in shown:
+        lines.append(f"{v['verdict']:<12} {v['level']:<6} {v['environment']:<12} {v['route']:<20} {v['device']:<8} "
+                     f"{v['metric']:<5} {v['baseline_p75'] if v['baseline_p75'] is not None else '—':>9} "
+                     f"{v['current_p75'] if v['current_p75'] is not None else '—':>9} "
+                     f"{v['delta_pct'] if v['delta_pct'] is not None else '—':>7} "
+                     f"{v['p_value'] if v['p_value'] is not None else '—':>7}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Регрессии прогона Lighthouse против baseline из RunStore")
+    parser.add_argument("run_id", nargs="?", help="run_id прогона (по умолчанию — последний)")
+    parser.add_argument("--source", default="cli", choices=["cli", "api"])
+    parser.add_argument("--environment")
+    parser.add_argument("--baseline-runs", type=int, default=BASELINE_RUNS)
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--min-effect", type=float, default=MIN_EFFECT, help="Минимальное ухудшение p75, %%")
+    parser.add_argument("--all", action="store_true", help="Показать и OK/INSUFFICIENT")
+    parser.add_argument("--publish", action="store_true", help=f"Дописать вердикты в лист {REGRESSIONS_SHEET}")
+    args = parser.parse_args()
+
+    verdicts = detect_regressions(args.run_id, args.source, args.environment, baseline_runs=args.baseline_runs,
+                                  alpha=args.alpha, min_effect=args.min_effect)
+    if not verdicts:
+        print("[WARNING] Прогон не найден в RunStore.")
+        return
+    print(format_table(verdicts, include_ok=args.all))
+
+    if args.publish:
+        from dotenv import load_dotenv
+        from services.google.google_sheets_client import GoogleSheetsClient
+        from services.lighthouse.configs.config_lighthouse import LIGHTHOUSE_DIR, get_google_creds_path
+
+        load_dotenv(LIGHTHOUSE_DIR / "configs" / "config_lighthouse.env")
+        spreadsheet_id = os.getenv("GS_SHEET_ID")
+        if not spreadsheet_id:
+            raise SystemExit("[ERROR] GS_SHEET_ID не задан")
+        client = GoogleSheetsClient(str(get_google_creds_path()), spreadsheet_id, REGRESSIONS_SHEET)
+        print(f"[DONE] В лист {REGRESSIONS_SHEET} записано строк: {publish(verdict_rows(verdicts), client)}")
+
+
+if __name__ == "__main__":
+    main()
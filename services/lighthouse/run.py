@@ -52,7 +52,7 @@ def switch_environment(environment: str) -> str:
     with open(cfg.CONFIG_PATH, "w", encoding="utf-8") as f:
         config.write(f)
 
-    cfg.BASE_URL = None
+    cfg.invalidate_config()
     base_url = cfg.get_base_url()
     print(f"[OK] Контур: {environment} ({base_url})")
     return base_url
@@ -66,6 +66,7 @@ def main():
   python -m services.lighthouse.run VRS_DEV home desktop 10
   python -m services.lighthouse.run VRP_PROD home,login mobile 5
   python -m services.lighthouse.run VRS_TEST home desktop
+  python -m services.lighthouse.run --parallel 4 VRP_PROD home,login mobile 10
   python -m services.lighthouse.run --crux VRP_PROD home desktop""",
     )
     parser.add_argument("environment", choices=VALID_ENVIRONMENTS,
@@ -77,6 +78,16 @@ def main():
                         help="Количество итераций (по умолчанию 10)")
     parser.add_argument("--crux", action="store_true",
                         help="Собрать CrUX данные вместо CLI прогона")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N",
+                        help="Число параллельных Lighthouse-процессов (по умолчанию 1 — последовательно)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Адаптивное число итераций: iterations — минимум, дальше до сходимости p75 LCP/TBT")
+    parser.add_argument("--max-iterations", type=int, default=20,
+                        help="Максимум итераций в адаптивном режиме (по умолчанию 20)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Гонять итерации через прогретый Node/Chrome (scripts/lighthouse_daemon.js)")
+    parser.add_argument("--full-report", action="store_true",
+                        help="Полный отчёт Lighthouse со скриншотами и treemap (по умолчанию — облегчённый)")
 
     args = parser.parse_args()
     routes = [r.strip() for r in args.route.split(",")]
@@ -94,12 +105,18 @@ def main():
             base_url=base_url,
         )
     else:
-        print(f"[START] Lighthouse CLI: {', '.join(routes)} | {args.device} | {args.iterations} итераций")
+        print(f"[START] Lighthouse CLI: {', '.join(routes)} | {args.device} | {args.iterations} итераций"
+              f" | воркеров: {args.parallel}")
         service.run_local_tests(
             route_keys=routes,
             device_type=args.device,
             n_iteration=args.iterations,
             base_url=base_url,
+            max_workers=args.parallel,
+            use_daemon=args.daemon,
+            adaptive=args.adaptive,
+            max_iterations=args.max_iterations,
+            lean_report=not args.full_report,
         )
 
     print(f"[DONE] Результаты записаны в Google Sheets.")
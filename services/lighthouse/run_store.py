@@ -0,0 +1,403 @@
+"""
+Локальное хранилище прогонов Lighthouse/CrUX (SQLite).
+
+Первичный приёмник результатов: process_and_save_results / process_crux_results
+сначала пишут сюда сырые метрики каждой итерации и агрегированную строку,
+и только потом строка уходит в буфер GoogleSheetsClient. Google Sheets — реплика:
+строки со статусом pending (в том числе после неудачного flush) досылает
+RunStore.replicate_pending() — автоматически после следующего успешного flush прогона
+или командой replicate. Репликация синхронная: отдельного фонового процесса нет.
+
+Таблицы:
+    iterations — метрики каждой итерации, ключ (run_id, source, environment, route, device, iteration)
+    aggregates — агрегированная строка (как в Sheets) + p75-метрики отдельными колонками
+
+Использование:
+    python -m services.lighthouse.run_store trend main desktop --metric LCP
+    python -m services.lighthouse.run_store pending
+    python -m services.lighthouse.run_store replicate
+    python -m services.lighthouse.run_store reaggregate --since 2026.01.01 --metric LCP
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.lighthouse.configs.config_lighthouse import REPORTS_DIR
+from services.lighthouse.log_utils import print
+
+
+DEFAULT_RUN_STORE_PATH = REPORTS_DIR / "run_store.sqlite3"
+
+# Колонки метрик: те же ключи, что в parse_lighthouse_results / build_row
+ITERATION_METRICS = ("P", "LCP", "FCP", "TBT", "CLS", "SI", "TTI", "TTFB", "INP")
+AGGREGATE_METRICS = ("P", "LCP", "INP", "CLS", "TBT", "FCP", "SI", "TTI", "TTFB")
+
+# Статусы репликации агрегатов в Google Sheets
+REPLICATION_PENDING = "pending"    # не отправлено или отправка не удалась — досылается replicate_pending
+REPLICATION_BUFFERED = "buffered"  # в буфере GoogleSheetsClient живого прогона, уйдёт его flush
+REPLICATION_SENDING = "sending"    # захвачено replicate_pending, идёт отправка
+REPLICATION_SENT = "sent"          # записано в Sheets
+REPLICATION_FALLBACK = "fallback"  # устаревший статус: строки в failed_flush_*.json, их досылает клиент
+_UNSENT = (REPLICATION_PENDING, REPLICATION_BUFFERED, REPLICATION_SENDING)
+
+# buffered/sending дольше этого срока — процесс-владелец умер до flush, строки снова досылаются
+STALE_CLAIM_SECONDS = 24 * 3600
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS iterations (
+    run_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    route TEXT NOT NULL,
+    device TEXT NOT NULL,
+    iteration INTEGER NOT NULL,
+    {", ".join(f"{m} REAL" for m in ITERATION_METRICS)},
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, source, environment, route, device, iteration)
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    route TEXT NOT NULL,
+    device TEXT NOT NULL,
+    worksheet TEXT NOT NULL,
+    iterations INTEGER,
+    {", ".join(f"{m} REAL" for m in AGGREGATE_METRICS)},
+    row_json TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    replication TEXT NOT NULL DEFAULT '{REPLICATION_PENDING}',
+    replicated_at TEXT,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_aggregates_trend ON aggregates (route, device, source, created_at);
+CREATE INDEX IF NOT EXISTS idx_aggregates_replication ON aggregates (replication);
+"""
+
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RunStore:
+    """Обёртка над SQLite-файлом прогонов. Соединение открывается на каждую операцию —
+    безопасно для пула процессов и MCP-воркеров, пишущих параллельно."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.getenv("LIGHTHOUSE_RUN_STORE") or DEFAULT_RUN_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(aggregates)")}
+            if "claimed_at" not in columns:  # хранилище до статусов buffered/sending
+                conn.execute("ALTER TABLE aggregates ADD COLUMN claimed_at REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y.%m.%d %H:%M:%S")
+
+    # === Запись ===
+
+    def save_iterations(self, run_id: str, source: str, environment: str, route: str, device: str,
+                        results: List[Optional[Dict[str, Any]]], start_iteration: int = 1) -> int:
+        """Сохраняет метрики итераций (None — итерация без данных, пропускается). Возвращает число строк."""
+        now = self._now()
+        rows = [
+            (run_id, source, environment, route, device, iteration,
+             *(_as_number(result.get(m)) for m in ITERATION_METRICS), now)
+            for iteration, result in enumerate(results, start=start_iteration)
+            if result is not None
+        ]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * (7 + len(ITERATION_METRICS)))
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO iterations (run_id, source, environment, route, device, iteration, "
+                f"{', '.join(ITERATION_METRICS)}, created_at) VALUES ({placeholders})",
+                rows,
+            )
+        return len(rows)
+
+    def save_aggregate(self, row: Dict[str, Any], source: str, environment: str, route: str,
+                       worksheet: str, buffered: bool = False) -> int:
+        """
+        Сохраняет агрегированную строку (в формате Sheets). Возвращает id.
+        buffered=True — строка сразу уходит в буфер клиента прогона (статус buffered):
+        replicate_pending её не трогает, пока flush прогона не отметит результат.
+        """
+        status, claimed_at = (REPLICATION_BUFFERED, time.time()) if buffered else (REPLICATION_PENDING, None)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO aggregates (run_id, source, environment, route, device, worksheet, iterations, "
+                f"{', '.join(AGGREGATE_METRICS)}, row_json, created_at, replication, claimed_at) "
+                f"VALUES ({', '.join('?' * (11 + len(AGGREGATE_METRICS)))})",
+                (
+                    str(row.get("run_id") or ""), source, environment, route, str(row.get("device") or ""),
+                    worksheet, row.get("iterations"),
+                    *(_as_number(row.get(m)) for m in AGGREGATE_METRICS),
+                    json.dumps(row, ensure_ascii=False, default=str), self._now(), status, claimed_at,
+                ),
+            )
+            return cursor.lastrowid
+
+    def mark_replicated(self, run_id: Optional[str] = None, source: Optional[str] = None,
+                        ids: Optional[Iterable[int]] = None, status: str = REPLICATION_SENT) -> int:
+        """Помечает неотправленные агрегаты (по run_id/source или по ids) отправленными. Возвращает число строк."""
+        clauses, params = [f"replication IN ({', '.join('?' * len(_UNSENT))})"], list(_UNSENT)
+        if run_id is not None:
+            clauses.append("run_id = ?")
+            params.append(run_id)
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if ids is not None:
+            ids = list(ids)
+            if not ids:
+                return 0
+            clauses.append(f"id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE aggregates SET replication = ?, replicated_at = ?, claimed_at = NULL "
+                f"WHERE {' AND '.join(clauses)}",
+                [status, self._now(), *params],
+            )
+            return cursor.rowcount
+
+    def release(self, ids: Iterable[int]) -> int:
+        """Возвращает buffered/sending-агрегаты в pending (отправка не удалась). Возвращает число строк."""
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return 0
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE aggregates SET replication = ?, claimed_at = NULL "
+                f"WHERE replication IN (?, ?) AND id IN ({', '.join('?' * len(ids))})",
+                [REPLICATION_PENDING, REPLICATION_BUFFERED, REPLICATION_SENDING, *ids],
+            )
+            return cursor.rowcount
+
+    def claim_pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Атомарно захватывает агрегаты для отправки (статус sending): pending и зависшие
+        buffered/sending старше STALE_CLAIM_SECONDS. Параллельный replicate их уже не получит.
+        """
+        now = time.time()
+        query = ("SELECT id, source, worksheet, row_json FROM aggregates "
+                 "WHERE replication = ? OR (replication IN (?, ?) AND claimed_at < ?) ORDER BY id")
+        params: List[Any] = [REPLICATION_PENDING, REPLICATION_BUFFERED, REPLICATION_SENDING,
+                             now - STALE_CLAIM_SECONDS]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [self._pending_item(r) for r in conn.execute(query, params)]
+            ids = [item["id"] for item in rows]
+            if ids:
+                conn.execute(
+                    f"UPDATE aggregates SET replication = ?, claimed_at = ? "
+                    f"WHERE id IN ({', '.join('?' * len(ids))})",
+                    [REPLICATION_SENDING, now, *ids],
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return rows
+
+    # === Чтение ===
+
+    @staticmethod
+    def _pending_item(r: sqlite3.Row) -> Dict[str, Any]:
+        return {"id": r["id"], "source": r["source"], "worksheet": r["worksheet"], "row": json.loads(r["row_json"])}
+
+    def pending_rows(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Агрегаты, ещё не отправленные в Sheets (pending/buffered/sending), в порядке записи."""
+        query = (f"SELECT id, source, worksheet, row_json, replication FROM aggregates "
+                 f"WHERE replication IN ({', '.join('?' * len(_UNSENT))}) ORDER BY id")
+        params: List[Any] = list(_UNSENT)
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            return [dict(self._pending_item(r), status=r["replication"]) for r in conn.execute(query, params)]
+
+    def iteration_results(self, run_id: str, route: str, device: str, source: str = "cli",
+                          environment: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Метрики итераций в формате parse_lighthouse_results — для повторной агрегации."""
+        query = (f"SELECT {', '.join(ITERATION_METRICS)} FROM iterations "
+                 "WHERE run_id = ? AND route = ? AND device = ? AND source = ?")
+        params: List[Any] = [run_id, route, device, source]
+        if environment:
+            query += " AND environment = ?"
+            params.append(environment)
+        query += " ORDER BY iteration"
+        with self._connect() as conn:
+            return [
+                {m: r[m] for m in ITERATION_METRICS if r[m] is not None}
+                for r in conn.execute(query, params)
+            ]
+
+    def iteration_batches(self, source: str = "cli", environment: Optional[str] = None,
+                          since: Optional[str] = None) -> Dict[Tuple[str, str, str, str], List[Dict[str, Any]]]:
+        """
+        Все итерации одним запросом, сгруппированные по (run_id, environment, route, device) —
+        вход для processor_lighthouse.aggregate_batch. since — нижняя граница created_at ("YYYY.MM.DD ...").
+        """
+        query = (f"SELECT run_id, environment, route, device, {', '.join(ITERATION_METRICS)} FROM iterations "
+                 "WHERE source = ?")
+        params: List[Any] = [source]
+        if environment:
+            query += " AND environment = ?"
+            params.append(environment)
+        if since:
+            query += " AND created_at >= ?"
+            params.append(since)
+        query += " ORDER BY run_id, environment, route, device, iteration"
+        batches: Dict[Tuple[str, str, str, str], List[Dict[str, Any]]] = {}
+        with self._connect() as conn:
+            for r in conn.execute(query, params):
+                key = (r["run_id"], r["environment"], r["route"], r["device"])
+                batches.setdefault(key, []).append({m: r[m] for m in ITERATION_METRICS if r[m] is not None})
+        return batches
+
+    def trend(self, route: str, device: str, metric: str = "LCP", source: str = "cli",
+              environment: Optional[str] = None, limit: int = 30) -> List[Dict[str, Any]]:
+        """Последние `limit` значений p75-метрики роута, от старых к новым."""
+        if metric not in AGGREGATE_METRICS:
+            raise ValueError(f"Неизвестная метрика '{metric}', доступны: {', '.join(AGGREGATE_METRICS)}")
+        query = (f"SELECT created_at, run_id, environment, {metric} AS value FROM aggregates "
+                 f"WHERE route = ? AND device = ? AND source = ? AND {metric} IS NOT NULL")
+        params: List[Any] = [route, device, source]
+        if environment:
+            query += " AND environment = ?"
+            params.append(environment)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = [dict(r) for r in conn.execute(query, params)]
+        return rows[::-1]
+
+    # === Репликация ===
+
+    def replicate_pending(self, gsheet_client, limit: Optional[int] = None) -> int:
+        """
+        Досылает pending-агрегаты в Google Sheets одним flush (все листы сразу).
+        Возвращает число отправленных строк; при ошибке строки возвращаются в pending
+        (fallback-файл клиента для них не пишется) и уйдут следующим вызовом.
+        """
+        pending = self.claim_pending(limit)
+        if not pending:
+            return 0
+
+        ids = [item["id"] for item in pending]
+        try:
+            # Сначала все листы: сбой ensure не оставит в буфере клиента часть строк
+            for worksheet, source in dict.fromkeys((item["worksheet"], item["source"]) for item in pending):
+                gsheet_client.ensure_sheet_exists(sheet_name=worksheet, source=source)
+            for item in pending:
+                gsheet_client.append_result(item["row"], worksheet_name=item["worksheet"], fallback=False)
+            gsheet_client.flush()
+        except Exception as e:
+            print(f"[ERROR] Репликация в Google Sheets не удалась, строки останутся pending: {e}")
+            self.release(ids)
+            return 0
+        sent = self.mark_replicated(ids=ids)
+        print(f"[INFO] Реплицировано в Google Sheets: {sent} строк")
+        return sent
+
+
+_default_store: Optional[RunStore] = None
+
+
+def get_run_store() -> RunStore:
+    """Общий RunStore процесса (путь — LIGHTHOUSE_RUN_STORE или Reports/reports_lighthouse/run_store.sqlite3)."""
+    global _default_store
+    if _default_store is None:
+        _default_store = RunStore()
+    return _default_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальное хранилище прогонов Lighthouse")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    trend_parser = sub.add_parser("trend", help="Тренд p75-метрики роута")
+    trend_parser.add_argument("route")
+    trend_parser.add_argument("device", choices=["desktop", "mobile"])
+    trend_parser.add_argument("--metric", default="LCP", choices=AGGREGATE_METRICS)
+    trend_parser.add_argument("--source", default="cli", choices=["cli", "api", "crux"])
+    trend_parser.add_argument("--environment")
+    trend_parser.add_argument("--limit", type=int, default=30)
+
+    sub.add_parser("pending", help="Строки, не отправленные в Google Sheets")
+    sub.add_parser("replicate", help="Дослать pending-строки в Google Sheets")
+
+    reaggregate_parser = sub.add_parser("reaggregate", help="Пересчитать агрегаты по сохранённым итерациям")
+    reaggregate_parser.add_argument("--source", default="cli", choices=["cli", "api"])
+    reaggregate_parser.add_argument("--environment")
+    reaggregate_parser.add_argument("--since", help="Нижняя граница даты: YYYY.MM.DD")
+    reaggregate_parser.add_argument("--metric", default="LCP", choices=ITERATION_METRICS)
+
+    args = parser.parse_args()
+    store = get_run_store()
+
+    if args.command == "trend":
+        for point in store.trend(args.route, args.device, args.metric, args.source, args.environment, args.limit):
+            print(f"{point['created_at']}  {point['run_id']:<20} {point['environment']:<12} {point['value']:g}")
+    elif args.command == "reaggregate":
+        from services.lighthouse.processor_lighthouse import aggregate_batch
+
+        started = time.perf_counter()
+        batches = store.iteration_batches(args.source, args.environment, args.since)
+        aggregated = aggregate_batch(batches, extended=True)
+        elapsed = time.perf_counter() - started
+        for (run_id, environment, route, device), metrics in aggregated.items():
+            stats = metrics.get(args.metric)
+            if stats:
+                print(f"{run_id:<20} {environment:<12} {route:<20} {device:<8} "
+                      f"p75={stats['p75']:g} min={stats['min']:g} max={stats['max']:g} std={stats['std']:g}")
+        print(f"[INFO] Переагрегировано групп: {len(aggregated)} за {elapsed:.2f} с")
+    elif args.command == "pending":
+        for item in store.pending_rows():
+            print(f"#{item['id']:<6} {item['status']:<9} {item['worksheet']:<24} {item['row'].get('run_id')}")
+    else:
+        from dotenv import load_dotenv
+        from services.google.google_sheets_client import GoogleSheetsClient
+        from services.lighthouse.configs.config_lighthouse import LIGHTHOUSE_DIR, get_google_creds_path
+
+        load_dotenv(LIGHTHOUSE_DIR / "configs" / "config_lighthouse.env")
+        spreadsheet_id = os.getenv("GS_SHEET_ID")
+        if not spreadsheet_id:
+            raise SystemExit("[ERROR] GS_SHEET_ID не задан")
+        pending = store.pending_rows(limit=1)
+        if not pending:
+            print("[INFO] Нечего реплицировать.")
+            return
+        client = GoogleSheetsClient(str(get_google_creds_path()), spreadsheet_id, pending[0]["worksheet"])
+        print(f"[DONE] Отправлено строк: {store.replicate_pending(client)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Юнит-тесты AsyncPageSpeedClient на фейковой сессии (без сети)."""
+
+import threading
+import time
+
+import pytest
+
+from services.lighthouse import api_runner
+
+
+class _FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class _FakeSession:
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.requested.append(dict(params)["url"])
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+            if self.responses:
+                return self.responses.pop(0)
+        return _FakeResponse(200, {"lighthouseResult": {"requestedUrl": dict(params)["url"]}})
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client():
+    client = api_runner.AsyncPageSpeedClient(api_key="key", concurrency=3)
+    client.session = _FakeSession()
+    return client
+
+
+def test_run_many_keeps_order_and_bounds_concurrency(client):
+    urls = [f"https://example.com/{i}" for i in range(8)]
+
+    completed = []
+
+    results = client.run_many_sync(urls, strategy="desktop", on_result=lambda index, _: completed.append(index))
+
+    assert [r["requestedUrl"] for r in results] == urls
+    assert 1 < client.session.max_in_flight <= 3
+    assert sorted(completed) == list(range(8))
+
+
+def test_429_honours_retry_after(client, monkeypatch):
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(api_runner.asyncio, "sleep", fake_sleep)
+    client.session.responses = [_FakeResponse(429, headers={"Retry-After": "7"})]
+
+    result = client.run_many_sync(["https://example.com/"])[0]
+
+    assert result == {"requestedUrl": "https://example.com/"}
+    assert len(delays) == 1 and 7 <= delays[0] <= 7 * 1.3
+
+
+def test_non_retryable_error_returns_empty_result(client):
+    client.session.responses = [_FakeResponse(400)]
+
+    assert client.run_many_sync(["https://example.com/"]) == [{}]
+    assert len(client.session.requested) == 1
@@ -0,0 +1,104 @@
+"""Юнит-тесты дедлайна, отмены и пула итераций Lighthouse (вместо Lighthouse — спящий python или фейк)."""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.lighthouse import cli_runner
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+def test_hung_process_is_killed_on_timeout():
+    started = time.monotonic()
+    with pytest.raises(cli_runner.LighthouseTimeoutError):
+        cli_runner._run_with_deadline(SLEEPER, timeout=0.5)
+    assert time.monotonic() - started < 10
+
+
+def test_process_is_killed_on_cancel():
+    calls = []
+
+    def should_stop():
+        calls.append(time.monotonic())
+        return len(calls) >= 2
+
+    with pytest.raises(cli_runner.LighthouseCancelledError):
+        cli_runner._run_with_deadline(SLEEPER, timeout=60, should_stop=should_stop)
+    assert len(calls) == 2
+
+
+def test_finished_process_returns_output():
+    result = cli_runner._run_with_deadline([sys.executable, "-c", "print('ok')"], timeout=30, should_stop=lambda: False)
+    assert result.returncode == 0 and result.stdout.strip() == "ok"
+
+
+@pytest.fixture
+def fake_pool(monkeypatch, tmp_path):
+    """Пул потоков вместо процессов и фейковая итерация вместо Lighthouse."""
+    monkeypatch.setattr(cli_runner, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(cli_runner, "_worker_stop_event", None)
+    monkeypatch.setattr(cli_runner, "STOP_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(cli_runner, "check_lighthouse_environment", lambda: None)
+    monkeypatch.setattr(cli_runner, "get_temp_dir_for_route",
+                        lambda route_key, device, prefix, environment: str(tmp_path / route_key))
+    resolved = []
+    monkeypatch.setattr(cli_runner, "_resolve_device_settings",
+                        lambda device: resolved.append(device) or ("desktop", {}, {}, "simulate"))
+
+    state = {"calls": [], "active": 0, "peak": 0, "resolved": resolved, "duration": 0.05}
+    lock = threading.Lock()
+
+    def fake_iteration(route_key, route_url, report_file, device, iteration, device_settings,
+                       isolated_tmp_dir, lean_report, should_stop):
+        with lock:
+            state["calls"].append((route_key, iteration, device_settings))
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(state["duration"])
+        with lock:
+            state["active"] -= 1
+        return report_file
+
+    monkeypatch.setattr(cli_runner, "run_lighthouse_iteration", fake_iteration)
+    return state
+
+
+def test_parallel_units_cover_every_iteration_within_worker_limit(fake_pool):
+    finished = []
+    runs = cli_runner.run_local_lighthouse_parallel([("main", "https://a/"), ("models", "https://b/")],
+                                                    iteration_count=3, max_workers=2, on_iteration=finished.append)
+
+    assert sorted((route, it) for route, it, _ in fake_pool["calls"]) == [
+        ("main", 1), ("main", 2), ("main", 3), ("models", 1), ("models", 2), ("models", 3)]
+    assert fake_pool["peak"] <= 2 and len(finished) == 6
+    # Конфиг устройства разрешён один раз в родителе и передан в каждую итерацию
+    assert fake_pool["resolved"] == ["desktop"]
+    assert all(settings == ("desktop", {}, {}, "simulate") for _, _, settings in fake_pool["calls"])
+    assert [path.rsplit("_iter_", 1)[1] for path in runs["main"]["json_paths"]] == ["1.json", "2.json", "3.json"]
+    assert all(1 <= run["concurrency"] <= 2 for run in runs.values())
+
+
+def test_max_overlap_counts_peak_concurrency():
+    def unit(start, end):
+        return {"started_at": start, "ended_at": end}
+
+    sequential = [unit(0, 1), unit(1, 2), unit(2, 3)]
+    assert [cli_runner._max_overlap(u, sequential) for u in sequential] == [1, 1, 1]
+
+    long_run, short_a, short_b, late = unit(0, 10), unit(1, 3), unit(2, 4), unit(5, 6)
+    overlapping = [long_run, short_a, short_b, late]
+    assert [cli_runner._max_overlap(u, overlapping) for u in overlapping] == [3, 3, 3, 2]
+
+
+def test_should_stop_cancels_pending_units(fake_pool):
+    fake_pool["duration"] = 0.2
+    runs = cli_runner.run_local_lighthouse_parallel([("main", "https://a/")], iteration_count=6, max_workers=1,
+                                                    should_stop=lambda: bool(fake_pool["calls"]))
+
+    # Идущая итерация завершилась, пять ожидающих сняты до старта
+    assert len(fake_pool["calls"]) == 1
+    assert len(runs["main"]["json_paths"]) == 1
@@ -0,0 +1,65 @@
+"""Юнит-тесты снимка конфигурации base_urls.ini/routes.ini (без сети)."""
+
+import dataclasses
+import os
+
+import pytest
+
+from REST.base_client import ApiClientError, BaseApiClient
+from services.lighthouse.configs import config_lighthouse as cfg
+
+
+@pytest.fixture
+def ini_files(tmp_path):
+    base_urls = tmp_path / "base_urls.ini"
+    routes = tmp_path / "routes.ini"
+    base_urls.write_text(
+        "[environments]\ncurrent = VRP_TEST\n\n[VRP_TEST]\nbase_url = https://test.example\n\n"
+        "[VRP_PROD]\nBASE_URL = https://www.example\n", encoding="utf-8")
+    routes.write_text("[routes]\nmain = /\nmodels = /pornstars/\n", encoding="utf-8")
+    return base_urls, routes
+
+
+def _touch_later(path, text):
+    stat = os.stat(path)
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_snapshot_is_shared_until_files_change(ini_files):
+    base_urls, routes = ini_files
+    first = cfg.get_config(base_urls, routes)
+
+    assert cfg.get_config(base_urls, routes) is first
+    assert first.base_url() == "https://test.example"
+    assert first.base_url("VRP_PROD", key="BASE_URL") == "https://www.example"
+    assert first.route("models") == first.route("Models") == "/pornstars/"
+
+    _touch_later(routes, "[routes]\nmain = /\n")
+    reloaded = cfg.get_config(base_urls, routes)
+    assert reloaded is not first and list(reloaded.routes) == ["main"]
+    assert list(first.routes) == ["main", "models"]  # старый снимок не меняется
+
+    with pytest.raises(KeyError):
+        reloaded.route("models")
+
+
+def test_snapshot_is_immutable(ini_files):
+    snapshot = cfg.LighthouseConfig.load(*ini_files)
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.current_environment = "VRP_PROD"
+    with pytest.raises(TypeError):
+        snapshot.routes["main"] = "/other/"
+    with pytest.raises(TypeError):
+        snapshot.environments["VRP_TEST"]["base_url"] = "https://other.example"
+
+
+def test_api_client_uses_snapshot(ini_files):
+    base_urls, routes = ini_files
+    client = BaseApiClient(base_urls_path=base_urls, routes_path=routes)
+
+    assert client.config is cfg.get_config(base_urls, routes)
+    assert client.build_url("models") == client.build_url("MODELS") == "https://test.example/pornstars/"
+    with pytest.raises(ApiClientError):
+        BaseApiClient(environment="VRS_DEV", base_urls_path=base_urls, routes_path=routes)
@@ -0,0 +1,48 @@
+"""Юнит-тесты файлового кэша CrUX (без PageSpeed API)."""
+
+import pytest
+
+from services.lighthouse import crux_cache
+
+FIELD_DATA = {"overall_category": "FAST", "collectionPeriod": {"firstDate": "d1", "lastDate": "d28"}}
+
+
+@pytest.fixture
+def fetch_calls(tmp_path, monkeypatch):
+    monkeypatch.setattr(crux_cache, "CRUX_CACHE_PATH", tmp_path / "crux_cache.json")
+    monkeypatch.delenv("CRUX_CACHE_TTL", raising=False)
+    return []
+
+
+def _fetch(calls, data=FIELD_DATA):
+    def fetch():
+        calls.append(1)
+        return dict(data)
+    return fetch
+
+
+def test_hit_skips_fetch_and_keys_by_strategy(fetch_calls):
+    url = "https://vrporn.com/"
+
+    assert crux_cache.get_crux_data(url, "mobile", _fetch(fetch_calls)) == (FIELD_DATA, False)
+    assert crux_cache.get_crux_data(url.rstrip("/"), "mobile", _fetch(fetch_calls)) == (FIELD_DATA, True)
+    crux_cache.get_crux_data(url, "desktop", _fetch(fetch_calls))
+
+    assert len(fetch_calls) == 2
+    entry = crux_cache._cache().load()[crux_cache._cache_key(url, "mobile", "field")]
+    assert entry["collection_period"]["lastDate"] == "d28"
+
+
+def test_force_refresh_expiry_and_empty_response(fetch_calls, monkeypatch):
+    url = "https://vrporn.com/"
+    crux_cache.get_crux_data(url, "mobile", _fetch(fetch_calls, data={}))
+    crux_cache.get_crux_data(url, "mobile", _fetch(fetch_calls))
+    assert len(fetch_calls) == 2  # пустой ответ не кэшируется
+
+    crux_cache.get_crux_data(url, "mobile", _fetch(fetch_calls), force_refresh=True)
+    monkeypatch.setenv("CRUX_CACHE_TTL", "0")
+    crux_cache.get_crux_data(url, "mobile", _fetch(fetch_calls))
+    assert len(fetch_calls) == 4
+
+    crux_cache.invalidate_crux_cache(url)
+    assert crux_cache._cache().load() == {}
@@ -0,0 +1,119 @@
+"""Юнит-тесты JSON-lines протокола Lighthouse-воркера (вместо Lighthouse — stub-скрипт на Node)."""
+
+import json
+import os
+import shutil
+import sys
+import time
+
+import pytest
+
+from services.lighthouse.daemon_runner import LighthouseDaemonError, LighthouseDaemonRunner
+
+requires_node = pytest.mark.skipif(shutil.which("node") is None or sys.platform == "win32",
+                                   reason="нужен Node.js и POSIX-группы процессов")
+
+# Протокол как у scripts/lighthouse_daemon.js; дочерний процесс изображает Chrome
+STUB_DAEMON = r"""
+const {spawn} = require('child_process');
+const fs = require('fs');
+const readline = require('readline');
+
+const chrome = spawn(process.execPath, ['-e', 'setInterval(() => {}, 1000)'], {stdio: 'ignore'});
+const send = (payload) => process.stdout.write(JSON.stringify(payload) + '\n');
+
+process.stdout.write('not a protocol line\n');
+send({event: 'ready', chromePort: 9222, chromePid: chrome.pid});
+readline.createInterface({input: process.stdin}).on('line', (line) => {
+  const request = JSON.parse(line);
+  if (request.command === 'shutdown') {
+    chrome.kill();
+    send({id: request.id || null, ok: true});
+    process.exit(0);
+  }
+  if (request.url.endsWith('/hang')) {
+    return;
+  }
+  if (request.url.endsWith('/fail')) {
+    return send({id: request.id, ok: false, error: 'boom'});
+  }
+  fs.writeFileSync(request.outputPath, JSON.stringify({preset: request.preset, flags: request.flags}));
+  send({id: request.id, ok: true, outputPath: request.outputPath, runtimeError: null});
+});
+"""
+
+
+@pytest.fixture
+def stub_script(tmp_path):
+    script = tmp_path / "scripts" / "stub_daemon.js"
+    script.parent.mkdir()
+    script.write_text(STUB_DAEMON, encoding="utf-8")
+    return script
+
+
+def _is_alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"  # зомби уже мёртв
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+
+def _wait_dead(pid, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while _is_alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not _is_alive(pid)
+
+
+def _chrome_pid(runner, monkeypatch):
+    seen = {}
+    original = runner._wait_for
+
+    def wait_for(predicate, timeout):
+        message = original(predicate, timeout)
+        seen.setdefault("pid", message.get("chromePid"))
+        return message
+
+    monkeypatch.setattr(runner, "_wait_for", wait_for)
+    runner.start()
+    return seen["pid"]
+
+
+@requires_node
+def test_requests_and_shutdown_follow_json_lines_protocol(stub_script, tmp_path):
+    report = tmp_path / "report.json"
+    with LighthouseDaemonRunner(script_path=stub_script, startup_timeout=10, request_timeout=10) as runner:
+        preset, flags = LighthouseDaemonRunner.build_flags(
+            "desktop", ["performance"], user_agent="UA", device_settings=("desktop", None, None, "simulate"))
+
+        assert runner.run_iteration("https://example.test/", str(report), preset, flags) == str(report)
+        sent = json.loads(report.read_text(encoding="utf-8"))
+        assert sent["preset"] == "desktop"
+        assert sent["flags"]["extraHeaders"] == {"User-Agent": "UA"} and sent["flags"]["disableFullPageScreenshot"]
+
+        with pytest.raises(RuntimeError, match="boom"):
+            runner.run_iteration("https://example.test/fail", str(tmp_path / "fail.json"), preset, flags)
+        process = runner._process
+        assert runner.is_running
+
+    assert process.poll() == 0 and not runner.is_running
+
+
+@requires_node
+def test_hung_request_kills_worker_with_its_chrome(stub_script, tmp_path, monkeypatch):
+    runner = LighthouseDaemonRunner(script_path=stub_script, startup_timeout=10, request_timeout=1)
+    chrome_pid = _chrome_pid(runner, monkeypatch)
+    process = runner._process
+
+    with pytest.raises(LighthouseDaemonError, match="не ответил"):
+        runner.run_iteration("https://example.test/hang", str(tmp_path / "hang.json"), None, {})
+
+    assert process.poll() is not None and not runner.is_running
+    assert _wait_dead(chrome_pid)  # группа процессов убита целиком — Chrome не остаётся сиротой
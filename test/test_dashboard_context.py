@@ -0,0 +1,45 @@
+"""Юнит-тесты файлового TTL-кэша dashboard контекста (без Google Sheets)."""
+
+import pytest
+
+from services.lighthouse import dashboard_context
+
+
+@pytest.fixture
+def fetch_calls(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_fetch(project):
+        calls.append(project)
+        return {"active_sprint": f"S{len(calls)}", "rollout": {"PROD": True}, "has_any_rollout": True}
+
+    monkeypatch.setattr(dashboard_context, "DASHBOARD_CACHE_PATH", tmp_path / "dashboard_cache.json")
+    monkeypatch.setattr(dashboard_context, "_fetch_dashboard_context", fake_fetch)
+    monkeypatch.setenv("GS_SHEET_ID", "sheet")
+    monkeypatch.delenv("DASHBOARD_CONTEXT_TTL", raising=False)
+    return calls
+
+
+def test_context_is_fetched_once_within_ttl(fetch_calls):
+    first = dashboard_context.read_dashboard_context("VRP_PROD")
+    second = dashboard_context.read_dashboard_context("vrp_stage")
+
+    assert fetch_calls == ["VRP"]
+    assert first["active_sprint"] == second["active_sprint"] == "S1"
+    assert (first["environment"], second["environment"]) == ("PROD", "STAGE")
+
+
+def test_expired_or_invalidated_context_is_refetched(fetch_calls, monkeypatch):
+    dashboard_context.read_dashboard_context("VRP_PROD")
+    monkeypatch.setenv("DASHBOARD_CONTEXT_TTL", "0")
+    assert dashboard_context.read_dashboard_context("VRP_PROD")["active_sprint"] == "S2"
+
+    monkeypatch.delenv("DASHBOARD_CONTEXT_TTL")
+    dashboard_context.invalidate_dashboard_context("vrp")
+    assert dashboard_context.read_dashboard_context("VRP_PROD")["active_sprint"] == "S3"
+    assert fetch_calls == ["VRP", "VRP", "VRP"]
+
+
+def test_environment_without_project_skips_dashboard(fetch_calls):
+    assert dashboard_context.read_dashboard_context("PROD") == {}
+    assert fetch_calls == []
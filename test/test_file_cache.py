@@ -0,0 +1,48 @@
+"""Юнит-тесты общего TTL-кэша в JSON-файле (временная папка, без сети)."""
+
+import os
+import threading
+import time
+
+from services.lighthouse import file_cache
+from services.lighthouse.file_cache import TTLFileCache
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = TTLFileCache(tmp_path / "cache.json", ttl=60)
+    cache.put("a", {"data": 1})
+
+    assert cache.get("a")["data"] == 1 and cache.get("b") is None
+    assert TTLFileCache(cache.path, ttl=0).get("a") is None
+    cache.update(lambda entries: {})
+    assert cache.load() == {}
+
+
+def test_concurrent_writers_do_not_lose_keys(tmp_path):
+    path = tmp_path / "cache.json"
+    barrier = threading.Barrier(8)
+
+    def writer(index):
+        cache = TTLFileCache(path, ttl=60)  # как отдельный процесс: своё состояние, общий файл
+        barrier.wait()
+        for round_ in range(5):
+            cache.put(f"{index}-{round_}", {"data": index})
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(TTLFileCache(path, ttl=60).load()) == 40
+    assert not os.path.exists(f"{path}.lock")
+
+
+def test_stale_lock_of_dead_writer_is_taken_over(tmp_path):
+    cache = TTLFileCache(tmp_path / "cache.json", ttl=60)
+    cache.lock_path.write_text("12345")
+    stale = time.time() - file_cache.LOCK_STALE_SECONDS - 1
+    os.utime(cache.lock_path, (stale, stale))
+
+    cache.put("a", {"data": 1})
+    assert cache.get("a")["data"] == 1
@@ -0,0 +1,179 @@
+"""Юнит-тесты GoogleSheetsClient на фейковой таблице (без сети)."""
+
+import pytest
+from gspread.exceptions import APIError, WorksheetNotFound
+
+from services.google import google_sheets_client as gsc
+
+
+class _FakeResponse:
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        self.text = message
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text}}
+
+    def __bool__(self):  # как requests.Response: ложен для 4xx/5xx
+        return self.status_code < 400
+
+
+class _FakeWorksheet:
+    def __init__(self, title, sheet_id, fail_updates=0):
+        self.title = title
+        self.id = sheet_id
+        self.fail_updates = fail_updates
+        self.headers = None
+
+    def update(self, cells, values):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise APIError(_FakeResponse(503, "backend error"))
+        self.headers = values[0]
+
+
+class _FakeSpreadsheet:
+    def __init__(self, titles):
+        self.sheets = {title: _FakeWorksheet(title, i) for i, title in enumerate(titles)}
+        self.calls = []
+        self.updates = []
+        self.fail_header_updates = 0
+        self.created_elsewhere = set()
+
+    def worksheets(self):
+        self.calls.append("worksheets")
+        return list(self.sheets.values())
+
+    def values_batch_get(self, ranges):
+        self.calls.append("values_batch_get")
+        value_ranges = []
+        for a1 in ranges:
+            if a1.endswith("!1:1"):
+                value_ranges.append({"values": [["date", "page", "LCP"]]})
+            else:
+                value_ranges.append({"values": [["h"], [""], [""], ["row"]]})
+        return {"valueRanges": value_ranges}
+
+    def values_batch_update(self, body):
+        self.calls.append("values_batch_update")
+        self.updates.append(body)
+
+    def duplicate_sheet(self, source_sheet_id, new_sheet_name):
+        self.calls.append("duplicate_sheet")
+        self.sheets[new_sheet_name] = _FakeWorksheet(new_sheet_name, len(self.sheets))
+        return self.sheets[new_sheet_name]
+
+    def add_worksheet(self, title, rows, cols):
+        self.calls.append("add_worksheet")
+        if title in self.created_elsewhere:  # другой процесс успел создать лист после чтения реестра
+            self.sheets[title] = _FakeWorksheet(title, len(self.sheets))
+        if title in self.sheets:
+            raise APIError(_FakeResponse(400, f'A sheet with the name "{title}" already exists.'))
+        self.sheets[title] = _FakeWorksheet(title, len(self.sheets), fail_updates=self.fail_header_updates)
+        return self.sheets[title]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(gsc, "_sheets_rate_limit", lambda cost=1.0: None)
+    client = gsc.GoogleSheetsClient.__new__(gsc.GoogleSheetsClient)
+    client.api_calls = 0
+    client._worksheets = None
+    client.duplicated_sheets = {}
+    client.spreadsheet_id = "sheet"
+    client.worksheet_name = "VRP [PROD] CLI"
+    client._buffers = {}
+    client._fallback_flags = {}
+    client._sheet_headers = {}
+    client._next_rows = {}
+    client.spreadsheet = _FakeSpreadsheet(["_CLI_Template", "VRP [PROD] CLI"])
+    return client
+
+
+def test_ensure_sheet_exists_reads_worksheet_list_once(client):
+    for _ in range(40):
+        client.ensure_sheet_exists("VRP [PROD] CLI", source="cli")
+
+    assert client.spreadsheet.calls == ["worksheets"]
+    assert client.api_calls == 1
+    assert client.sheet.title == "VRP [PROD] CLI"
+
+
+def test_missing_sheet_is_duplicated_from_template_and_registered(client):
+    client.ensure_sheet_exists("VRP [STAGE] CLI", source="cli")
+    client.ensure_sheet_exists("VRP [STAGE] CLI", source="cli")
+
+    # первый worksheets() — реестр, второй — повторная проверка перед созданием
+    assert client.spreadsheet.calls == ["worksheets", "worksheets", "duplicate_sheet"]
+    assert client.duplicated_sheets == {"VRP [STAGE] CLI": "_CLI_Template"}
+    assert client.sheet.title == "VRP [STAGE] CLI"
+
+
+def test_retry_after_header_failure_does_not_recreate_sheet(client, monkeypatch):
+    monkeypatch.setattr(gsc.time, "sleep", lambda seconds: None)
+    client.spreadsheet.fail_header_updates = 1
+
+    client.ensure_sheet_exists("VRP [STAGE] CRUX", source="crux")
+
+    assert client.spreadsheet.calls.count("add_worksheet") == 1
+    assert client.sheet.headers == gsc.GoogleSheetsClient.DEFAULT_HEADERS["crux"]
+
+
+def test_sheet_created_concurrently_is_taken_from_registry(client):
+    client.spreadsheet.created_elsewhere = {"VRP [STAGE] CRUX", "Regressions"}
+
+    client.ensure_sheet_exists("VRP [STAGE] CRUX", source="crux")
+    assert client.sheet is client.spreadsheet.sheets["VRP [STAGE] CRUX"]
+    assert client.ensure_plain_sheet("Regressions") is client.spreadsheet.sheets["Regressions"]
+    assert client.spreadsheet.calls.count("add_worksheet") == 2
+
+
+def test_invalidated_registry_is_reloaded(client):
+    client.ensure_sheet_exists("VRP [PROD] CLI", source="cli")
+    del client.spreadsheet.sheets["VRP [PROD] CLI"]
+    client.invalidate_worksheets()
+
+    with pytest.raises(WorksheetNotFound):
+        client._get_worksheet("VRP [PROD] CLI")
+    assert client.spreadsheet.calls.count("worksheets") == 3
+
+
+def test_flush_writes_all_worksheets_with_two_calls(client):
+    for sheet in ("VRP [PROD] CLI", "VRP [PROD] API", "CrUX"):
+        for route in ("main", "home"):
+            client.append_result({"date": "d", "page": route, "LCP": 2000}, worksheet_name=sheet)
+    client.append_result({"date": "d", "page": "main", "LCP": 2100, "concurrency": 2})
+
+    client.flush()
+
+    assert client.spreadsheet.calls == ["values_batch_get", "values_batch_update"]
+    data = {item["range"]: item["values"] for item in client.spreadsheet.updates[0]["data"]}
+    assert data["'VRP [PROD] CLI'!A1"] == [["date", "page", "LCP", "concurrency"]]
+    assert data["'VRP [PROD] CLI'!A5"][-1] == ["d", "main", 2100, 2]
+    assert data["'CrUX'!A5"] == [["d", "main", 2000], ["d", "home", 2000]]
+
+    # Заголовки и позиции закэшированы — следующий flush без чтения
+    client.append_result({"date": "d", "page": "main", "LCP": 1900}, worksheet_name="CrUX")
+    client.flush()
+    assert client.spreadsheet.calls[2:] == ["values_batch_update"]
+    assert client.spreadsheet.updates[1]["data"][0]["range"] == "'CrUX'!A7"
+
+
+def test_dashboard_context_ranges_escape_sheet_name(monkeypatch):
+    spreadsheet = _FakeSpreadsheet([])
+    requested = []
+
+    def values_batch_get(ranges):
+        requested.extend(ranges)
+        return {"valueRanges": [{"values": [["S42"]]}, {}, {"values": [["FALSE", "TRUE"]]}]}
+
+    spreadsheet.values_batch_get = values_batch_get
+    monkeypatch.setattr(gsc, "_sheets_rate_limit", lambda cost=1.0: None)
+    monkeypatch.setattr(gsc.Credentials, "from_service_account_file", lambda path, scopes: None)
+    monkeypatch.setattr(gsc.gspread, "authorize",
+                        lambda credentials: type("Client", (), {"open_by_key": lambda self, key: spreadsheet})())
+
+    context = gsc.GoogleSheetsClient.read_dashboard_sprint_context("creds.json", "sheet", "O'HARA")
+
+    assert requested == ["'Dashboard [O''HARA]'!E5", "'Dashboard [O''HARA]'!E6", "'Dashboard [O''HARA]'!D9:G9"]
+    assert context["active_sprint"] == "S42" and context["rollout"]["TEST"] and context["has_any_rollout"]
@@ -0,0 +1,138 @@
+"""Юнит-тесты инкрементальных helper-листов Runs/Routes/Stability (фейковый Sheets-клиент, без сети)."""
+
+import re
+import threading
+
+import pytest
+
+from services.lighthouse import helper_sheets as hs
+
+RAW_HEADERS = ["date", "run_id", "environment", "page", "device", "type", "P", "LCP", "INP", "CLS", "TTFB"]
+
+
+class FakeSheetsClient:
+    """Таблица в памяти с интерфейсом GoogleSheetsClient, который нужен helper_sheets."""
+
+    def __init__(self, sheets):
+        self.sheets = {name: [list(row) for row in rows] for name, rows in sheets.items()}
+        self.writes = []
+
+    @classmethod
+    def a1_range(cls, sheet_name, cells=None):
+        return f"'{sheet_name}'!{cells}" if cells else f"'{sheet_name}'"
+
+    def sheet_titles(self):
+        return list(self.sheets)
+
+    def ensure_plain_sheet(self, sheet_name):
+        self.sheets.setdefault(sheet_name, [])
+
+    def read_values(self, ranges):
+        result = []
+        for a1 in ranges:
+            name, cells = re.match(r"^'(.+)'!(.+)$", a1).groups()
+            rows = self.sheets[name]
+            if cells == "1:1":
+                result.append(rows[:1])
+            else:
+                start = int(re.match(r"A(\d+):ZZ", cells).group(1))
+                result.append(rows[start - 1:])
+        return result
+
+    def write_values(self, data, clear=None):
+        for a1 in clear or []:
+            self.sheets[a1.strip("'")] = []
+        for item in data:
+            name, row = re.match(r"^'(.+)'!A(\d+)$", item["range"]).groups()
+            rows = self.sheets[name]
+            for offset, values in enumerate(item["values"]):
+                index = int(row) - 1 + offset
+                rows.extend([] for _ in range(index + 1 - len(rows)))
+                rows[index] = list(values)
+        self.writes.append(data)
+
+
+def _raw(run_id, page, device, score, lcp, cls):
+    return ["2026.10.12", run_id, "VRP_PROD", page, device, "CLI {3}", score, lcp, 150, cls, "0,4"]
+
+
+def _without_marker(rows):
+    return [row[:-1] for row in rows]
+
+
+@pytest.fixture
+def state(tmp_path):
+    return hs.HelperSheetsState(tmp_path / "run_store.sqlite3")
+
+
+def test_normalization_and_rounding_follow_apps_script():
+    record = dict(zip([hs._normalize_header(h) for h in RAW_HEADERS], _raw("r1", "models", "mobile", 90, 2.5, 0.1)))
+    row = hs.normalize_raw_record(record, "VRP [PROD]")
+
+    assert (row["project"], row["environment"], row["source"], row["iterations"]) == ("VRP", "PROD", "CLI", 3)
+    assert (row["lcp"], row["ttfb"], row["type"]) == (2500.0, 400.0, "model")  # секунды -> мс
+    assert hs._parse_number("1 234,5 ms") == 1234.5 and hs._parse_number(True) is None
+    assert hs._js_round(2.5, 0) == 3 and hs._js_round(-2.5, 0) == -2 and hs._js_round(0.0625, 3) == 0.063
+    assert hs._is_header_row({"run_id": "Run ID", "date": "date", "page": "x"})
+
+
+def test_incremental_sync_matches_full_rebuild(state, tmp_path):
+    first = [_raw("r1", "main", "desktop", 90, 2000, 0.01), _raw("r1", "models", "desktop", 80, 2500, 0.02)]
+    client = FakeSheetsClient({"VRP [PROD]": [RAW_HEADERS] + first})
+
+    stats = hs.sync_helper_sheets(client, state)
+    assert stats["rows"] == 2 and sorted(stats["rewritten"]) == sorted(hs.HELPER_HEADERS)
+    assert client.sheets["Runs"][0] == hs.RUNS_HEADERS + [hs.SYNC_MARKER]
+    assert client.sheets["Runs"][1][:13] == [
+        "2026.10.12", "VRP", "PROD", "CLI", "", "r1", "", 3, 2, 85, 2250, 150, 0.015]
+
+    # Новые строки: второй прогон по main + строка-заголовок из мульти-строчной шапки
+    second = [RAW_HEADERS, _raw("r2", "main", "desktop", 70, 2400, 0.05)]
+    client.sheets["VRP [PROD]"].extend(second)
+    stats = hs.sync_helper_sheets(client, state)
+    assert stats == {"rows": 1, "groups": 3, "written": 3, "rewritten": []}
+    assert [len(item["values"]) for item in client.writes[-1]] == [1, 1, 1]  # только затронутые строки
+
+    assert hs.sync_helper_sheets(client, state)["written"] == 0
+
+    rebuilt = FakeSheetsClient({"VRP [PROD]": [RAW_HEADERS] + first + second})
+    hs.sync_helper_sheets(rebuilt, hs.HelperSheetsState(tmp_path / "fresh.sqlite3"))
+    for sheet in hs.HELPER_HEADERS:
+        assert _without_marker(client.sheets[sheet]) == _without_marker(rebuilt.sheets[sheet])
+    assert client.sheets["Stability"][1][5:9] == [200, 0, 0.02, 96]
+
+    # Лист пересобран в Apps Script (нет метки) — переписывается целиком из состояния
+    client.sheets["Routes"] = [hs.ROUTES_HEADERS]
+    assert hs.sync_helper_sheets(client, state)["rewritten"] == ["Routes"]
+    assert _without_marker(client.sheets["Routes"]) == _without_marker(rebuilt.sheets["Routes"])
+
+
+def test_concurrent_syncs_count_each_raw_row_once(tmp_path):
+    raw = [RAW_HEADERS] + [_raw(f"r{i % 3}", "main", "desktop", 80 + i, 2000 + 10 * i, 0.01) for i in range(12)]
+    sheets = {"VRP [PROD]": raw}
+    path = tmp_path / "run_store.sqlite3"
+    clients = [FakeSheetsClient(sheets) for _ in range(2)]
+    for client in clients:
+        client.sheets = sheets  # одна таблица на оба процесса
+    barrier = threading.Barrier(2)
+
+    def sync(client):
+        barrier.wait()
+        hs.sync_helper_sheets(client, hs.HelperSheetsState(path))
+
+    threads = [threading.Thread(target=sync, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rebuilt = FakeSheetsClient({"VRP [PROD]": raw})
+    hs.sync_helper_sheets(rebuilt, hs.HelperSheetsState(tmp_path / "fresh.sqlite3"))
+    for sheet in hs.HELPER_HEADERS:
+        assert _without_marker(sheets[sheet]) == _without_marker(rebuilt.sheets[sheet])
+
+    # Аренда истекла посреди синхронизации: строки ниже отметки, перечитанной в транзакции, не учитываются
+    state = hs.HelperSheetsState(path)
+    row = hs.normalize_raw_record(dict(zip([hs._normalize_header(h) for h in RAW_HEADERS], raw[1])), "VRP [PROD]")
+    assert state.ingest([("VRP [PROD]", 2, row)], {"VRP [PROD]": 3}) == (0, 0)
+    assert state.next_rows() == {"VRP [PROD]": len(raw) + 1}
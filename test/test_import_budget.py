@@ -0,0 +1,29 @@
+"""Точки входа заданий не тянут тяжёлые модули при импорте (см. scripts/bench_importtime.py)."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ("pytest", "gspread", "google.auth", "numpy", "requests")
+
+
+def _loaded_modules(code: str) -> set:
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}; import sys; print('\\n'.join(sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize("code", [
+    "import services.lighthouse.pagespeed_service",
+    "import sys; sys.argv.append('--execute-job'); import services.lighthouse.mcp_server",
+])
+def test_job_entrypoints_import_lazily(code):
+    loaded = _loaded_modules(code)
+    assert not loaded & set(HEAVY_MODULES)
+    assert "mcp" not in loaded
@@ -0,0 +1,130 @@
+"""Юнит-тесты планировщика заданий MCP (фейковые процессы, без запуска Lighthouse)."""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from services.lighthouse.job_scheduler import SCHEDULER_LEASE, JobScheduler, job_slots, job_weight
+from services.lighthouse.job_store import JOB_CLAIMED, JOB_DONE, JOB_ERROR, JOB_QUEUED, JOB_RUNNING, JobStore
+
+
+class _FakeProcess:
+    def __init__(self):
+        self.returncode = None
+        self.pid = os.getpid()  # живой процесс
+
+    def poll(self):
+        return self.returncode
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / "jobs.sqlite3", legacy_json=None)
+
+
+@pytest.fixture
+def spawned():
+    return {}
+
+
+@pytest.fixture
+def scheduler(store, spawned):
+    def spawn(job_id):
+        spawned[job_id] = _FakeProcess()
+        return spawned[job_id]
+
+    return JobScheduler(store, spawn, slots={"lighthouse_cli": 2, "lighthouse_api": 1}, idle_exit=0)
+
+
+def test_slots_priority_and_fifo(store, scheduler, spawned):
+    cli = [store.create("lighthouse_cli", {"max_workers": 1}) for _ in range(3)]
+    urgent = store.create("lighthouse_cli", {"max_workers": 1}, priority=5)
+    api = [store.create("lighthouse_api", {}) for _ in range(2)]
+
+    assert scheduler.tick() == 3
+    assert list(spawned) == [urgent, cli[0], api[0]]
+    assert store.get(cli[1])["status"] == JOB_QUEUED
+
+    # Задание завершилось — слот освобождается для следующего по FIFO
+    store.update(urgent, status=JOB_DONE)
+    spawned[urgent].returncode = 0
+    assert scheduler.tick() == 1
+    assert list(spawned)[-1] == cli[1]
+    assert store.get(api[1])["status"] == JOB_QUEUED
+
+
+def test_heavy_job_is_not_overtaken(store, scheduler, spawned):
+    first = store.create("lighthouse_cli", {"max_workers": 1})
+    heavy = store.create("lighthouse_cli", {"max_workers": 2})
+    light = store.create("lighthouse_cli", {"max_workers": 1})
+
+    scheduler.tick()
+    assert list(spawned) == [first]
+
+    store.update(first, status=JOB_DONE)
+    spawned[first].returncode = 0
+    scheduler.tick()
+    assert list(spawned) == [first, heavy]
+    assert store.get(light)["status"] == JOB_QUEUED
+
+
+def test_dead_process_releases_slot_with_error(store, scheduler, spawned):
+    job_id = store.create("lighthouse_api", {})
+    scheduler.tick()
+    assert store.get(job_id)["status"] == JOB_CLAIMED
+
+    spawned[job_id].returncode = 1
+    scheduler.tick()
+
+    job = store.get(job_id)
+    assert job["status"] == JOB_ERROR and "кодом 1" in job["error"]
+    assert "lighthouse_api" not in store.queue_stats()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="проверка pid только на POSIX")
+def test_job_orphaned_by_dead_scheduler_is_failed_on_next_claim(store, spawned):
+    slots = {"lighthouse_cli": 1}
+    orphan = store.create("lighthouse_cli", {})
+    waiting = store.create("lighthouse_cli", {})
+    JobScheduler(store, lambda job_id: _FakeProcess(), slots=slots).tick()
+    # Процесс задания успел стартовать и был убит (OOM/SIGKILL), а его планировщик перезапущен
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    store.transition(orphan, [JOB_CLAIMED], JOB_RUNNING, started_at=time.time(), pid=dead.pid)
+    store.request_cancel(orphan)  # до процесса отмена уже не дойдёт
+
+    def spawn(job_id):
+        spawned[job_id] = _FakeProcess()
+        return spawned[job_id]
+
+    restarted = JobScheduler(store, spawn, slots=slots, idle_exit=0)
+    assert restarted.tick() == 1 and list(spawned) == [waiting]
+
+    job = store.get(orphan)
+    assert job["status"] == JOB_ERROR and f"pid {dead.pid}" in job["error"]
+    stats = store.queue_stats()["lighthouse_cli"]
+    assert stats["queued"] == 0 and stats["active"] == 1
+
+    store.update(waiting, status=JOB_DONE)
+    spawned[waiting].returncode = 0
+    restarted.tick()
+    assert not restarted._has_work()  # планировщик может завершиться по простою
+
+
+def test_single_scheduler_lease_and_idle_exit(store, scheduler):
+    assert store.acquire_lease(SCHEDULER_LEASE, owner=-1, ttl=60)
+    assert scheduler.run() == 1
+
+    store.release_lease(SCHEDULER_LEASE, owner=-1)
+    assert scheduler.run() == 0  # пустая очередь, idle_exit=0
+    assert not store.lease_alive(SCHEDULER_LEASE, ttl=60)
+
+
+def test_slot_config(monkeypatch):
+    monkeypatch.setenv("MCP_SLOTS_LIGHTHOUSE_CLI", "3")
+    assert job_slots()["lighthouse_cli"] == 3
+    assert job_weight({"kind": "lighthouse_cli", "payload": {"max_workers": 4}}) == 4
+    assert job_weight({"kind": "crux", "payload": {}}) == 1
@@ -0,0 +1,179 @@
+"""Юнит-тесты SQLite-очереди заданий MCP (без запуска заданий)."""
+
+import json
+import threading
+import time
+
+import pytest
+
+from services.lighthouse import job_store
+from services.lighthouse.job_store import (
+    JOB_CANCELLED, JOB_DONE, JOB_ERROR, JOB_QUEUED, JOB_RUNNING, JobCancellation, JobStore, payload_fingerprint,
+    progress_estimate,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / "jobs.sqlite3", legacy_json=None)
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / "mcp_jobs.json"
+    legacy.write_text(json.dumps({
+        "a1": {"kind": "crux", "payload": {"routes": ["main"]}, "status": "done", "created_at": 1.0,
+               "result": "ok"},
+        "b2": {"kind": "lighthouse_cli", "payload": {}, "status": "queued", "created_at": 2.0},
+    }), encoding="utf-8")
+
+    store = JobStore(tmp_path / "jobs.sqlite3", legacy_json=legacy)
+    JobStore(tmp_path / "jobs.sqlite3", legacy_json=legacy)
+
+    assert [job["job_id"] for job in store.list()] == ["a1", "b2"]
+    assert store.get("a1")["payload"] == {"routes": ["main"]}
+    assert not legacy.exists() and (tmp_path / "mcp_jobs.json.migrated").exists()
+
+
+def test_transition_is_atomic(store):
+    job_id = store.create("crux", {"routes": ["main"]})
+
+    assert store.transition(job_id, [JOB_QUEUED], JOB_RUNNING, started_at=time.time())
+    assert not store.transition(job_id, [JOB_QUEUED], JOB_RUNNING)
+    assert store.list(statuses=[JOB_RUNNING])[0]["job_id"] == job_id
+    with pytest.raises(ValueError):
+        store.update(job_id, kind="other")
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    job_ids = [JobStore(path, legacy_json=None).create("lighthouse_cli", {"i": i}) for i in range(20)]
+
+    def finish(job_id):
+        JobStore(path, legacy_json=None).update(job_id, status=JOB_DONE, ended_at=time.time(), result=job_id)
+
+    threads = [threading.Thread(target=finish, args=(job_id,)) for job_id in job_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    jobs = JobStore(path, legacy_json=None).list()
+    assert all(job["status"] == JOB_DONE and job["result"] == job["job_id"] for job in jobs)
+
+
+def test_prune_keeps_active_and_recent_history(store):
+    old = store.create("crux", {})
+    store.update(old, status=JOB_ERROR, ended_at=time.time() - 3600)
+    finished = [store.create("crux", {}) for _ in range(3)]
+    for job_id in finished:
+        store.update(job_id, status=JOB_DONE, ended_at=time.time())
+    active = store.create("crux", {})
+
+    assert store.prune(ttl_seconds=60, max_history=2) == 2
+    assert [job["job_id"] for job in store.list()] == finished[1:] + [active]
+
+
+def test_identical_requests_attach_and_reuse_fresh_result(store):
+    payload = {"routes": ["main", "home"], "device": "desktop", "iterations": 5}
+    fingerprint = payload_fingerprint("lighthouse_cli", payload)
+    assert fingerprint == payload_fingerprint("lighthouse_cli", {**payload, "routes": ["home", "main"]})
+
+    first, created = store.create_or_attach("lighthouse_cli", payload, fingerprint, reuse_seconds=60)
+    again, created_again = store.create_or_attach("lighthouse_cli", payload, fingerprint, reuse_seconds=60, priority=3)
+    assert created and not created_again
+    assert again["job_id"] == first["job_id"] and again["attached"] == 1 and again["priority"] == 3
+
+    store.update(first["job_id"], status=JOB_DONE, ended_at=time.time() - 30, result="ok")
+    reused, created = store.create_or_attach("lighthouse_cli", payload, fingerprint, reuse_seconds=60)
+    assert not created and reused["result"] == "ok"
+
+    fresh, created = store.create_or_attach("lighthouse_cli", payload, fingerprint, reuse_seconds=10)
+    assert created and fresh["job_id"] != first["job_id"]
+
+
+def test_failed_job_is_not_reused(store):
+    fingerprint = payload_fingerprint("crux", {"routes": ["main"]})
+    job, _ = store.create_or_attach("crux", {"routes": ["main"]}, fingerprint, reuse_seconds=60)
+    store.update(job["job_id"], status=JOB_ERROR, ended_at=time.time())
+
+    _, created = store.create_or_attach("crux", {"routes": ["main"]}, fingerprint, reuse_seconds=60)
+    assert created
+
+
+def test_progress_events_update_summary(store):
+    job_id = store.create("lighthouse_cli", {"routes": ["main", "home"]})
+    store.record_progress(job_id, "started", total=4)
+    store.record_progress(job_id, "started", "main", total=2)
+    store.record_progress(job_id, "iteration", "main", done=1, total=2)
+    store.record_progress(job_id, "iteration", "main", done=2, total=2)
+    store.record_progress(job_id, "aggregated", "main", detail="итераций: 2")
+    store.record_progress(job_id, "failed", "home", total=2, detail="site unavailable")
+
+    progress = store.get(job_id)["progress"]
+    assert progress["routes"]["main"] == {"status": "aggregated", "done": 2, "total": 2, "detail": "итераций: 2"}
+    assert progress["routes"]["home"]["status"] == "failed"
+    assert progress_estimate(progress)["percent"] == 100.0
+
+    events = store.events(job_id)
+    assert [event["event"] for event in events][:2] == ["started", "started"]
+    assert [event["event"] for event in store.events(job_id, after_id=events[-2]["id"])] == ["failed"]
+    with pytest.raises(ValueError):
+        store.record_progress(job_id, "unknown")
+
+    store.reset_progress(job_id)
+    assert store.get(job_id)["progress"] is None and store.events(job_id) == []
+
+
+def test_progress_estimate_uses_observed_iteration_latency():
+    progress = {
+        "started_at": 100.0, "total": 10, "last_iteration_at": 140.0,
+        "routes": {"main": {"status": "running", "done": 4, "total": 10, "detail": None}},
+    }
+
+    estimate = progress_estimate(progress, now=145.0)
+
+    assert estimate["percent"] == 40.0 and estimate["iteration_seconds"] == 10.0
+    assert estimate["eta_seconds"] == 55  # 6 итераций по 10с минус 5с с последней итерации
+    assert progress_estimate(None)["percent"] is None
+
+
+def test_cancel_queued_and_running_jobs(store):
+    queued = store.create("crux", {})
+    assert store.request_cancel(queued) == JOB_CANCELLED
+    assert store.get(queued)["status"] == JOB_CANCELLED
+    assert store.request_cancel("missing") is None
+
+    running = store.create("lighthouse_cli", {})
+    store.transition(running, [JOB_QUEUED], JOB_RUNNING, started_at=time.time())
+    should_stop = JobCancellation(store, running, poll_interval=0)
+    assert not should_stop()
+
+    assert store.request_cancel(running) == JOB_RUNNING
+    assert should_stop() and should_stop.reason == "cancelled"
+    assert store.get(running)["status"] == JOB_RUNNING  # статус меняет сам процесс задания
+
+
+def test_deadline_stops_job_without_polling(store):
+    job_id = store.create("lighthouse_api", {})
+    should_stop = JobCancellation(store, job_id, deadline=time.time() - 1, poll_interval=3600)
+    assert should_stop() and should_stop.reason == "timeout"
+
+
+def test_stale_heartbeat_and_expired_deadline_free_slots(store):
+    now = time.time()
+    silent = store.create("lighthouse_cli", {})
+    expired = store.create("lighthouse_cli", {})
+    alive = store.create("lighthouse_api", {})
+    store.transition(silent, [JOB_QUEUED], JOB_RUNNING, started_at=now - 7200,
+                     heartbeat=now - job_store.JOB_HEARTBEAT_TTL - 1)
+    store.transition(expired, [JOB_QUEUED], JOB_RUNNING, started_at=now - 7200, heartbeat=now,
+                     deadline=now - job_store.DEADLINE_GRACE - 1)
+    store.transition(alive, [JOB_QUEUED], JOB_RUNNING, started_at=now - 7200, deadline=now + 60)
+    should_stop = JobCancellation(store, alive, poll_interval=0)
+    assert not should_stop()  # опрос отмены продлевает heartbeat
+    queued = store.create("lighthouse_cli", {})
+
+    assert store.claim_next({"lighthouse_cli": 1, "lighthouse_api": 1})["job_id"] == queued
+    assert store.get(silent)["status"] == JOB_ERROR and "признаков жизни" in store.get(silent)["error"]
+    assert store.get(expired)["status"] == JOB_ERROR and "Дедлайн" in store.get(expired)["error"]
+    assert store.get(alive)["status"] == JOB_RUNNING
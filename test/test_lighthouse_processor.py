@@ -0,0 +1,162 @@
+"""Юнит-тесты обработки результатов Lighthouse (без сети и Google Sheets)."""
+
+import json
+
+import pytest
+
+from services.lighthouse import processor_lighthouse as processor
+
+
+def _results(lcp_values, tbt_values):
+    return [{"P": 90, "LCP": lcp, "TBT": tbt} for lcp, tbt in zip(lcp_values, tbt_values)]
+
+
+def test_bootstrap_ci_width_needs_three_values():
+    assert processor.bootstrap_p75_ci_width([1200, 1300]) is None
+
+
+def test_bootstrap_ci_width_zero_for_constant_values():
+    assert processor.bootstrap_p75_ci_width([1500] * 6) == pytest.approx(0.0)
+
+
+def test_stable_route_converges():
+    results = _results([2000, 2010, 1995, 2005, 2002], [150, 152, 149, 151, 150])
+    assert processor.is_p75_converged(results, threshold=0.1)
+
+
+def test_noisy_route_does_not_converge():
+    results = _results([1500, 4200, 1800, 5200, 2100], [100, 900, 150, 1200, 300])
+    assert not processor.is_p75_converged(results, threshold=0.1)
+
+
+def test_zero_tbt_does_not_block_convergence():
+    results = _results([2000, 2010, 1995, 2005, 2002], [0, 0, 0, 0, 0])
+    assert processor.is_p75_converged(results, threshold=0.1)
+
+
+def _lighthouse_report(score=0.74, with_inp=False):
+    audits = {
+        "largest-contentful-paint": {"id": "largest-contentful-paint", "title": "LCP", "numericValue": 2412.7,
+                                     "details": {"type": "debugdata", "numericValue": 1}},
+        "first-contentful-paint": {"id": "first-contentful-paint", "numericValue": 1123.4},
+        "total-blocking-time": {"id": "total-blocking-time", "numericValue": 187.0},
+        "cumulative-layout-shift": {"id": "cumulative-layout-shift", "numericValue": 0.04213},
+        "speed-index": {"id": "speed-index", "numericValue": 2987.2},
+        "interactive": {"id": "interactive", "numericValue": 4120.9},
+        "server-response-time": {"id": "server-response-time", "numericValue": 312.5},
+        "max-potential-fid": {"id": "max-potential-fid", "numericValue": 96.0},
+        "final-screenshot": {"id": "final-screenshot", "details": {"data": "data:image/jpeg;base64," + "A" * 200_000}},
+    }
+    if with_inp:
+        audits["experimental-interaction-to-next-paint"] = {"id": "experimental-interaction-to-next-paint",
+                                                            "numericValue": 64.0}
+    return {
+        "audits": audits,
+        "categories": {"performance": {"title": "Performance", "auditRefs": [], "id": "performance", "score": score}},
+        "fullPageScreenshot": {"screenshot": {"data": "B" * 200_000}},
+    }
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("with_inp", [False, True])
+def test_stream_parser_matches_full_parse(tmp_path, indent, with_inp):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(_lighthouse_report(with_inp=with_inp), indent=indent), encoding="utf-8")
+
+    streamed = processor._stream_parse_lighthouse_results(str(path))
+    assert streamed is not None
+    assert streamed == processor._full_parse_lighthouse_results(str(path))
+    assert streamed["INP"] == (64 if with_inp else 96)
+
+
+def test_stream_parser_falls_back_on_unexpected_schema(tmp_path):
+    report = _lighthouse_report()
+    report["audits"]["speed-index"] = {"numericValue": 2987.2, "id": "speed-index"}  # id не первым ключом
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(report), encoding="utf-8")
+
+    assert processor._stream_parse_lighthouse_results(str(path)) is None
+    assert processor.parse_lighthouse_results(str(path))["SI"] == 2987
+
+
+def test_parse_returns_none_for_null_score(tmp_path):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(_lighthouse_report(score=None)), encoding="utf-8")
+    assert processor.parse_lighthouse_results(str(path)) is None
+
+
+def test_archived_reports_are_read_from_metrics_index(tmp_path):
+    report = tmp_path / "Report_CLI_main_1.json"
+    report.write_text(json.dumps(_lighthouse_report()), encoding="utf-8")
+    expected = processor.parse_lighthouse_results(str(report))
+
+    archived = processor.archive_reports([str(report)], [expected])
+
+    assert archived == [str(report) + ".gz"]
+    assert not report.exists()
+    index = json.loads((tmp_path / processor.METRICS_INDEX_NAME).read_text(encoding="utf-8"))
+    assert index == {"Report_CLI_main_1.json.gz": expected}
+    assert processor.parse_lighthouse_results(archived[0]) == expected
+
+
+def test_gzip_report_is_parsed_without_index(tmp_path):
+    report = tmp_path / "Report_CLI_main_1.json"
+    report.write_text(json.dumps(_lighthouse_report(with_inp=True)), encoding="utf-8")
+    expected = processor.parse_lighthouse_results(str(report))
+
+    archived = processor.archive_reports([str(report)], [None])
+
+    assert not (tmp_path / processor.METRICS_INDEX_NAME).read_text(encoding="utf-8").strip("{}\n ")
+    assert processor.parse_lighthouse_results(archived[0]) == expected
+
+
+def test_in_memory_metrics_match_file_parse_and_artifact(tmp_path):
+    report = _lighthouse_report(with_inp=True)
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    metrics = processor.extract_lighthouse_metrics(report)
+    assert metrics == processor.parse_lighthouse_results(str(path))
+    assert processor.extract_lighthouse_metrics(_lighthouse_report(score=None)) is None
+
+    artifact = processor.save_report_artifact(report, str(tmp_path / "Report_API_1.json"))
+    assert artifact.endswith("Report_API_1.json.gz")
+    assert processor.parse_lighthouse_results(artifact) == metrics
+
+
+def test_batch_aggregation_matches_per_route_path():
+    import random
+
+    rng = random.Random(7)
+    metrics = ("P", "LCP", "FCP", "TBT", "CLS", "SI", "TTI", "TTFB", "INP")
+    noise = (None, 0, -1, float("nan"), "n/a")
+    groups = {}
+    for g in range(60):
+        results = []
+        for _ in range(rng.randint(1, 12)):
+            if rng.random() < 0.1:
+                results.append(None)
+                continue
+            result = {m: rng.uniform(0.001, 0.5) if m == "CLS" else rng.randint(1, 6000) for m in metrics}
+            for m in rng.sample(metrics, 2):
+                result[m] = rng.choice(noise)
+            results.append(result)
+        groups[(f"route_{g}", rng.choice(["desktop", "mobile"]))] = results
+    groups[("empty", "desktop")] = [None, None]
+    groups[("no_tbt", "mobile")] = [{"LCP": 2000, "TBT": 0}, {"LCP": 2100, "TBT": 0}]
+
+    batch = processor.aggregate_batch(groups)
+
+    expected = {key: processor.aggregate_results(results) for key, results in groups.items()
+                if any(r is not None for r in results)}
+    assert batch == expected
+    assert [list(v) for v in batch.values()] == [list(v) for v in expected.values()]
+
+
+def test_batch_aggregation_extended_stats():
+    batch = processor.aggregate_batch({"main": [{"LCP": 1000, "CLS": 0.1}, {"LCP": 3000, "CLS": 0.3}]},
+                                      extended=True)
+
+    assert batch["main"]["LCP"] == {"p75": 2500.0, "p90": 2800.0, "min": 1000.0, "max": 3000.0,
+                                    "mean": 2000.0, "std": 1000.0}
+    assert batch["main"]["CLS"]["mean"] == 0.2
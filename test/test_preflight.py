@@ -0,0 +1,77 @@
+"""Юнит-тесты pre-flight проверки роутов (локальный HTTP-сервер, без внешней сети)."""
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.lighthouse.preflight import RoutePreflight
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, method):
+        self.requests_seen.append((method, self.path))
+        if self.path == "/no-head" and method == "HEAD":
+            status = 405
+        elif self.path == "/head-forbidden" and method == "HEAD":
+            status = 403  # WAF режет HEAD, GET проходит
+        else:
+            status = {"/": 200, "/no-head": 200, "/head-forbidden": 200, "/redirect": 302}.get(self.path, 404)
+        self.send_response(status)
+        if status == 302:
+            self.send_header("Location", "/")
+        self.send_header("Content-Length", "5")
+        self.end_headers()
+        if method == "GET":
+            self.wfile.write(b"hello")
+
+    def do_HEAD(self):
+        self._reply("HEAD")
+
+    def do_GET(self):
+        self._reply("GET")
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _Handler.requests_seen = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _dead_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/"
+
+
+def test_routes_are_probed_once_with_head_and_get_fallback(base_url):
+    urls = [f"{base_url}/", f"{base_url}/no-head", f"{base_url}/head-forbidden", f"{base_url}/redirect",
+            f"{base_url}/missing", _dead_url()]
+
+    with RoutePreflight(timeout=2) as preflight:
+        probes = preflight.check_all(urls)
+        assert preflight.is_available(f"{base_url}/")  # из кэша прогона
+
+    ok, no_head, head_forbidden, redirect, missing, dead = (probes[url] for url in urls)
+    assert (ok.available, ok.method, ok.status) == (True, "HEAD", 200) and ok.ttfb_ms >= 0
+    assert (no_head.available, no_head.method) == (True, "GET")
+    assert (head_forbidden.available, head_forbidden.method, head_forbidden.status) == (True, "GET", 200)
+    assert redirect.available and redirect.status == 200
+    assert (missing.available, missing.method, missing.status) == (False, "GET", 404)
+    assert not dead.available and dead.error == "ConnectionError" and "ConnectionError" in dead.describe()
+    assert sorted(_Handler.requests_seen) == sorted([
+        ("HEAD", "/"), ("HEAD", "/no-head"), ("GET", "/no-head"),
+        ("HEAD", "/head-forbidden"), ("GET", "/head-forbidden"), ("HEAD", "/redirect"), ("HEAD", "/"),
+        ("HEAD", "/missing"), ("GET", "/missing"),
+    ])
@@ -0,0 +1,61 @@
+"""Юнит-тесты детектора регрессий (RunStore во временной директории, без Google Sheets)."""
+
+import random
+
+import pytest
+
+from services.lighthouse import regression
+from services.lighthouse.run_store import RunStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RunStore(tmp_path / "run_store.sqlite3")
+
+
+def _iterations(rng, lcp, score, tbt=0, n=8):
+    return [{"P": score + rng.randint(-2, 2), "LCP": lcp + rng.randint(-60, 60), "TBT": tbt and tbt + rng.randint(0, 50)}
+            for _ in range(n)]
+
+
+def test_mann_whitney_u_matches_reference():
+    u, p = regression.mann_whitney_u([6, 7, 8, 9, 10], [1, 2, 3, 4, 5])
+    assert u == 25.0
+    assert p == pytest.approx(0.006092, abs=1e-6)  # scipy mannwhitneyu(..., "greater", method="asymptotic")
+
+    assert regression.mann_whitney_u([1, 2, 3], [1, 2, 3])[1] > 0.5
+    assert regression.mann_whitney_u([5, 5, 5], [5, 5, 5]) == (4.5, 1.0)
+
+
+def test_run_is_compared_with_rolling_baseline(store):
+    rng = random.Random(3)
+    for day in range(1, 7):
+        run_id = f"2026.10.0{day}-100000"
+        slow = day == 6
+        store.save_iterations(run_id, "cli", "VRP_PROD", "main", "desktop",
+                              _iterations(rng, 2600 if slow else 2000, 70 if slow else 90, tbt=500 if slow else 0))
+        store.save_iterations(run_id, "cli", "VRP_PROD", "models", "desktop", _iterations(rng, 1500, 95))
+
+    verdicts = regression.detect_regressions(store=store, metrics=("P", "LCP", "TBT"))
+    by_key = {(v["route"], v["metric"]): v for v in verdicts}
+
+    assert by_key[("main", "LCP")]["verdict"] == regression.VERDICT_REGRESSION
+    assert by_key[("main", "LCP")]["level"] == "HIGH" and by_key[("main", "LCP")]["baseline_runs"] == 5
+    assert by_key[("main", "P")]["verdict"] == regression.VERDICT_REGRESSION  # «больше — лучше»
+    assert by_key[("main", "TBT")]["verdict"] == regression.VERDICT_REGRESSION  # baseline 0 ms -> ~500 ms
+    assert by_key[("main", "TBT")]["baseline_p75"] == 0 and by_key[("main", "TBT")]["level"] == "HIGH"
+    assert by_key[("models", "LCP")]["verdict"] == regression.VERDICT_OK
+
+    rows = regression.verdict_rows(verdicts)
+    assert {(row["page"], row["metric"], row["verdict"]) for row in rows} == {
+        ("main", "P", "REGRESSION"), ("main", "LCP", "REGRESSION"), ("main", "TBT", "REGRESSION"),
+        ("models", "ALL", "OK"),
+    }
+    assert rows[0]["project"] == "VRP" and rows[0]["environment"] == "PROD"
+
+    # Первый прогон без baseline: INSUFFICIENT публикуется как есть, без ALL/OK
+    first = regression.detect_regressions("2026.10.01-100000", store=store, metrics=("LCP",))
+    assert all(v["verdict"] == regression.VERDICT_INSUFFICIENT for v in first)
+    assert {(row["page"], row["metric"], row["verdict"]) for row in regression.verdict_rows(first)} == {
+        ("main", "LCP", "INSUFFICIENT"), ("models", "LCP", "INSUFFICIENT"),
+    }
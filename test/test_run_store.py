@@ -0,0 +1,95 @@
+"""Юнит-тесты локального хранилища прогонов (SQLite во временной папке)."""
+
+import pytest
+
+from services.lighthouse.processor_lighthouse import aggregate_results
+from services.lighthouse.run_store import REPLICATION_BUFFERED, REPLICATION_PENDING, RunStore
+
+
+def _row(run_id, lcp, device="desktop"):
+    return {"run_id": run_id, "device": device, "iterations": 3, "P": 80, "LCP": lcp, "TBT": 150,
+            "page": '=HYPERLINK("https://vrporn.com/"; "main")'}
+
+
+class _FakeSheetsClient:
+    def __init__(self, fail=False, fail_ensure=False):
+        self.fail = fail
+        self.fail_ensure = fail_ensure
+        self.flushed = []
+        self._rows = []
+
+    def ensure_sheet_exists(self, sheet_name, source):
+        if self.fail_ensure:
+            raise RuntimeError("no template")
+
+    def append_result(self, row, worksheet_name=None, fallback=True):
+        assert not fallback  # строки RunStore не пишутся в failed_flush_*.json
+        self._rows.append((worksheet_name, row))
+
+    def flush(self):
+        if self.fail:
+            self._rows.clear()
+            raise RuntimeError("quota")
+        self.flushed.append(list(self._rows))
+        self._rows.clear()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RunStore(tmp_path / "runs.sqlite3")
+
+
+def test_iterations_roundtrip_for_reaggregation(store):
+    results = [{"P": 90, "LCP": 2000, "TBT": 100}, None, {"P": 80, "LCP": 2400, "TBT": 200}]
+
+    assert store.save_iterations("run-1", "cli", "VRP_PROD", "main", "desktop", results) == 2
+
+    stored = store.iteration_results("run-1", "main", "desktop")
+    assert [r["LCP"] for r in stored] == [2000, 2400]
+    assert aggregate_results(stored) == aggregate_results([r for r in results if r])
+
+
+def test_trend_returns_oldest_first_and_validates_metric(store):
+    for i, lcp in enumerate([2500, 2300, 2100]):
+        store.save_aggregate(_row(f"run-{i}", lcp), source="cli", environment="VRP_PROD", route="main",
+                             worksheet="CLI [VRP_PROD]")
+
+    assert [p["value"] for p in store.trend("main", "desktop", "LCP", limit=2)] == [2300, 2100]
+    with pytest.raises(ValueError):
+        store.trend("main", "desktop", "LCP; DROP TABLE aggregates")
+
+
+def test_replicate_pending_sends_all_worksheets_in_one_flush(store):
+    store.save_aggregate(_row("run-1", 2000), source="cli", environment="VRP_PROD", route="main",
+                         worksheet="CLI [VRP_PROD]")
+    store.save_aggregate(_row("run-1", 2100), source="api", environment="VRP_PROD", route="main",
+                         worksheet="API [VRP_PROD]")
+    sent_id = store.save_aggregate(_row("run-1", 2200), source="cli", environment="VRP_PROD", route="home",
+                                   worksheet="CLI [VRP_PROD]")
+    store.mark_replicated(ids=[sent_id])
+
+    client = _FakeSheetsClient()
+    assert store.replicate_pending(client) == 2
+    assert len(client.flushed) == 1
+    assert [sheet for sheet, _ in client.flushed[0]] == ["CLI [VRP_PROD]", "API [VRP_PROD]"]
+    assert store.pending_rows() == []
+
+
+def test_failed_replication_stays_pending_and_is_resent(store):
+    row_id = store.save_aggregate(_row("run-1", 2000), source="cli", environment="VRP_PROD", route="main",
+                                  worksheet="CLI [VRP_PROD]")
+    buffered_id = store.save_aggregate(_row("run-2", 2100), source="cli", environment="VRP_PROD",
+                                       route="main", worksheet="CLI [VRP_PROD]", buffered=True)
+
+    assert store.replicate_pending(_FakeSheetsClient(fail=True)) == 0
+    assert store.replicate_pending(_FakeSheetsClient(fail_ensure=True)) == 0
+    assert [(r["id"], r["status"]) for r in store.pending_rows()] == [
+        (row_id, REPLICATION_PENDING), (buffered_id, REPLICATION_BUFFERED)]
+
+    # buffered-строку отправит flush её прогона, replicate досылает только pending
+    client = _FakeSheetsClient()
+    assert store.replicate_pending(client) == 1
+    assert [row["run_id"] for _, row in client.flushed[0]] == ["run-1"]
+    assert store.release([buffered_id]) == 1
+    assert store.replicate_pending(client) == 1
+    assert store.pending_rows() == []
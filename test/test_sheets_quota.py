@@ -0,0 +1,91 @@
+"""Многопроцессные тесты общего token bucket (services/google/quota.py)."""
+
+import multiprocessing
+import time
+
+import pytest
+
+from services.google.quota import DailyQuota, DailyQuotaExceededError, QuotaTimeoutError, SharedTokenBucket
+from services.lighthouse.pagespeed_service import RateLimiter
+
+PER_MINUTE = 600.0  # 10 токенов/с — тест укладывается в ~1-2 с
+CAPACITY = 5
+
+
+def _acquire_many(db_path, count, start_at, results):
+    bucket = SharedTokenBucket("test", per_minute=PER_MINUTE, capacity=CAPACITY, path=db_path)
+    time.sleep(max(0.0, start_at - time.time()))
+    for _ in range(count):
+        bucket.acquire(timeout=30)
+        results.append(time.time())
+
+
+def _run_workers(db_path, workers, per_worker):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager:
+        results = manager.list()
+        start_at = time.time() + 2.0  # даём spawn-процессам подняться
+        processes = [ctx.Process(target=_acquire_many, args=(str(db_path), per_worker, start_at, results))
+                     for _ in range(workers)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join(timeout=60)
+            assert p.exitcode == 0
+        return start_at, sorted(results)
+
+
+def test_processes_share_one_quota(tmp_path):
+    db_path = tmp_path / "quota.sqlite3"
+    start_at, stamps = _run_workers(db_path, workers=4, per_worker=5)
+
+    assert len(stamps) == 20
+    rate = PER_MINUTE / 60.0
+    # Burst = capacity проходит сразу, остальное — не быстрее скорости пополнения
+    assert stamps[CAPACITY - 1] - start_at < 1.0
+    assert stamps[-1] - start_at >= (20 - CAPACITY) / rate * 0.9
+    # В любом окне длиной 1 с выдано не больше capacity + rate токенов
+    for i, t in enumerate(stamps):
+        in_window = sum(1 for s in stamps[i:] if s - t < 1.0)
+        assert in_window <= CAPACITY + rate + 1
+
+
+def test_backoff_is_shared_between_processes(tmp_path):
+    db_path = tmp_path / "quota.sqlite3"
+    SharedTokenBucket("test", per_minute=PER_MINUTE, capacity=CAPACITY, path=db_path).report_backoff(3.0)
+    backoff_until = time.time() + 3.0
+
+    _, stamps = _run_workers(db_path, workers=2, per_worker=1)
+    assert min(stamps) >= backoff_until - 0.05
+
+
+def test_acquire_timeout(tmp_path):
+    bucket = SharedTokenBucket("test", per_minute=60, capacity=1, path=tmp_path / "quota.sqlite3")
+    bucket.acquire()
+    with pytest.raises(QuotaTimeoutError):
+        bucket.acquire(timeout=0.2)
+    assert bucket.status()["tokens"] < 1
+
+
+def test_daily_ledger_is_shared_and_resets_next_day(tmp_path, monkeypatch):
+    db_path = tmp_path / "quota.sqlite3"
+    first = DailyQuota("psi", daily_limit=3, path=db_path)
+    second = DailyQuota("psi", daily_limit=3, path=db_path)
+
+    assert first.consume(2) == 1
+    assert second.consume() == 0
+    with pytest.raises(DailyQuotaExceededError):
+        first.consume()
+    assert second.status()["used"] == 3
+
+    monkeypatch.setattr(DailyQuota, "_today", lambda self: "2099-01-01")
+    assert first.remaining() == 3
+
+
+def test_psi_try_acquire_checks_daily_quota_before_bucket(tmp_path):
+    limiter = RateLimiter(max_tokens=2, refill_period=3600, daily_limit=1, path=tmp_path / "quota.sqlite3")
+    assert limiter.try_acquire() == 0.0
+
+    with pytest.raises(DailyQuotaExceededError):
+        limiter.try_acquire()
+    assert limiter.status()["rate"]["tokens"] >= 0.99  # токен ведра не сгорел впустую
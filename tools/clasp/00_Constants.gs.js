@@ -21,6 +21,7 @@ const DASHBOARD_PROJECTS = ['VRP', 'VRS'];
 const DASHBOARD_COLUMN_WIDTHS = [160, 140, 120, 110, 110, 120, 120, 120, 100, 100, 100, 100, 100, 100, 200];
 const DASHBOARD_CONFIG_SHEET = 'Config';
 const CRUX_SOURCE_SHEET = 'CrUX';
+const REGRESSIONS_SHEET = 'Regressions'; // вердикты python -m services.lighthouse.regression --publish
 const CHART_COLUMN = 10;
 const HELPER_COLUMN_PRIMARY = 20;
 const HELPER_COLUMN_SECONDARY = 26;
@@ -72,6 +73,7 @@ const RAW_PERF_SHEETS = ['VRP [PROD]', 'VRP [STAGE]', 'VRP [TEST]', 'VRP [DEV]',
 const RUNS_HEADERS = ['date', 'project', 'environment', 'source', 'sprint', 'run_id', 'tag', 'iterations', 'pages', 'avg_score', 'p90_lcp', 'p90_inp', 'p90_cls', 'ttfb', 'tbt', 'fcp', 'tti', 'speed'];
 const ROUTES_HEADERS = ['date', 'project', 'environment', 'source', 'sprint', 'run_id', 'tag', 'page', 'device', 'type', 'tests', 'avg_score', 'p90_lcp', 'p90_inp', 'p90_cls', 'ttfb'];
 const STABILITY_HEADERS = ['project', 'environment', 'source', 'page', 'device', 'lcp_std', 'inp_std', 'cls_std', 'stability_score'];
+const PIPELINE_SYNC_MARKER = 'pipeline_synced_at'; // helper-лист ведёт services/lighthouse/helper_sheets.py
 
 const TIME_METRIC_KEYS = ['lcp', 'inp', 'ttfb', 'fcp', 'tbt', 'tti', 'si', 'speed', 'interactive'];
 const PERF_SHEET_ID_KEYS = ['GS_SHEET_ID', 'SHEET_ID'];
@@ -4,7 +4,7 @@
  *
  * Содержит:
  *  - Сбор сырых данных (collectRawPerfRows, normalizeRawRecord)
- *  - Ребилд Runs/Routes/Stability sheets
+ *  - Ребилд Runs/Routes/Stability sheets (кроме листов, которые ведёт Python-пайплайн)
  *  - Парсинг записей (extractRunMetrics, parseRouteRecord, parseStabilityRecord)
  *  - Загрузка порогов из Config (loadMetricThresholds, populateFallbackThresholds)
  */
@@ -12,12 +12,40 @@
 
 
 function rebuildAnalyticsHelperSheets(ss) {
+  // Листы с колонкой PIPELINE_SYNC_MARKER инкрементально ведёт Python (services/lighthouse/helper_sheets.py) —
+  // их не пересобираем; сырые листы читаем, только если хоть один helper-лист ещё не под пайплайном
+  const pending = [
+    [RUNS_SHEET, rebuildRunsSheet],
+    [ROUTES_SHEET, rebuildRoutesSheet],
+    [STABILITY_SHEET, rebuildStabilitySheet],
+  ].filter(([sheetName]) => !isPipelineHelperSheet_(ss.getSheetByName(sheetName)));
+  if (!pending.length) {
+    return;
+  }
+  const rawRows = collectRawPerfRows(ss);
+  pending.forEach(([, rebuild]) => rebuild(ss, rawRows));
+}
+
+/**
+ * Полный ребилд helper-листов из сырых данных (пункт меню), в т.ч. листов под пайплайном.
+ * Метка пропадёт — при следующей синхронизации Python перепишет листы целиком из своего состояния.
+ */
+function forceRebuildAnalyticsHelperSheets() {
+  const ss = getPerfSpreadsheet();
   const rawRows = collectRawPerfRows(ss);
   rebuildRunsSheet(ss, rawRows);
   rebuildRoutesSheet(ss, rawRows);
   rebuildStabilitySheet(ss, rawRows);
 }
 
+function isPipelineHelperSheet_(sheet) {
+  if (!sheet || sheet.getLastColumn() < 1) {
+    return false;
+  }
+  const headers = sheet.getRange(1, 1, 1, sheet.getLastColumn()).getValues()[0].map(normalizeHeader);
+  return headers.indexOf(PIPELINE_SYNC_MARKER) !== -1;
+}
+
 function collectRawPerfRows(ss) {
   const rows = [];
   RAW_PERF_SHEETS.forEach(sheetName => {
@@ -283,6 +311,34 @@ function parseStabilityRecord(record) {
   };
 }
 
+/**
+ * Строка листа Regressions: вердикт уже посчитан в Python (Манна–Уитни против baseline),
+ * здесь только разбор для отображения.
+ */
+function parseRegressionRecord(record) {
+  const page = toText(getRecordValue(record, ['page']));
+  const metric = toText(getRecordValue(record, ['metric'])).toUpperCase();
+  const verdict = toText(getRecordValue(record, ['verdict'])).toUpperCase();
+  if (!page || !metric || !verdict) {
+    return null;
+  }
+  const environmentRaw = toText(getRecordValue(record, ['environment']));
+  return {
+    page,
+    metric,
+    verdict,
+    project: normalizeProject(toText(getRecordValue(record, ['project'])) || inferProject(environmentRaw)),
+    environment: normalizeEnvironment(environmentRaw),
+    device: toText(getRecordValue(record, ['device'])).toLowerCase(),
+    runId: toText(getRecordValue(record, ['run_id'])),
+    level: toText(getRecordValue(record, ['level'])).toUpperCase(),
+    baselineP75: parseNumber(getRecordValue(record, ['baseline_p75'])),
+    currentP75: parseNumber(getRecordValue(record, ['current_p75'])),
+    deltaPct: parseNumber(getRecordValue(record, ['delta_pct'])),
+    pValue: parseNumber(getRecordValue(record, ['p_value'])),
+  };
+}
+
 function buildStabilityMap(records) {
   const map = {};
   records.forEach(record => {
@@ -358,7 +358,38 @@ function shouldRenderCrossEnvBlock(filters) {
   return mode === 'SPRINT' || mode === 'ROUTE_CROSS_ENV' || mode === 'EXPERIMENT';
 }
 
-function buildAlerts(latest, previous, routes, allProjectRoutes, stabilityRows, thresholds) {
+/**
+ * Вердикты последнего проверенного прогона для env+device (лист Regressions).
+ * Пустой массив — прогоны этой группы регресс-детектором не проверялись.
+ */
+// Вердикты именно последнего прогона группы: вердикты старого прогона не отключают наивные дельты
+function latestRegressionVerdicts_(regressions, env, device, latestRunId) {
+  if (!latestRunId) {
+    return [];
+  }
+  return (regressions || []).filter(item => item.environment === env && item.device === device && item.runId === latestRunId);
+}
+
+function latestRunIdForRoutes_(routes) {
+  const runGroups = {};
+  routes.forEach(route => {
+    const runId = toText(route.runId || '').trim();
+    if (!runId) return;
+    if (!runGroups[runId]) {
+      runGroups[runId] = [];
+    }
+    runGroups[runId].push(route);
+  });
+  const runIds = sortRunIdsByDate_(runGroups);
+  return runIds.length ? runIds[runIds.length - 1] : '';
+}
+
+// Метрика оценена статистически: прогон проверен, и по метрике нет INSUFFICIENT ни на одной странице
+function isStatisticallyJudged_(verdicts, metric) {
+  return verdicts.length > 0 && !verdicts.some(item => item.verdict === 'INSUFFICIENT' && item.metric === metric);
+}
+
+function buildAlerts(latest, previous, routes, allProjectRoutes, stabilityRows, thresholds, regressions) {
   const alerts = [];
 
   // Строим lookup предыдущих run для каждой комбинации env+device
@@ -394,8 +425,21 @@ function buildAlerts(latest, previous, routes, allProjectRoutes, stabilityRows,
     const deltaTtfb = metricDelta(groupMetrics.ttfb, prevTtfb);
     const avgClsStd = stabilityRows.length ? stabilityRows.reduce((sum, rec) => sum + (rec.clsStd || 0), 0) / stabilityRows.length : 0;
 
+    // Статистические вердикты (Python, Манна–Уитни против baseline) заменяют наивные дельты LCP/INP/TTFB
+    // только для оценённых метрик последнего прогона группы
+    const verdicts = latestRegressionVerdicts_(regressions, env, device, latestRunIdForRoutes_(groupRoutes));
+    verdicts.filter(item => item.verdict === 'REGRESSION').forEach(item => {
+      alerts.push({
+        level: item.level || 'LOW', metric: item.metric, environment: env, device: device, page: item.page,
+        text: `${item.metric} регресс ${formatPercent(item.deltaPct)} (p75 ${formatMetricValue(item.metric.toLowerCase(), item.baselineP75)} → ${formatMetricValue(item.metric.toLowerCase(), item.currentP75)})`,
+        reason: `Манна–Уитни против baseline, p=${item.pValue}; run ${item.runId}`,
+      });
+    });
+
     // LCP алерты
-    if (deltaLcp !== null && deltaLcp >= 20) {
+    if (isStatisticallyJudged_(verdicts, 'LCP')) {
+      // LCP уже оценён статистически — дельта к одному предыдущему прогону не нужна
+    } else if (deltaLcp !== null && deltaLcp >= 20) {
       alerts.push({
         level: 'HIGH', metric: 'LCP', environment: env, device: device,
         page: highestRoute ? highestRoute.page : '',
@@ -432,7 +476,7 @@ function buildAlerts(latest, previous, routes, allProjectRoutes, stabilityRows,
         text: `INP повышен (${formatMetricValue('inp', groupMetrics.inp)})`,
         reason: `Main thread нагружен.`,
       });
-    } else if (deltaInp !== null && deltaInp >= 20) {
+    } else if (!isStatisticallyJudged_(verdicts, 'INP') && deltaInp !== null && deltaInp >= 20) {
       alerts.push({
         level: 'LOW', metric: 'INP', environment: env, device: device, page: '',
         text: `INP растёт ${formatPercent(deltaInp)}`,
@@ -464,7 +508,7 @@ function buildAlerts(latest, previous, routes, allProjectRoutes, stabilityRows,
         text: `Backend bottleneck (${formatMetricValue('ttfb', groupMetrics.ttfb)})`,
         reason: `Сервер откликается медленно.`,
       });
-    } else if (deltaTtfb !== null && deltaTtfb > 20) {
+    } else if (!isStatisticallyJudged_(verdicts, 'TTFB') && deltaTtfb !== null && deltaTtfb > 20) {
       alerts.push({
         level: 'MEDIUM', metric: 'TTFB', environment: env, device: device, page: '',
         text: `TTFB растёт ${formatPercent(deltaTtfb)}`,
@@ -13,11 +13,12 @@
 
 
 
-function renderProjectDashboard(sheet, project, allRuns, allRoutes, allStabilityRows, allCruxRows, thresholds, ss) {
+function renderProjectDashboard(sheet, project, allRuns, allRoutes, allStabilityRows, allCruxRows, thresholds, ss, allRegressions) {
   const projectRuns = allRuns.filter(run => matchesProject(run.project, project));
   const projectRoutes = allRoutes.filter(route => matchesProject(route.project, project));
   const projectStabilityRows = allStabilityRows.filter(item => matchesProject(item.project, project));
   const projectCruxRows = allCruxRows.filter(item => matchesProject(item.project, project));
+  const projectRegressions = (allRegressions || []).filter(item => matchesProject(item.project, project));
   const sprintConfig = readSprintMetadata(sheet, ss);
   const filters = readDashboardFilters(sheet, project, projectRuns, projectRoutes, sprintConfig);
   const mode = normalizeDashboardMode_(filters.mode);
@@ -45,7 +46,7 @@ function renderProjectDashboard(sheet, project, allRuns, allRoutes, allStability
 
   if (mode === 'SPRINT') {
     renderContextOverviewBlock(sheet, LAYOUT.CONTEXT.row, context, thresholds);
-    renderAlertsBlock(sheet, LAYOUT.ALERTS.row, context.latest, previous, effectiveRoutes, projectRoutes, effectiveStabilityRows, thresholds, 'БЛОК 2 — АЛЕРТЫ');
+    renderAlertsBlock(sheet, LAYOUT.ALERTS.row, context.latest, previous, effectiveRoutes, projectRoutes, effectiveStabilityRows, thresholds, 'БЛОК 2 — АЛЕРТЫ', projectRegressions);
     renderSprintImpactBlock(sheet, LAYOUT.SPRINT_IMPACT.row, project, filters, effectiveRuns, projectRoutes, thresholds, 'БЛОК 3 — SPRINT IMPACT', ss, sprintConfig);
     renderTrendBlock(sheet, LAYOUT.TREND.row, trendRuns, effectiveStabilityRows, effectiveRoutes);
     renderWorstPagesBlock(sheet, LAYOUT.WORST_PAGES.row, effectiveRoutes, thresholds, 'БЛОК 4 — ХУДШИЕ СТРАНИЦЫ');
@@ -57,7 +58,7 @@ function renderProjectDashboard(sheet, project, allRuns, allRoutes, allStability
   }
 
   renderContextOverviewBlock(sheet, LAYOUT.CONTEXT.row, context, thresholds);
-  renderAlertsBlock(sheet, LAYOUT.ALERTS.row, context.latest, previous, effectiveRoutes, projectRoutes, effectiveStabilityRows, thresholds, 'БЛОК 2 — АЛЕРТЫ');
+  renderAlertsBlock(sheet, LAYOUT.ALERTS.row, context.latest, previous, effectiveRoutes, projectRoutes, effectiveStabilityRows, thresholds, 'БЛОК 2 — АЛЕРТЫ', projectRegressions);
   renderCruxReferenceBlock(sheet, LAYOUT.CRUX_REF.row, context.latest, projectCruxRows);
   renderOverviewBlock(sheet, LAYOUT.OVERVIEW.row, context.latest, thresholds);
   if (shouldRenderCrossEnvBlock(filters)) {
@@ -284,10 +285,10 @@ function renderContextOverviewBlock(sheet, row, context, thresholds) {
   return startRow + LAYOUT.CONTEXT.height;
 }
 
-function renderAlertsBlock(sheet, row, latest, previous, routes, allProjectRoutes, stabilityRows, thresholds, title) {
+function renderAlertsBlock(sheet, row, latest, previous, routes, allProjectRoutes, stabilityRows, thresholds, title, regressions) {
   const startRow = row;
   row = renderBlockHeader(sheet, row, title || 'БЛОК 2 — АЛЕРТЫ', 5);
-  const alerts = buildAlerts(latest, previous, routes, allProjectRoutes, stabilityRows, thresholds);
+  const alerts = buildAlerts(latest, previous, routes, allProjectRoutes, stabilityRows, thresholds, regressions);
   if (!alerts.length) {
     sheet.getRange(row, 1).setValue('Нет критичных отклонений — CWV в норме.').setFontStyle('italic');
     return startRow + LAYOUT.ALERTS.height;
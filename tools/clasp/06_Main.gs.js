@@ -24,16 +24,18 @@ function updatePerfAnalytics() {
   const routeRecords = readSheetRecords(ss.getSheetByName(ROUTES_SHEET));
   const stabilityRecords = readSheetRecords(ss.getSheetByName(STABILITY_SHEET));
   const cruxRecords = readSheetRecords(ss.getSheetByName(CRUX_SOURCE_SHEET));
+  const regressionRecords = readSheetRecords(ss.getSheetByName(REGRESSIONS_SHEET));
 
   const runs = runRecords.map(extractRunMetrics).filter(Boolean);
   const routes = routeRecords.map(parseRouteRecord).filter(Boolean);
   const stabilityRows = stabilityRecords.map(parseStabilityRecord).filter(Boolean);
   const cruxRows = cruxRecords.map(parseRouteRecord).filter(Boolean).filter(item => normalizeSource(item.source) === 'CRUX');
+  const regressions = regressionRecords.map(parseRegressionRecord).filter(Boolean);
   const thresholds = loadMetricThresholds(ss);
 
   DASHBOARD_PROJECTS.forEach(project => {
     const dashboard = getOrCreateSheet(ss, `Dashboard [${project}]`);
-    renderProjectDashboard(dashboard, project, runs, routes, stabilityRows, cruxRows, thresholds, ss);
+    renderProjectDashboard(dashboard, project, runs, routes, stabilityRows, cruxRows, thresholds, ss, regressions);
   });
 }
 
@@ -41,6 +43,7 @@ function onOpen() {
   SpreadsheetApp.getUi()
     .createMenu('QA Dashboard')
     .addItem('Generate Dashboard', 'updatePerfAnalytics')
+    .addItem('Rebuild helper sheets (full)', 'forceRebuildAnalyticsHelperSheets')
     .addToUi();
 }
 